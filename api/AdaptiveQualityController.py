@@ -0,0 +1,114 @@
+import time
+from typing import Optional
+
+from JpegEncodeCache import EncodeVariant
+
+
+class AdaptiveQualityController:
+    """
+    연결 하나의 송신 상태를 보고 JPEG 품질과 축소 비율을 조절하는 피드백 컨트롤러입니다.
+
+    송신 완료 시간, 큐 적체/드롭, 전송 대역폭을 지수이동평균으로 측정하여
+    목표 지연시간(target_latency_ms)과 목표 대역폭(target_kbps)을 넘으면 먼저 품질을, 품질이 최저이면 해상도를 낮춥니다.
+    여유가 생기면 해상도를 먼저 되돌리고 그 다음 품질을 올립니다. (낙상 감지에는 해상도가 더 중요합니다)
+    품질과 축소 비율은 정해진 단계로만 바뀌므로 같은 단계의 클라이언트끼리 인코딩 캐시를 공유할 수 있습니다.
+    """
+
+    SCALE_STEPS = (1.0, 0.75, 0.5, 0.25)
+    QUALITY_STEP = 10
+
+    def __init__(self, quality: int = 50, min_quality: int = 20, max_quality: int = 80,
+                 min_scale: float = 0.25, target_latency_ms: float = 100.0, target_kbps: float = 0.0,
+                 adjust_interval: int = 10, gray: bool = False):
+        if not 1 <= min_quality <= max_quality <= 100:
+            raise ValueError("품질 범위는 1 <= min_quality <= max_quality <= 100 이어야 합니다.")
+        if min_scale not in self.SCALE_STEPS:
+            raise ValueError(f"min_scale은 {self.SCALE_STEPS} 중 하나여야 합니다.")
+
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.min_scale = min_scale
+        self.target_latency_ms = target_latency_ms
+        self.target_kbps = target_kbps          # 0이면 대역폭 제한 없음
+        self.adjust_interval = adjust_interval  # 몇 프레임마다 조절할지 (진동 방지)
+        self.gray = gray
+
+        self.quality = min(max(quality, min_quality), max_quality)
+        self.scale = 1.0
+        self.adjustments = 0
+
+        self.latency_ms = 0.0   # 송신 완료 시간 지수이동평균
+        self.kbps = 0.0         # 전송 대역폭 지수이동평균
+
+        self._frames_since_adjust = 0
+        self._congested_frames = 0
+        self._last_dropped = 0
+        self._last_update: Optional[float] = None
+
+    def variant(self, frame_width: int) -> EncodeVariant:
+        width = 0 if self.scale >= 1.0 else int(frame_width * self.scale)
+        return EncodeVariant(quality=self.quality, width=width, gray=self.gray)
+
+    def update(self, send_seconds: float, frame_bytes: int, queue_depth: int, frames_dropped: int) -> None:
+        """프레임 하나를 송신한 뒤 호출하여 측정값을 반영하고, 필요하면 품질/해상도를 조절합니다."""
+        now = time.monotonic()
+        alpha = 0.2
+
+        self.latency_ms += alpha * (send_seconds * 1000 - self.latency_ms)
+        if self._last_update is not None and now > self._last_update:
+            kbps = frame_bytes * 8 / 1000 / (now - self._last_update)
+            self.kbps += alpha * (kbps - self.kbps)
+        self._last_update = now
+
+        # 큐에 프레임이 쌓여 있거나 그 사이 드롭이 있었다면 송신이 캡처를 따라가지 못하는 상태입니다.
+        if queue_depth > 0 or frames_dropped > self._last_dropped:
+            self._congested_frames += 1
+        self._last_dropped = frames_dropped
+
+        self._frames_since_adjust += 1
+        if self._frames_since_adjust < self.adjust_interval:
+            return
+
+        congested = (self.latency_ms > self.target_latency_ms
+                     or self._congested_frames > self.adjust_interval // 2
+                     or (self.target_kbps and self.kbps > self.target_kbps))
+        relaxed = (self.latency_ms < self.target_latency_ms * 0.5
+                   and self._congested_frames == 0
+                   and (not self.target_kbps or self.kbps < self.target_kbps * 0.7))
+
+        if congested:
+            self._degrade()
+        elif relaxed:
+            self._improve()
+
+        self._frames_since_adjust = 0
+        self._congested_frames = 0
+
+    def _degrade(self) -> None:
+        if self.quality > self.min_quality:
+            self.quality = max(self.quality - self.QUALITY_STEP, self.min_quality)
+        elif self.scale > self.min_scale:
+            self.scale = self.SCALE_STEPS[self.SCALE_STEPS.index(self.scale) + 1]
+        else:
+            return
+        self.adjustments += 1
+
+    def _improve(self) -> None:
+        if self.scale < 1.0:
+            self.scale = self.SCALE_STEPS[self.SCALE_STEPS.index(self.scale) - 1]
+        elif self.quality < self.max_quality:
+            self.quality = min(self.quality + self.QUALITY_STEP, self.max_quality)
+        else:
+            return
+        self.adjustments += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "quality": self.quality,
+            "scale": self.scale,
+            "latency_ms": round(self.latency_ms, 2),
+            "kbps": round(self.kbps, 1),
+            "target_latency_ms": self.target_latency_ms,
+            "target_kbps": self.target_kbps,
+            "adjustments": self.adjustments,
+        }
@@ -1,72 +1,70 @@
+import time
+# 서버 시작 시간 측정 기준 (시작 시 준비할 장치가 없으므로 모듈 임포트 시간을 edge_startup_seconds로 기록)
+IMPORT_STARTED = time.monotonic()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
+import asyncio
+import os
 
 # HTTP 응답 모델 (기존 코드에서 사용됨)
 from HttpResponseJson import HttpResponseJson 
 
 # 새로 작성한 RTSP 스트림 관리 모듈 임포트
 from RtspStreamManager import RtspStreamManager 
+from RtspRoutes import create_rtsp_router
+
+# 메트릭 레지스트리 (/api/metrics)
+from StreamMetrics import REGISTRY, STARTUP_SECONDS, monitor_event_loop_lag
 
-app = FastAPI()
+# 기본 인코딩 프로파일 (/api/rtsp/start?profile=...로 요청마다 변경 가능)
+RTSP_PROFILE = os.getenv("RTSP_PROFILE", "default")
 
 # **RTSP 관리자 객체 싱글톤**
-RTSP_MANAGER = RtspStreamManager(rtsp_url="rtsp://127.0.0.1:8554/live/stream")
+RTSP_MANAGER = RtspStreamManager(rtsp_url="rtsp://127.0.0.1:8554/live/stream", default_profile=RTSP_PROFILE)
 
 
-@app.post("/api/rtsp/start") 
-async def start_rtsp_transmission():
-    """FFmpeg을 사용하여 RTSP 스트리밍을 시작합니다."""
-    if RTSP_MANAGER.start_stream():
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=HttpResponseJson(
-                status=200, 
-                message=f"RTSP 스트리밍이 시작되었습니다. URL: rtsp://<요청주소>:8554/live/stream"
-            ).model_dump()
-        )
-    else :
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=HttpResponseJson(
-                status=400, 
-                message="RTSP 스트리밍이 이미 실행 중이거나 시작에 실패했습니다."
-            ).model_dump()
-        )
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    이벤트 루프 지연 측정을 시작하고, 종료 시 실행 중인 FFmpeg을 정리합니다.
+    FFmpeg이 장치를 직접 열므로 이 서버는 cv2/numpy를 임포트하지 않습니다. (RtspStreamManager는 pipe_* 입력에서만 임포트)
+    """
+    STARTUP_SECONDS.set(round(IMPORT_SECONDS, 3))
+    print(f"✅ RTSP 서버 시작 완료 ({STARTUP_SECONDS.get()}초)")
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    yield
+    lag_monitor.cancel()
+    if RTSP_MANAGER.is_running():
+        await RTSP_MANAGER.stop_stream()
 
-@app.post("/api/rtsp/stop") 
-async def stop_rtsp_transmission():
-    """실행 중인 FFmpeg RTSP 스트리밍을 중지합니다."""
-    if RTSP_MANAGER.stop_stream():
+
+app = FastAPI(lifespan=lifespan)
+
+
+# RTSP 제어 API (/api/rtsp/start, stop, status, profiles)
+app.include_router(create_rtsp_router(RTSP_MANAGER))
+
+@app.get("/api/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """RTSP 스트리밍 메트릭을 Prometheus 텍스트 형식(기본) 또는 JSON(format=json)으로 조회합니다."""
+    if format == "json":
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content=HttpResponseJson(
-                status=200, 
-                message="RTSP 스트리밍이 성공적으로 중지되었습니다."
-            ).model_dump()
-        )
-    else : 
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=HttpResponseJson(
-                status=400, 
-                message="RTSP 스트리밍이 이미 중지된 상태입니다."
+                status=200,
+                message="RTSP 스트리밍 메트릭",
+                data=REGISTRY.to_dict()
             ).model_dump()
         )
-        
-@app.get("/api/rtsp/status") 
-async def get_rtsp_status():
-    """RTSP 스트리밍 상태 정보를 조회합니다."""
-    rtsp_info = RTSP_MANAGER.get_status()
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=HttpResponseJson(
-            status=200,
-            message=f"현재 RTSP 스트리밍 상태: {rtsp_info['status']}",
-            data=rtsp_info
-        ).model_dump()
-    )
 
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# 모듈 임포트(의존 모듈, 라우트 설정)에 걸린 시간
+IMPORT_SECONDS = time.monotonic() - IMPORT_STARTED
 
 
 if __name__ == "__main__":
@@ -1,21 +1,181 @@
-from fastapi import FastAPI, WebSocket, Request, HTTPException, status
-from fastapi.responses import HTMLResponse, JSONResponse
+import time
+# 서버 시작 시간 측정 기준 (모듈 임포트 시간 + lifespan 시작 시간을 edge_startup_seconds로 기록)
+IMPORT_STARTED = time.monotonic()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException, status
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 import uvicorn
-import cv2
-import numpy as np
 import asyncio
+import json
+import os
+from typing import Callable, Optional
 
 from HttpResponseJson import HttpResponseJson
+from ClipRequest import ClipRequest
 
-app = FastAPI()
+# 프레임 공급원 및 브로드캐스터 모듈 임포트
+from FrameSource import create_frame_source
+from FrameBroadcaster import FrameBroadcaster, SubscriberClosed
+from CameraRegistry import CameraRegistry, parse_camera_specs
+from JpegEncodeCache import make_variant
+from AdaptiveQualityController import AdaptiveQualityController
+from MotionGate import MotionGate
+from TileDeltaEncoder import TileDeltaEncoder
+from FrameEnvelope import CODEC_H264, CODEC_JPEG, CODEC_TILES, FLAG_KEYFRAME, pack_batch, pack_envelope
+from FrameRingBuffer import FrameRingBuffer
+from FrameArchive import FrameArchive
+from MjpegAvi import build_mjpeg_avi
+from RtspStreamManager import RtspStreamManager
+from RtspRoutes import create_rtsp_router
+from H264StreamEncoder import H264StreamEncoder
+from StreamMetrics import (REGISTRY, BYTES_SENT, FIRST_FRAME_SECONDS, FRAMES_SENT, SEND_SECONDS, STARTUP_SECONDS,
+                           monitor_event_loop_lag)
 
 # 0. 관리 전역변수
-is_streaming = True  # 웹캠 스트리밍 상태 플래그
-frame_rate = 24  # 초기 프레임 전송 간격 (24fps)
+# 프레임 공급원 설정 (예: "camera:0", "file:/home/pi/test.avi", "synthetic:640x480")
+FRAME_SOURCE = os.getenv("FRAME_SOURCE", "camera:0")
+# 카메라별 발행 속도 상한 (0이면 카메라 속도 그대로 발행하고, 클라이언트마다 fps 파라미터로 받을 속도를 정함)
+FRAME_RATE = float(os.getenv("FRAME_RATE", "0"))
+# 링 버퍼/아카이브에 기록할 최대 초당 프레임 수 (0이면 발행되는 모든 프레임)
+RECORD_FPS = float(os.getenv("RECORD_FPS", "0"))
+# 서버 시작(lifespan) 시 웹캠을 열고 버릴 워밍업 프레임 수 (자동 노출 안정화, 0이면 버리지 않음)
+WARMUP_FRAMES = int(os.getenv("WARMUP_FRAMES", "10"))
+# 웹캠을 열지 못했거나 연속 REOPEN_AFTER_FAILURES번 읽지 못하면 다시 열기 (최대 REOPEN_BACKOFF_MAX초 간격, 0이면 다시 열지 않음)
+REOPEN_AFTER_FAILURES = int(os.getenv("REOPEN_AFTER_FAILURES", "30"))
+REOPEN_BACKOFF_MAX = float(os.getenv("REOPEN_BACKOFF_MAX", "30"))
+# JPEG 인코딩 스레드 풀 크기 (이벤트 루프를 막지 않도록 인코딩은 별도 스레드에서 실행)
+ENCODE_WORKERS = int(os.getenv("ENCODE_WORKERS", "2"))
+# JPEG 인코딩 프로세스 수 (0이면 스레드 풀만 사용, 1280x720 이상 30fps에는 3 권장)와 공유 메모리 프레임 슬롯 수 (0이면 프로세스 수의 2배)
+ENCODE_PROCESSES = int(os.getenv("ENCODE_PROCESSES", "0"))
+ENCODE_SLOTS = int(os.getenv("ENCODE_SLOTS", "0"))
+# 모션 게이트 설정 (MOTION_GATE=1이면 정지 장면의 프레임은 MOTION_KEEPALIVE_FPS 속도로만 전송)
+MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "4.0"))
+MOTION_KEEPALIVE_FPS = float(os.getenv("MOTION_KEEPALIVE_FPS", "1.0"))
+# 낙상 전 구간 보관용 링 버퍼 크기 (PREBUFFER_SECONDS=0이면 사용 안 함)
+PREBUFFER_SECONDS = float(os.getenv("PREBUFFER_SECONDS", "10"))
+PREBUFFER_MB = int(os.getenv("PREBUFFER_MB", "32"))
+# 세그먼트 파일 녹화 설정 (ARCHIVE_DIR을 지정해야 녹화, 보관 기간이나 전체 용량을 넘은 세그먼트는 자동 삭제)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+ARCHIVE_SEGMENT_SECONDS = float(os.getenv("ARCHIVE_SEGMENT_SECONDS", "60"))
+ARCHIVE_RETENTION_HOURS = float(os.getenv("ARCHIVE_RETENTION_HOURS", "24"))
+ARCHIVE_MAX_MB = int(os.getenv("ARCHIVE_MAX_MB", "0"))
+# RTSP 송출 설정 (기본 pipe_mjpeg: 웹소켓과 같은 캡처의 JPEG를 ffmpeg stdin으로 입력)
+RTSP_URL = os.getenv("RTSP_URL", "rtsp://127.0.0.1:8554/live/stream")
+RTSP_PROFILE = os.getenv("RTSP_PROFILE", "pipe_mjpeg")
+# 웹소켓 h264 모드의 인코딩 프로파일 (pipe_raw 또는 pipe_mjpeg, RTSP와 같은 프로파일 목록)
+H264_PROFILE = os.getenv("H264_PROFILE", "pipe_raw")
+# 캡처가 동작하지 않을 때 웹캠 상태 확인 결과를 재사용하는 시간(초)
+CAMERA_PROBE_TTL = float(os.getenv("CAMERA_PROBE_TTL", "30"))
+# 카메라 여러 대 설정 (예: "front=camera:0|2;back=camera:2|3", "|" 뒤는 고정할 CPU 코어)
+# 비어 있으면 FRAME_SOURCE 하나를 "0"번 카메라로 사용합니다.
+CAMERAS = os.getenv("CAMERAS", "")
+
+def create_broadcaster(source_spec: str, archive_dir: str, cpus=()) -> FrameBroadcaster:
+    """카메라 하나의 캡처/인코딩 파이프라인을 만듭니다. (링 버퍼, 아카이브, 모션 게이트는 카메라마다 따로 가짐)"""
+    return FrameBroadcaster(
+        create_frame_source(source_spec), frame_rate=FRAME_RATE, encode_workers=ENCODE_WORKERS,
+        motion_gate=MotionGate(threshold=MOTION_THRESHOLD, keepalive_fps=MOTION_KEEPALIVE_FPS) if MOTION_GATE else None,
+        ring_buffer=FrameRingBuffer(max_seconds=PREBUFFER_SECONDS, max_bytes=PREBUFFER_MB * 1024 * 1024)
+        if PREBUFFER_SECONDS > 0 else None,
+        archive=FrameArchive(archive_dir, segment_seconds=ARCHIVE_SEGMENT_SECONDS,
+                             retention_hours=ARCHIVE_RETENTION_HOURS, max_total_mb=ARCHIVE_MAX_MB)
+        if archive_dir else None,
+        cpus=cpus, encode_processes=ENCODE_PROCESSES, encode_slots=ENCODE_SLOTS, record_fps=RECORD_FPS,
+        warmup_frames=WARMUP_FRAMES, reopen_after_failures=REOPEN_AFTER_FAILURES, reopen_backoff_max=REOPEN_BACKOFF_MAX,
+    )
+
+
+# **카메라 레지스트리 싱글톤**
+# 카메라마다 장치를 한 번만 열고, 읽은 프레임을 그 카메라를 구독한 웹소켓 클라이언트에게 나눠줍니다.
+# 카메라별 스트리밍 상태 플래그(is_streaming)와 발행 속도 상한(frame_rate, 초기값 FRAME_RATE)은 각 브로드캐스터가 관리하며,
+# 클라이언트별 수신 속도와 일시 중지는 각 구독자가 관리합니다.
+CAMERA_REGISTRY = CameraRegistry(probe_ttl=CAMERA_PROBE_TTL)
+if CAMERAS:
+    for cam_id, source_spec, cpus in parse_camera_specs(CAMERAS):
+        # 카메라가 여러 대면 녹화도 카메라별 하위 디렉토리에 저장
+        archive_dir = os.path.join(ARCHIVE_DIR, cam_id) if ARCHIVE_DIR else ""
+        CAMERA_REGISTRY.add(cam_id, source_spec, create_broadcaster(source_spec, archive_dir, cpus))
+else:
+    CAMERA_REGISTRY.add("0", FRAME_SOURCE, create_broadcaster(FRAME_SOURCE, ARCHIVE_DIR))
+
+# **프레임 브로드캐스터 객체 싱글톤** (기본 카메라, 카메라 ID가 없는 기존 API와 RTSP 송출에서 사용)
+FRAME_BROADCASTER = CAMERA_REGISTRY.get().broadcaster
+
+# **RTSP 관리자 객체 싱글톤**
+# 장치는 FRAME_BROADCASTER만 열고, RTSP 송출은 브로드캐스터의 프레임을 받아 ffmpeg에 넣습니다.
+RTSP_MANAGER = RtspStreamManager(rtsp_url=RTSP_URL, default_profile=RTSP_PROFILE, broadcaster=FRAME_BROADCASTER)
+
+# **웹소켓 H.264 인코더** (카메라별, h264 모드 클라이언트가 처음 연결될 때 생성/시작하고 모두 나가면 FFmpeg 종료)
+H264_ENCODERS: dict = {}
+
+
+def get_h264_encoder(cam_id: str, broadcaster: FrameBroadcaster) -> H264StreamEncoder:
+    encoder = H264_ENCODERS.get(cam_id)
+    if encoder is None:
+        encoder = H264_ENCODERS[cam_id] = H264StreamEncoder(broadcaster, default_profile=H264_PROFILE)
+    return encoder
+
+
+# 브로드캐스터 상태를 조회 시점에 계산하는 게이지 (/api/metrics)
+REGISTRY.gauge("edge_connected_clients", "연결된 웹소켓 구독자 수 (모든 카메라)",
+               lambda: sum(camera.broadcaster.client_count() for camera in CAMERA_REGISTRY.cameras.values()))
+
+
+def per_camera(function) -> Callable[[], dict]:
+    """브로드캐스터 하나의 값을 계산하는 함수를 카메라 ID 레이블이 붙은 게이지 함수로 만듭니다."""
+    return lambda: {cam_id: function(camera.broadcaster) for cam_id, camera in CAMERA_REGISTRY.cameras.items()}
+
+
+# 카메라별 게이지 (edge_target_fps{camera="0"} ...)
+REGISTRY.gauge("edge_target_fps", "프레임 발행 속도 (상한 또는 카메라 속도)",
+               per_camera(lambda broadcaster: broadcaster.output_fps()), label="camera")
+REGISTRY.gauge("edge_achieved_fps", "실제 프레임 발행 속도",
+               per_camera(lambda broadcaster: broadcaster.pacer.get_stats()["achieved_fps"]), label="camera")
+REGISTRY.gauge("edge_streaming", "프레임 전송 상태 (1: 전송중, 0: 일시중지)",
+               per_camera(lambda broadcaster: broadcaster.is_streaming), label="camera")
+REGISTRY.gauge("edge_capture_first_frame_seconds", "브로드캐스터 시작부터 첫 프레임 캡처까지 걸린 시간 (장치 열기, 워밍업 포함)",
+               per_camera(lambda broadcaster: broadcaster.startup.get("first_frame_seconds") or 0.0), label="camera")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    서버 시작 시 모든 카메라를 열고 워밍업한 뒤 프레임 캡처를 시작하고, 종료 시 RTSP 송출을 멈추고 장치를 해제합니다.
+    장치 열기/포맷 협상/자동 노출 안정화를 여기서 미리 끝내 두므로 웹소켓 클라이언트는 연결 직후 첫 프레임을 받습니다.
+    """
+    lifespan_started = time.monotonic()
+    await CAMERA_REGISTRY.start_all()
+    STARTUP_SECONDS.set(round(IMPORT_SECONDS + time.monotonic() - lifespan_started, 3))
+    print(f"✅ 서버 시작 완료 ({STARTUP_SECONDS.get()}초)")
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    yield
+    lag_monitor.cancel()
+    for manager in (RTSP_MANAGER, *H264_ENCODERS.values()):
+        if manager.is_running():
+            await manager.stop_stream()
+    await CAMERA_REGISTRY.stop_all()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# RTSP 제어 API (/api/rtsp/start, stop, status, profiles) - 웹소켓과 같은 캡처를 송출
+app.include_router(create_rtsp_router(RTSP_MANAGER))
 
 
 # 1. REST API 엔드포인트 구현 (기본 정보 및 엣지 명령 전송 모의)
 
+def camera_not_found(cam_id: str) -> JSONResponse:
+    """등록되지 않은 카메라 ID에 대한 404 응답"""
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content=HttpResponseJson(
+            status=404,
+            message=f"등록되지 않은 카메라입니다: {cam_id} (등록된 카메라: {', '.join(CAMERA_REGISTRY.cameras)})"
+        ).model_dump()
+    )
+
 
 # 테스트
 @app.get("/", response_class=HTMLResponse)
@@ -54,57 +214,92 @@ async def get_api_status():
 
 # 라즈베리에 연결된 웹캠 상태 확인 API
 @app.get("/api/webcam_status")
-async def get_webcam_status():
+@app.get("/api/webcam_status/{cam_id}")
+async def get_webcam_status(cam_id: Optional[str] = None):
     
     """
     서버 외부장치(웹캠) 상태 정보 제공
 
     라즈베리파이에 연결되어있는 웹캠 장치가 정상적으로 연결되어있는지 확인합니다.
+    캡처가 동작 중이면 캡처 루프가 기록한 상태(마지막 프레임 시각, 읽기 실패율, 해상도, fps)를 그대로 반환하며,
+    장치를 다시 열지 않으므로 자주 호출해도 스트림에 영향이 없습니다.
+    캡처가 동작하지 않을 때는 CAMERA_PROBE_TTL초마다 백그라운드에서 장치를 확인한 결과를 반환합니다.
+    단, 시작에 실패해 브로드캐스터가 장치를 다시 여는 중이면 같은 장치를 동시에 열지 않도록 확인하지 않고 다시 열기 상태만 반환합니다.
+    cam_id를 생략하면 기본 카메라를 조회합니다.
     
     """
-    cap = cv2.VideoCapture(0) 
-    
-    # **웹캠이 성공적으로 열렸는지 확인**
-    if cap.isOpened():
-        # 웹캠이 연결되어있음
-        cap.release()
+    camera = CAMERA_REGISTRY.get(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    broadcaster = camera.broadcaster
+    streaming_state = "전송중" if broadcaster.is_streaming else "일시중지"
+
+    if broadcaster.is_running():
+        health = {"mode": "pipeline", **broadcaster.health.snapshot()}
+    elif broadcaster.is_reopening():
+        # V4L2 장치는 동시에 열 수 없으므로 확인용으로 열면 브로드캐스터의 다시 열기가 실패함
+        reopen = {key: value for key, value in broadcaster.health.snapshot().items()
+                  if key.startswith(("reopen", "next_reopen"))}
+        health = {"mode": "reopen", "healthy": False, **reopen}
+        streaming_state = "장치 다시 여는 중"
+    else:
+        probe = camera.probe.get()
+        if probe is None:
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content=HttpResponseJson(
+                    status=503,
+                    message="캡처가 동작하지 않아 웹캠 장치를 확인하는 중입니다. 잠시 후 다시 조회하세요."
+                ).model_dump()
+            )
+        health = {"mode": "probe", **probe}
+        streaming_state = "캡처 중지"
 
+    if health["healthy"]:
+        # 웹캠이 연결되어있음
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content=HttpResponseJson(
                 status=200, 
-                message="웹캠이 정상적으로 연결되었으며 접근 가능합니다. 웹캠 스트리밍 상태 : " + ("전송중" if is_streaming else "일시중지")
+                message="웹캠이 정상적으로 연결되었으며 접근 가능합니다. 웹캠 스트리밍 상태 : " + streaming_state,
+                data=health
             ).model_dump()
         )
         
     else:
-        # 웹캠이 연결되어있지않음
+        # 웹캠이 연결되어있지않거나 프레임이 들어오지 않음
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content=HttpResponseJson(
                 status=500,
-                message="웹캠 연결을 찾을 수 없거나 접근할 수 없습니다 (인덱스 0)."
+                message=f"웹캠 연결을 찾을 수 없거나 접근할 수 없습니다 (카메라: {camera.cam_id}, 공급원: {camera.source_spec})."
+                        + (" 장치를 다시 여는 중입니다." if health.get("reopening") else ""),
+                data=health
             ).model_dump()
         )
     
 # **새로운 제어 API:** 프레임 전송 시작 or 재개
 @app.post("/api/frame/start")
-async def start_frame_transmission():
+@app.post("/api/frame/{cam_id}/start")
+async def start_frame_transmission(cam_id: Optional[str] = None):
     """
     웹캠 프레임 전송 시작 또는 재개
 
-    라즈베리파이에 연결되어있는 웹캠 장치가 프레임을 보내도록 설정합니다.
+    라즈베리파이에 연결되어있는 웹캠 장치가 프레임을 보내도록 설정합니다. (cam_id를 생략하면 기본 카메라)
 
     만약 이미 전송 중 상태라면 오류메시지를 반환합니다.
     """
-    global is_streaming
-    if not is_streaming:
-        is_streaming = True
+    camera = CAMERA_REGISTRY.get(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    broadcaster = camera.broadcaster
+    if not broadcaster.is_streaming:
+        broadcaster.is_streaming = True
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content=HttpResponseJson(
                 status=200, 
-                message="프레임 전송이 재개되었습니다. 현재 상태 : " + ("전송중" if is_streaming else "일시중지")
+                message="프레임 전송이 재개되었습니다. 현재 상태 : " + ("전송중" if broadcaster.is_streaming else "일시중지")
             ).model_dump()
         )
     else :
@@ -112,28 +307,32 @@ async def start_frame_transmission():
             status_code=status.HTTP_400_BAD_REQUEST,
             content=HttpResponseJson(
                 status=400, 
-                message="프레임 전송이 이미 실행 중입니다. 현재 상태 : " + ("전송중" if is_streaming else "일시중지")
+                message="프레임 전송이 이미 실행 중입니다. 현재 상태 : " + ("전송중" if broadcaster.is_streaming else "일시중지")
             ).model_dump()
         )
 
 # **새로운 제어 API:** 프레임 전송 일시 중지
 @app.post("/api/frame/stop")
-async def stop_frame_transmission():
+@app.post("/api/frame/{cam_id}/stop")
+async def stop_frame_transmission(cam_id: Optional[str] = None):
     """
     웹캠 프레임 전송 중지
 
-    라즈베리파이에 연결되어있는 웹캠 장치가 프레임을 보내는것을 중단하도록 설정합니다.
+    라즈베리파이에 연결되어있는 웹캠 장치가 프레임을 보내는것을 중단하도록 설정합니다. (cam_id를 생략하면 기본 카메라)
 
     만약 이미 중지 상태라면 오류메시지를 반환합니다.
     """
-    global is_streaming
-    if is_streaming:
-        is_streaming = False
+    camera = CAMERA_REGISTRY.get(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    broadcaster = camera.broadcaster
+    if broadcaster.is_streaming:
+        broadcaster.is_streaming = False
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content=HttpResponseJson(
                 status=200, 
-                message="프레임 전송이 일시 중지되었습니다. 현재 상태 : " + ("전송중" if is_streaming else "일시중지")
+                message="프레임 전송이 일시 중지되었습니다. 현재 상태 : " + ("전송중" if broadcaster.is_streaming else "일시중지")
             ).model_dump()
         )
     else : 
@@ -141,25 +340,31 @@ async def stop_frame_transmission():
             status_code=status.HTTP_400_BAD_REQUEST,
             content=HttpResponseJson(
                 status=400, 
-                message="프레임 전송이 이미 중지된 상태입니다. 현재 상태 : " + ("전송중" if is_streaming else "일시중지")
+                message="프레임 전송이 이미 중지된 상태입니다. 현재 상태 : " + ("전송중" if broadcaster.is_streaming else "일시중지")
             ).model_dump()
         )
     
 @app.post("/api/frame/rate/{new_rate}")
-async def set_frame_rate(new_rate: int):
+@app.post("/api/frame/{cam_id}/rate/{new_rate}")
+async def set_frame_rate(new_rate: int, cam_id: Optional[str] = None):
     """
-    웹캠 프레임 전송 속도 설정
+    웹캠 프레임 발행 속도 상한 설정
 
-    new_rate: 초당 프레임 수 (FPS)로, 1에서 60 사이의 값을 허용합니다.
+    new_rate: 초당 프레임 수 (FPS)로, 1에서 60 사이의 값을 허용하며 0이면 상한을 없애 카메라 속도로 발행합니다.
+    카메라마다 따로 설정되며 그 카메라의 모든 클라이언트에 적용됩니다. cam_id를 생략하면 기본 카메라에 적용합니다.
+    클라이언트별 수신 속도는 웹소켓의 fps 파라미터나 {"cmd": "rate"} 메시지로 정합니다.
     """
-    global frame_rate
-    if 15 <= new_rate <= 30:
-        frame_rate = new_rate
+    camera = CAMERA_REGISTRY.get(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    if 0 <= new_rate <= 60:
+        camera.broadcaster.frame_rate = new_rate
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content=HttpResponseJson(
                 status=200, 
-                message=f"프레임 전송 속도가 {new_rate} FPS로 설정되었습니다."
+                message=f"카메라 {camera.cam_id}의 프레임 발행 속도가 "
+                        + (f"{new_rate} FPS로 설정되었습니다." if new_rate else "카메라 속도로 설정되었습니다.")
             ).model_dump()
         )
     else:
@@ -167,65 +372,420 @@ async def set_frame_rate(new_rate: int):
             status_code=status.HTTP_400_BAD_REQUEST,
             content=HttpResponseJson(
                 status=400, 
-                message="잘못된 프레임 속도 값입니다. 15에서 30 사이의 값을 입력하세요."
+                message="잘못된 프레임 속도 값입니다. 0(카메라 속도) 또는 1에서 60 사이의 값을 입력하세요."
+            ).model_dump()
+        )
+
+@app.get("/api/frame/status")
+@app.get("/api/frame/{cam_id}/status")
+async def get_frame_status(cam_id: Optional[str] = None):
+    """
+    웹캠 프레임 전송 상태 및 타이밍 통계 조회
+
+    목표 FPS(target_fps)와 실제 달성 FPS(achieved_fps), 프레임 간격 지터(jitter_ms),
+    건너뛴 슬롯 수(skipped_slots)를 반환하여 라즈베리파이가 설정 속도를 따라가는지 확인할 수 있습니다.
+    """
+    camera = CAMERA_REGISTRY.get(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    frame_info = camera.broadcaster.get_stats()
+    h264_encoder = H264_ENCODERS.get(camera.cam_id)
+    frame_info["h264"] = h264_encoder.get_status() if h264_encoder is not None else None
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=HttpResponseJson(
+            status=200,
+            message=f"목표 {frame_info['target_fps']} FPS / 달성 {frame_info['achieved_fps']} FPS",
+            data=frame_info
+        ).model_dump()
+    )
+
+@app.get("/api/cameras")
+async def get_cameras():
+    """
+    등록된 카메라 목록과 카메라별 상태 조회
+
+    카메라마다 공급원, 고정된 CPU 코어, 전송 상태, 목표/달성 FPS, 구독자 수, 장치 상태를 반환합니다.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=HttpResponseJson(
+            status=200,
+            message=f"카메라 {len(CAMERA_REGISTRY.cameras)}대 (기본: {CAMERA_REGISTRY.default_id})",
+            data=CAMERA_REGISTRY.get_stats()
+        ).model_dump()
+    )
+
+@app.get("/api/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """
+    스트리밍 파이프라인 메트릭 조회
+
+    캡처 지연, 인코딩 시간, 송신 바이트/프레임, 드롭 프레임, 연결 수, 달성 FPS, 이벤트 루프 지연을 제공합니다.
+    기본은 Prometheus 텍스트 형식이며, format=json이면 JSON으로 반환합니다.
+    """
+    if format == "json":
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=HttpResponseJson(
+                status=200,
+                message="스트리밍 메트릭",
+                data=REGISTRY.to_dict()
             ).model_dump()
         )
 
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/api/clip")
+async def export_clip(request: ClipRequest):
+    """
+    낙상 전후 구간 영상 내보내기
+
+    링 버퍼에 보관된 최근 프레임 중 기준 시각(timestamp) 전 before초 ~ 후 after초 구간을 내보냅니다.
+    링 버퍼에 없는 오래된 구간(clock=wall)은 녹화 아카이브(ARCHIVE_DIR)에서 찾습니다.
+    after가 미래 구간이면 그만큼 기다렸다가 내보냅니다. 프레임은 재인코딩 없이 그대로 담습니다.
+    기다리는 동안 구간 앞부분이 링 버퍼에서 밀려나지 않도록 after는 링 버퍼 보관 시간(PREBUFFER_SECONDS)을 넘을 수 없습니다.
+
+    - format=avi: MJPEG AVI 파일 다운로드
+    - format=mjpeg: multipart/x-mixed-replace 스트리밍 응답
+    """
+    camera = CAMERA_REGISTRY.get(request.cam_id)
+    if camera is None:
+        return camera_not_found(request.cam_id)
+    ring_buffer = camera.broadcaster.ring_buffer
+    archive = camera.broadcaster.archive
+    if (ring_buffer is None and archive is None) or request.format not in ("avi", "mjpeg") or request.clock not in ("wall", "monotonic"):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=HttpResponseJson(
+                status=400,
+                message="링 버퍼와 아카이브가 비활성화되어 있거나 잘못된 요청입니다. (format: avi/mjpeg, clock: wall/monotonic)"
+            ).model_dump()
+        )
+
+    # 링 버퍼 없이 아카이브만 있으면 기존처럼 최대 30초까지 기다림
+    max_after = ring_buffer.max_seconds if ring_buffer is not None else 30.0
+    if request.after > max_after:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=HttpResponseJson(
+                status=400,
+                message=f"after는 링 버퍼 보관 시간({max_after}초)을 넘을 수 없습니다: {request.after}초"
+            ).model_dump()
+        )
+
+    wall_clock = request.clock == "wall"
+    now = time.time() if wall_clock else time.monotonic()
+    center = request.timestamp if request.timestamp is not None else now
+    start, end = center - request.before, center + request.after
+
+    # 요청 구간의 끝이 미래라면 해당 프레임이 버퍼에 들어올 때까지 대기 (after 이하)
+    if end > now:
+        await asyncio.sleep(min(end - now, request.after))
+
+    # 구간 고정(복사) 및 AVI 생성은 이벤트 루프 밖에서 실행
+    frames = []
+    if ring_buffer is not None:
+        frames = await asyncio.to_thread(ring_buffer.snapshot, start, end, wall_clock)
+    if not frames and archive is not None and wall_clock:
+        frames = await asyncio.to_thread(archive.read_range, start, end)
+    if not frames:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=HttpResponseJson(
+                status=404,
+                message="요청한 구간의 프레임이 링 버퍼와 아카이브에 없습니다."
+            ).model_dump()
+        )
+
+    filename = f"clip_{camera.cam_id}_{frames[0].seq}_{frames[-1].seq}"
+    if request.format == "mjpeg":
+        async def stream():
+            for frame in frames:
+                yield (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                       + str(len(frame.data)).encode() + b"\r\n\r\n" + frame.data + b"\r\n")
+
+        return StreamingResponse(stream(), media_type="multipart/x-mixed-replace; boundary=frame",
+                                 headers={"Content-Disposition": f'inline; filename="{filename}.mjpeg"'})
+
+    duration = frames[-1].timestamp - frames[0].timestamp
+    fps = (len(frames) - 1) / duration if duration > 0 else camera.broadcaster.output_fps()
+    avi = await asyncio.to_thread(build_mjpeg_avi, [frame.data for frame in frames], fps,
+                                  frames[0].width, frames[0].height)
+    return Response(content=avi, media_type="video/x-msvideo",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}.avi"'})
+
 
 # 2. 웹소켓 엔드포인트 구현 (실시간 영상 수신)
 
+async def receive_controls(websocket: WebSocket, subscriber, handlers: dict):
+    """
+    클라이언트가 보내는 JSON 제어 메시지(예: {"cmd": "keyframe"}, {"cmd": "rate", "fps": 5})를 처리합니다.
+    연결이 끊기면 구독을 닫아 송신 루프가 프레임을 기다리며 남아있지 않도록 합니다.
+    """
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                command = json.loads(message)
+            except ValueError:
+                print(f"⚠️ 잘못된 제어 메시지: {message!r}")
+                continue
+
+            handler = handlers.get(command.get("cmd")) if isinstance(command, dict) else None
+            if handler is not None:
+                try:
+                    handler(command)
+                except (ValueError, TypeError) as e:
+                    print(f"⚠️ 제어 메시지를 처리할 수 없습니다: {message!r} - {e}")
+
+    except (WebSocketDisconnect, RuntimeError):
+        subscriber.close("클라이언트 연결 종료")
+
+
 @app.websocket("/ws/stream")
-async def websocket_endpoint(websocket: WebSocket):
+@app.websocket("/ws/stream/{cam_id}")
+async def websocket_endpoint(websocket: WebSocket, cam_id: Optional[str] = None, drop_policy: str = "latest",
+                             queue_size: int = 2, max_drops: int = 30,
+                             quality: int = 50, width: int = 0, color: str = "color",
+                             adaptive: bool = False, min_quality: int = 20, max_quality: int = 80,
+                             target_latency_ms: float = 100.0, target_kbps: float = 0.0,
+                             mode: str = "jpeg", keyframe_interval: int = 60,
+                             envelope: bool = False, batch: int = 1, batch_ms: float = 100.0,
+                             fps: float = 0.0, paused: bool = False):
     """
     RPi 서버 -> 중앙 서버로 WebSocket 실시간 영상 프레임을 송신합니다.
+
+    웹캠은 카메라별 브로드캐스터가 한 번만 열고 읽으며, 각 연결은 자신의 큐에서 프레임을 꺼내 송신만 합니다.
+    /ws/stream/{cam_id}로 카메라를 선택하며, /ws/stream은 기본 카메라를 송신합니다.
+    쿼리 파라미터로 큐 동작을 설정할 수 있습니다. (예: /ws/stream?drop_policy=drop_oldest&queue_size=4)
+
+    - drop_policy: latest(기본값) / drop_oldest / disconnect
+    - queue_size: 클라이언트별 큐 크기
+    - max_drops: disconnect 정책에서 연결을 끊기까지 허용하는 연속 드롭 수
+    - quality / width / color: JPEG 품질(1~100), 가로 해상도(0이면 원본), color 또는 gray
+      같은 변형을 요청한 클라이언트끼리는 프레임당 한 번만 인코딩된 버퍼를 공유합니다.
+    - adaptive: true면 송신 지연/적체에 따라 품질과 해상도를 자동 조절합니다.
+      (min_quality, max_quality, target_latency_ms, target_kbps로 범위와 목표 설정)
+    - mode: jpeg(기본값, 프레임마다 JPEG 한 장) / tiles(바뀐 타일만 전송, keyframe_interval 프레임마다 전체 전송)
+      / h264(H.264 프레임 단위 전송, 카메라별 FFmpeg 하나를 공유하며 설정은 H264_PROFILE 프로파일을 따름)
+      tiles 모드에서는 클라이언트가 {"cmd": "keyframe"} 메시지를 보내 키프레임을 요청할 수 있습니다.
+      h264 모드는 마지막 키프레임부터 보내므로 연결 즉시 디코딩할 수 있고, 큐에서 프레임이 버려지면 다음 키프레임까지 건너뜁니다.
+      처음 보내는 키프레임부터의 프레임은 queue_size와 별도이며, 다 보내면 큐는 queue_size로 돌아옵니다. (느린 클라이언트가 실시간보다 밀리지 않도록)
+      (h264 모드에서 drop_policy=latest는 drop_oldest로 처리하며 quality/width/color/adaptive는 적용되지 않습니다)
+    - envelope: true면 각 프레임 앞에 순번/캡처 시각/인코딩 시간/해상도/코덱 헤더를 붙입니다. (FrameEnvelope.py)
+    - batch: 2 이상이면 최대 batch개의 봉투를 한 메시지로 묶어 보냅니다. (batch_ms가 지나면 모자라도 전송)
+    - fps: 이 클라이언트가 받을 최대 초당 프레임 수 (0이면 카메라가 발행하는 모든 프레임)
+      브로드캐스터는 카메라 속도로 발행하고, 요청 속도에 맞지 않는 프레임은 이 클라이언트용으로 인코딩하지 않습니다.
+    - paused: true면 프레임 없이 연결만 맺습니다.
+      연결 중에는 {"cmd": "rate", "fps": N}, {"cmd": "pause"}, {"cmd": "resume"} 메시지로 바꿀 수 있습니다.
+      (h264 모드는 프레임 간 참조 때문에 fps를 지원하지 않으며, 재개하면 다음 키프레임부터 보냅니다)
+
+    FRAME_SOURCE가 녹화 재생(replay:)이면 저장된 JPEG를 그대로 보내며 quality/width/color 설정은 적용되지 않고,
+    tiles 모드와 adaptive는 연결을 거부합니다.
     """
-    global is_streaming
-    global frame_rate
-    
     # 웹소켓 연결 수락 (중앙 서버와의 연결)
     await websocket.accept()
+    accepted_at = time.monotonic()
     print(f"\n✅ 중앙 서버의 웹소켓 연결 수락: {websocket.client}")
-    
-    # 웹캠 캡처 객체 생성
-    cap = cv2.VideoCapture(0) 
-    
-    # 웹캠 연결 확인
-    if not cap.isOpened():
+
+    camera = CAMERA_REGISTRY.get(cam_id)
+    if camera is None:
+        print(f"등록되지 않은 카메라입니다: {cam_id}. WebSocket 연결을 종료합니다.")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Unknown camera")
+        return
+    broadcaster = camera.broadcaster
+
+    # 웹캠(프레임 공급원) 동작 확인
+    if not broadcaster.is_running():
         print("웹캠 연결을 찾을 수 없습니다. WebSocket 연결을 종료합니다.")
         await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Webcam not available")
         return
 
+    # 브로드캐스터 구독 등록 (h264 모드는 카메라의 H.264 인코더 구독)
+    h264_encoder = None
+    try:
+        if mode not in ("jpeg", "tiles", "h264"):
+            raise ValueError(f"지원하지 않는 전송 모드입니다: {mode}")
+        if mode == "h264" and adaptive:
+            raise ValueError("h264 모드는 H264_PROFILE의 비트레이트를 따르므로 adaptive를 사용할 수 없습니다.")
+        if mode == "h264" and fps > 0:
+            raise ValueError("h264 모드는 프레임이 앞 프레임을 참조하므로 fps로 프레임을 건너뛸 수 없습니다.")
+        if mode == "tiles" and broadcaster.source.encoded:
+            raise ValueError("녹화 재생 공급원은 저장된 JPEG를 그대로 보내므로 tiles 모드를 사용할 수 없습니다.")
+        if adaptive and broadcaster.source.encoded:
+            raise ValueError("녹화 재생 공급원은 저장된 JPEG를 그대로 보내므로 adaptive를 사용할 수 없습니다.")
+        if not 1 <= batch <= 64:
+            raise ValueError("batch는 1에서 64 사이의 값이어야 합니다.")
+        variant = make_variant(quality=quality, width=width, color=color)
+        controller = None
+        if adaptive:
+            controller = AdaptiveQualityController(quality=quality, min_quality=min_quality,
+                                                   max_quality=max_quality,
+                                                   target_latency_ms=target_latency_ms,
+                                                   target_kbps=target_kbps, gray=variant.gray)
+        if mode == "h264":
+            # 프레임이 앞 프레임을 참조하므로 최신 프레임만 남기는 정책 대신 오래된 프레임부터 버림
+            h264_encoder = get_h264_encoder(camera.cam_id, broadcaster)
+            subscriber = await h264_encoder.subscribe(str(websocket.client),
+                                                      drop_policy="drop_oldest" if drop_policy == "latest" else drop_policy,
+                                                      queue_size=queue_size, max_drops=max_drops, paused=paused)
+        else:
+            subscriber = broadcaster.subscribe(str(websocket.client), drop_policy=drop_policy,
+                                               queue_size=queue_size, max_drops=max_drops,
+                                               variant=variant, controller=controller,
+                                               shared_encode=(mode == "jpeg"), max_fps=fps, paused=paused)
+    except ValueError as e:
+        print(f"❌ 잘못된 구독 설정: {e}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid subscriber options")
+        return
+    except RuntimeError as e:
+        print(f"❌ {e} WebSocket 연결을 종료합니다.")
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="H.264 encoder not available")
+        return
+
+    # 타일 델타 모드: 연결별로 마지막에 보낸 프레임을 기준으로 바뀐 타일만 인코딩
+    tile_encoder = None
+    handlers = {
+        "pause": lambda command: subscriber.set_paused(True),
+        "resume": lambda command: subscriber.set_paused(False),
+    }
+    if h264_encoder is None:
+        handlers["rate"] = lambda command: subscriber.set_rate(float(command.get("fps", 0)))
+    if mode == "tiles":
+        tile_encoder = TileDeltaEncoder(variant=variant, keyframe_interval=keyframe_interval)
+        handlers["keyframe"] = lambda command: tile_encoder.request_keyframe()
+
+    control_task = asyncio.create_task(receive_controls(websocket, subscriber, handlers))
+
+    # 배치 모드에서 아직 보내지 않은 봉투 목록
+    use_envelope = envelope or batch > 1
+    codec = CODEC_TILES if tile_encoder is not None else CODEC_H264 if h264_encoder is not None else CODEC_JPEG
+    pending = []
+    pending_since = 0.0
+    # h264 모드: 첫 프레임과 큐에서 프레임이 버려지거나 일시 중지로 건너뛴 뒤에는 키프레임부터 보내야 디코딩이 깨지지 않음
+    waiting_keyframe = True
+    missed_seen = 0
+    # 봉투의 연결별 순번: 보낸 프레임과 큐에서 버려진 프레임만큼 늘어남
+    # (요청 속도/일시 중지로 건너뛴 프레임, 타일 변화 없음이나 키프레임 대기로 보내지 않은 프레임은 누락이 아니므로 세지 않음)
+    stream_seq = 0
+    dropped_seen = 0
+
+    def take_pending():
+        """모아둔 봉투를 메시지 하나로 묶고 비웁니다. (메시지, 프레임 수)"""
+        nonlocal pending
+        message = pack_batch(pending) if batch > 1 else b"".join(pending[0])
+        frame_count = len(pending)
+        pending = []
+        return message, frame_count
+
+    async def send(message, frame_count: int) -> None:
+        nonlocal accepted_at
+        # 4. 중앙 서버로 데이터 "송신"
+        send_started = time.monotonic()
+        await websocket.send_bytes(message)
+        SEND_SECONDS.observe(time.monotonic() - send_started)
+        FRAMES_SENT.inc(frame_count)
+        BYTES_SENT.inc(len(message))
+        if accepted_at:
+            # 연결 수락부터 첫 프레임 송신 완료까지 (클라이언트가 체감하는 첫 프레임 지연)
+            FIRST_FRAME_SECONDS.observe(time.monotonic() - accepted_at)
+            accepted_at = 0.0
+
+        # 5. 적응형 모드: 송신 완료 시간과 큐 상태를 반영하여 다음 프레임의 품질/해상도 조절
+        if subscriber.controller:
+            subscriber.controller.update(time.monotonic() - send_started, len(message),
+                                         subscriber.queued, subscriber.frames_dropped)
+
+    close_code = status.WS_1000_NORMAL_CLOSURE
     try:
         while True:
-            # 1. REST API로 제어된 전송 상태 확인
-            if is_streaming:
-                # 2. 웹캠에서 프레임 읽기
-                ret, frame = cap.read()
-                
-                if ret:
-                    # 3. 프레임을 JPEG로 인코딩 (바이트 데이터 준비)
-                    # 품질을 50으로 설정하여 대역폭을 절약합니다. (0~100)
-                    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 50]
-                    ret, buffer = cv2.imencode('.jpg', frame, encode_param)
-                    image_data = buffer.tobytes()
-                    
-                    # 4. 중앙 서버로 데이터 "송신"
-                    await websocket.send_bytes(image_data)
-
-                else:
-                    pass
-            
-            await asyncio.sleep(1/frame_rate) 
-            
+            # 1. 자신의 큐에 새 프레임이 들어올 때까지 대기
+            #    (카메라 전체의 전송 상태와 속도 상한은 REST API로, 이 클라이언트의 속도와 일시 중지는 제어 메시지로 제어됩니다)
+            #    배치를 모으는 중이면 batch_ms가 남은 만큼만 기다리고, 그때까지 프레임이 없으면 모자란 배치를 보냄
+            #    (일시 중지, 낮은 fps, 모션 게이트로 프레임이 끊겨도 이미 모은 프레임이 묶여 있지 않도록)
+            if pending:
+                remaining = batch_ms / 1000 - (time.monotonic() - pending_since)
+                try:
+                    frame = await asyncio.wait_for(subscriber.get(), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    await send(*take_pending())
+                    continue
+            else:
+                frame = await subscriber.get()
+
+            # 2. 요청한 변형으로 인코딩
+            if subscriber.controller and frame.image is not None:
+                subscriber.variant = subscriber.controller.variant(frame.image.shape[1])
+
+            if h264_encoder is not None:
+                # 인코더가 이미 프레임 단위로 나눠 둔 H.264 데이터를 그대로 전송
+                encoded = frame.encoded
+                missed = subscriber.frames_dropped + subscriber.frames_skipped
+                if missed != missed_seen:
+                    missed_seen = missed
+                    waiting_keyframe = True
+                if waiting_keyframe and not encoded.keyframe:
+                    continue
+                waiting_keyframe = False
+            elif tile_encoder is not None:
+                # 바뀐 타일만 인코딩 (바뀐 타일이 없으면 보내지 않음)
+                tile_encoder.variant = subscriber.variant
+                encoded = await broadcaster.run_encode(tile_encoder.encode, frame.image)
+            else:
+                # 다른 클라이언트가 같은 변형을 이미 인코딩했다면 캐시된 버퍼 사용
+                encoded = await broadcaster.encode(frame, subscriber.variant)
+            if encoded is None:
+                continue
+
+            # 3. 봉투/배치 모드: 헤더를 붙이고, 배치가 찰 때까지 모아둠
+            if use_envelope:
+                if not pending:
+                    pending_since = time.monotonic()
+                stream_seq += 1 + subscriber.frames_dropped - dropped_seen
+                dropped_seen = subscriber.frames_dropped
+                pending.append(pack_envelope(encoded.data, stream_seq, frame.timestamp, encoded.encode_seconds,
+                                             encoded.width, encoded.height, codec,
+                                             FLAG_KEYFRAME if encoded.keyframe else 0))
+                if len(pending) < batch and time.monotonic() - pending_since < batch_ms / 1000:
+                    continue
+                await send(*take_pending())
+            else:
+                await send(encoded.data, 1)
+
+    except SubscriberClosed as e:
+        # 드롭 정책(disconnect)에 의한 느린 클라이언트 해제 또는 클라이언트 측 연결 종료
+        print(f"\n⚠️ 구독 종료: {websocket.client} - {e}")
+        close_code = status.WS_1013_TRY_AGAIN_LATER
+        if pending:
+            # 연결을 닫기 전에 이미 모은 프레임은 보냄 (클라이언트가 먼저 끊었으면 보내지 못해도 무시)
+            try:
+                await send(*take_pending())
+            except Exception:
+                pass
+
     except Exception as e:
         # 웹소켓 연결 단절, 예외 처리
         print(f"\n❌ 웹소켓 연결 종료/오류 발생: {websocket.client} - {e}")
-        
+
     finally:
-        # 웹캠 객체 해제 및 웹소켓 연결 종료
-        cap.release()
-        await websocket.close()
-        print(f"연결 종료 및 웹캠 해제 완료: {websocket.client}")
+        # 구독 해제 및 웹소켓 연결 종료 (웹캠은 브로드캐스터가 계속 유지합니다)
+        control_task.cancel()
+        if h264_encoder is not None:
+            await h264_encoder.unsubscribe(subscriber)
+        else:
+            broadcaster.unsubscribe(subscriber)
+        try:
+            await websocket.close(code=close_code)
+        except (RuntimeError, WebSocketDisconnect):
+            # 이미 닫힌 연결
+            pass
+        print(f"연결 종료 및 구독 해제 완료: {websocket.client} "
+              f"(전송 {subscriber.frames_delivered}, 드롭 {subscriber.frames_dropped}, 건너뜀 {subscriber.frames_skipped})")
+
+
+# 모듈 임포트(의존 모듈, 카메라/라우트 설정)에 걸린 시간
+IMPORT_SECONDS = time.monotonic() - IMPORT_STARTED
 
 
 if __name__ == "__main__":
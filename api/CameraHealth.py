@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from FrameSource import FrameSource
+
+
+class CaptureHealth:
+    """
+    캡처 루프가 기록하는 장치 상태입니다. (마지막 프레임 시각, 최근 읽기 실패율, 협상된 해상도/fps, 실측 fps)
+
+    캡처 스레드는 읽을 때마다 record_frame() / record_error()로 몇 개의 값만 갱신하고,
+    /api/webcam_status는 snapshot()으로 저장된 값을 계산만 하므로 장치를 다시 열지 않고 바로 응답합니다.
+    """
+
+    def __init__(self, window: int = 120, stale_after: float = 2.0):
+        self.window = window                # 실패율/실측 fps를 계산할 최근 읽기 횟수
+        self.stale_after = stale_after      # 마지막 프레임 이후 이 시간(초)이 지나면 비정상으로 판단
+        self._lock = threading.Lock()
+        # 장치 다시 열기 기록 (시작 실패/연속 읽기 실패 후 재시도, reset()으로 지우지 않음)
+        self.reopen_attempts = 0
+        self.reopens = 0                    # 다시 열기에 성공한 횟수
+        self.last_reopen_at: Optional[float] = None
+        self.next_reopen_at: Optional[float] = None     # 다시 열기를 기다리는 중이면 예정 시각
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._outcomes: deque = deque(maxlen=self.window)       # 최근 읽기 결과 (True: 성공)
+            self._frame_times: deque = deque(maxlen=self.window)    # 최근 성공 프레임 시각 (time.monotonic)
+            self.properties: dict = {}      # 공급원이 보고한 협상 설정 (width, height, fps)
+            self.width = 0                  # 마지막 프레임의 실제 해상도
+            self.height = 0
+            self.frames = 0
+            self.errors = 0
+            self.last_frame_at: Optional[float] = None
+            self.last_error_at: Optional[float] = None
+            self.started_at = time.monotonic()
+
+    def set_properties(self, properties: dict) -> None:
+        self.properties = dict(properties)
+
+    def record_frame(self, width: int, height: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes.append(True)
+            self._frame_times.append(now)
+            self.width = width
+            self.height = height
+            self.frames += 1
+            self.last_frame_at = now
+
+    def record_error(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            self.errors += 1
+            self.last_error_at = time.monotonic()
+
+    def schedule_reopen(self, at: float) -> None:
+        self.next_reopen_at = at
+
+    def record_reopen(self, success: bool) -> None:
+        with self._lock:
+            self.reopen_attempts += 1
+            if success:
+                self.reopens += 1
+            self.last_reopen_at = time.monotonic()
+            self.next_reopen_at = None
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            reads = len(self._outcomes)
+            failures = reads - sum(self._outcomes)
+            measured_fps = 0.0
+            if len(self._frame_times) >= 2:
+                span = self._frame_times[-1] - self._frame_times[0]
+                measured_fps = (len(self._frame_times) - 1) / span if span > 0 else 0.0
+            last_frame_at = self.last_frame_at
+            next_reopen_at = self.next_reopen_at
+
+        frame_age = now - last_frame_at if last_frame_at is not None else None
+        return {
+            "healthy": frame_age is not None and frame_age <= self.stale_after,
+            "last_frame_age_seconds": round(frame_age, 3) if frame_age is not None else None,
+            "error_rate": round(failures / reads, 3) if reads else 0.0,
+            "width": self.width,
+            "height": self.height,
+            "measured_fps": round(measured_fps, 2),
+            "negotiated": self.properties,
+            "frames": self.frames,
+            "errors": self.errors,
+            "uptime_seconds": round(now - self.started_at, 1),
+            "reopening": next_reopen_at is not None,
+            "next_reopen_in_seconds": round(max(next_reopen_at - now, 0.0), 1) if next_reopen_at is not None else None,
+            "reopen_attempts": self.reopen_attempts,
+            "reopens": self.reopens,
+        }
+
+
+class CameraProbe:
+    """
+    캡처 파이프라인이 동작하지 않을 때 사용하는 장치 확인기입니다.
+
+    조회 요청은 캐시된 결과를 즉시 반환하고, 결과가 ttl초보다 오래되었으면 백그라운드 스레드에서
+    장치를 잠깐 열어 프레임 하나를 읽은 뒤 결과를 갱신합니다. 동시에 하나의 확인만 실행됩니다.
+    """
+
+    def __init__(self, source_factory: Callable[[], FrameSource], ttl: float = 30.0, read_attempts: int = 5):
+        self.source_factory = source_factory
+        self.ttl = ttl
+        self.read_attempts = read_attempts
+        self._result: Optional[dict] = None
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.probes = 0
+
+    def get(self) -> Optional[dict]:
+        """캐시된 확인 결과를 반환합니다. (아직 확인 전이면 None) 오래된 결과면 백그라운드 확인을 예약합니다."""
+        now = time.monotonic()
+        stale = self._checked_at is None or now - self._checked_at > self.ttl
+        if stale and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh())
+
+        if self._result is None:
+            return None
+        return {**self._result, "checked_seconds_ago": round(now - self._checked_at, 1)}
+
+    async def _refresh(self) -> None:
+        result = await asyncio.to_thread(self._probe)
+        self._result = result
+        self._checked_at = time.monotonic()
+        self.probes += 1
+
+    def _probe(self) -> dict:
+        """장치를 열고 프레임 하나를 읽어 해상도와 협상된 설정을 확인합니다. (스레드에서 실행)"""
+        started = time.monotonic()
+        source = self.source_factory()
+        try:
+            opened = source.open()
+            frame = None
+            if opened:
+                for _ in range(self.read_attempts):
+                    ret, frame = source.read()
+                    if ret:
+                        break
+                    frame = None
+            properties = source.get_properties() if opened else {}
+        except Exception as e:
+            print(f"❌ 장치 확인 중 오류 발생: {e}")
+            opened, frame, properties = False, None, {}
+        finally:
+            source.release()
+
+        if frame is None:
+            width, height = 0, 0
+        elif source.encoded:
+            width, height = frame.width, frame.height
+        else:
+            height, width = frame.shape[:2]
+        return {
+            "healthy": frame is not None,
+            "opened": opened,
+            "width": width,
+            "height": height,
+            "negotiated": properties,
+            "probe_seconds": round(time.monotonic() - started, 3),
+        }
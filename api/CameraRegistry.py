@@ -0,0 +1,100 @@
+import asyncio
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from CameraHealth import CameraProbe
+from FrameBroadcaster import FrameBroadcaster
+from FrameSource import create_frame_source
+
+
+class Camera(NamedTuple):
+    """레지스트리에 등록된 카메라 하나입니다. 카메라마다 캡처/인코딩 파이프라인(브로드캐스터)이 독립적으로 동작합니다."""
+    cam_id: str
+    source_spec: str                # 프레임 공급원 설정 (예: "camera:2")
+    broadcaster: FrameBroadcaster
+    probe: CameraProbe              # 캡처가 멈춰 있을 때 장치 상태 확인용
+
+
+def parse_cpu_list(value: str) -> Tuple[int, ...]:
+    """ "2", "2,3", "0-1" 형태의 CPU 목록을 해석합니다."""
+    cpus = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return tuple(sorted(cpus))
+
+
+def parse_camera_specs(value: str) -> List[Tuple[str, str, Tuple[int, ...]]]:
+    """
+    CAMERAS 환경변수를 (cam_id, 공급원 설정, CPU 목록) 목록으로 해석합니다.
+    카메라는 ";"로 구분하고, "|" 뒤에 CPU 목록을 지정합니다.
+
+    예: "front=camera:0|2;back=camera:2|3" -> front는 0번 장치를 CPU 2에서, back은 2번 장치를 CPU 3에서 처리
+    """
+    cameras = []
+    for entry in value.split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        cam_id, separator, rest = entry.partition("=")
+        if not separator or not cam_id.strip():
+            raise ValueError(f"잘못된 카메라 설정입니다: {entry} (예: front=camera:0|2)")
+        spec, _, cpus = rest.partition("|")
+        cameras.append((cam_id.strip(), spec.strip(), parse_cpu_list(cpus)))
+    return cameras
+
+
+class CameraRegistry:
+    """
+    카메라 ID로 카메라별 파이프라인을 찾는 레지스트리입니다.
+    처음 등록된 카메라가 기본 카메라이며, 카메라 ID가 없는 기존 엔드포인트(/ws/stream 등)는 기본 카메라를 사용합니다.
+    """
+
+    def __init__(self, probe_ttl: float = 30.0):
+        self.probe_ttl = probe_ttl
+        self.cameras: Dict[str, Camera] = {}
+        self.default_id: Optional[str] = None
+
+    def add(self, cam_id: str, source_spec: str, broadcaster: FrameBroadcaster) -> Camera:
+        if cam_id in self.cameras:
+            raise ValueError(f"이미 등록된 카메라 ID입니다: {cam_id}")
+        probe = CameraProbe(lambda: create_frame_source(source_spec), ttl=self.probe_ttl)
+        camera = Camera(cam_id, source_spec, broadcaster, probe)
+        self.cameras[cam_id] = camera
+        if self.default_id is None:
+            self.default_id = cam_id
+        return camera
+
+    def get(self, cam_id: Optional[str] = None) -> Optional[Camera]:
+        """카메라를 찾습니다. cam_id가 없으면 기본 카메라를 반환합니다."""
+        return self.cameras.get(cam_id if cam_id is not None else self.default_id)
+
+    async def start_all(self) -> None:
+        """모든 카메라의 파이프라인을 동시에 시작합니다. (장치 열기가 서로를 기다리지 않도록)"""
+        results = await asyncio.gather(*(camera.broadcaster.start() for camera in self.cameras.values()))
+        for camera, started in zip(self.cameras.values(), results):
+            if not started:
+                print(f"❌ 카메라 {camera.cam_id}({camera.source_spec})를 시작하지 못했습니다. "
+                      f"(reopen_after_failures가 0이 아니면 백그라운드에서 다시 시도)")
+
+    async def stop_all(self) -> None:
+        await asyncio.gather(*(camera.broadcaster.stop() for camera in self.cameras.values()))
+
+    def get_stats(self) -> dict:
+        return {
+            cam_id: {
+                "source": camera.source_spec,
+                "cpus": list(camera.broadcaster.cpus),
+                "running": camera.broadcaster.is_running(),
+                "is_streaming": camera.broadcaster.is_streaming,
+                "frame_rate": camera.broadcaster.frame_rate,
+                "achieved_fps": camera.broadcaster.pacer.get_stats()["achieved_fps"],
+                "subscribers": camera.broadcaster.client_count(),
+                "startup": camera.broadcaster.startup,
+                "health": camera.broadcaster.health.snapshot(),
+            }
+            for cam_id, camera in self.cameras.items()
+        }
+
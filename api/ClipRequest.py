@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class ClipRequest(BaseModel):
+    timestamp: Optional[float] = None  # 기준 시각 (없으면 현재 시각)
+    clock: str = "wall"                # "wall": time.time() 기준, "monotonic": 봉투의 캡처 시각(서버 monotonic) 기준
+    before: float = Field(10.0, ge=0)  # 기준 시각 이전 구간 (초)
+    after: float = Field(0.0, ge=0)    # 기준 시각 이후 구간 (초, 미래라면 그만큼 기다렸다가 내보냄, 링 버퍼 보관 시간 이하)
+    format: str = "avi"                # "avi": MJPEG AVI 파일, "mjpeg": multipart 스트리밍 응답
+    cam_id: Optional[str] = None       # 카메라 ID (없으면 기본 카메라)
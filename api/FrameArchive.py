@@ -0,0 +1,293 @@
+import mmap
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+# 세그먼트 파일 구성 (세그먼트 하나 = 파일 두 개)
+#   <시작시각ms>.mjpeg : 인코딩된 JPEG를 이어 붙인 데이터 파일 (ffmpeg -f mjpeg로도 바로 읽을 수 있음)
+#   <시작시각ms>.idx   : 프레임마다 32바이트 고정 크기 레코드를 이어 붙인 타임스탬프 인덱스
+INDEX_DTYPE = np.dtype([
+    ("timestamp", "<f8"),   # 캡처 시각 (time.time)
+    ("seq", "<u8"),         # 브로드캐스터 프레임 번호
+    ("offset", "<u8"),      # 데이터 파일 내 위치
+    ("length", "<u4"),      # JPEG 길이
+    ("width", "<u2"),
+    ("height", "<u2"),
+])
+DATA_SUFFIX = ".mjpeg"
+INDEX_SUFFIX = ".idx"
+
+
+class ArchivedFrame(NamedTuple):
+    """아카이브에서 읽은 프레임입니다. data는 데이터 파일을 메모리 매핑한 memoryview입니다. (복사 없음)"""
+    seq: int
+    timestamp: float    # 캡처 시각 (time.time)
+    width: int
+    height: int
+    data: memoryview
+
+
+class FrameArchive:
+    """
+    인코딩된 프레임을 일정 시간/크기 단위의 세그먼트 파일에 이어 쓰는 녹화 저장소입니다.
+
+    append()는 큐에 넣기만 하고 돌아오며, 백그라운드 기록 스레드가 쌓인 프레임을 모아 한 번의 write로 기록합니다.
+    프레임마다 JPEG 파일을 만드는 방식과 달리 SD 카드에 작은 파일과 잦은 쓰기가 생기지 않습니다.
+    세그먼트가 교체될 때 보관 기간(retention_hours)과 전체 용량(max_total_mb)을 넘은 오래된 세그먼트를 삭제합니다.
+    read_range()는 세그먼트 이름(시작 시각)으로 대상을 고르고, 메모리 매핑한 인덱스를 이진 탐색하여 구간을 찾습니다.
+    """
+
+    def __init__(self, root_dir: str, segment_seconds: float = 60.0, segment_mb: int = 64,
+                 retention_hours: float = 24.0, max_total_mb: int = 0,
+                 batch_frames: int = 16, flush_interval: float = 1.0, max_pending: int = 256):
+        self.root_dir = root_dir
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_mb * 1024 * 1024
+        self.retention_seconds = retention_hours * 3600
+        self.max_total_bytes = max_total_mb * 1024 * 1024   # 0이면 용량 제한 없음
+        self.batch_frames = batch_frames                    # 한 번에 모아 쓰는 최대 프레임 수
+        self.flush_interval = flush_interval                # 프레임이 모자라도 이 간격(초)마다 기록
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # 기록 스레드만 사용하는 현재 세그먼트 상태
+        self._segment_name: Optional[str] = None
+        self._segment_start = 0.0
+        self._data_file = None
+        self._index_file = None
+        self._data_size = 0
+        # 세그먼트 목록 (기록 스레드가 세그먼트를 만들고 지울 때 새 리스트로 교체, get_stats가 디스크를 읽지 않도록)
+        self._segments: List[str] = self.list_segments()
+
+        self.frames_written = 0
+        self.frames_dropped = 0     # 기록 대기열이 가득 차서 버린 프레임 (저장 장치가 너무 느린 경우)
+        self.bytes_written = 0
+        self.batches_written = 0
+        self.segments_created = 0
+        self.segments_deleted = 0
+        self.write_errors = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._writer_loop, name="frame-archive", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """대기 중인 프레임을 모두 기록한 뒤 기록 스레드를 종료합니다."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def append(self, seq: int, timestamp: float, width: int, height: int, data) -> bool:
+        """인코딩된 프레임을 기록 대기열에 넣습니다. 대기하지 않으며, 대기열이 가득 차면 버리고 False를 반환합니다."""
+        try:
+            self._queue.put_nowait((seq, timestamp, width, height, data))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def _writer_loop(self) -> None:
+        """기록 스레드: 대기열에서 프레임을 batch_frames개(또는 flush_interval초)씩 모아 세그먼트에 기록합니다."""
+        try:
+            while not (self._stop_event.is_set() and self._queue.empty()):
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_frames:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stop_event.is_set() and self._queue.empty():
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                try:
+                    self._write_batch(batch)
+                except OSError as e:
+                    # 저장 공간 부족 등: 현재 세그먼트를 닫고 다음 배치에서 새 세그먼트로 다시 시도
+                    self.write_errors += 1
+                    print(f"❌ 프레임 아카이브 기록 실패: {e}")
+                    self._close_segment()
+        finally:
+            self._close_segment()
+
+    def _write_batch(self, batch: list) -> None:
+        first_timestamp = batch[0][1]
+        if (self._data_file is None
+                or first_timestamp - self._segment_start >= self.segment_seconds
+                or self._data_size >= self.segment_bytes):
+            self._open_segment(first_timestamp)
+
+        records = np.zeros(len(batch), dtype=INDEX_DTYPE)
+        offset = self._data_size
+        for i, (seq, timestamp, width, height, data) in enumerate(batch):
+            records[i] = (timestamp, seq, offset, len(data), width, height)
+            offset += len(data)
+
+        # 데이터를 먼저 기록해야 인덱스를 읽는 쪽이 아직 쓰이지 않은 위치를 가리키지 않습니다.
+        self._data_file.write(b"".join(item[4] for item in batch))
+        self._data_file.flush()
+        self._index_file.write(records.tobytes())
+        self._index_file.flush()
+
+        self.bytes_written += offset - self._data_size
+        self._data_size = offset
+        self.frames_written += len(batch)
+        self.batches_written += 1
+
+    def _open_segment(self, timestamp: float) -> None:
+        self._close_segment()
+        name = f"{int(timestamp * 1000):013d}"
+        path = os.path.join(self.root_dir, name)
+        self._data_file = open(path + DATA_SUFFIX, "ab")
+        self._index_file = open(path + INDEX_SUFFIX, "ab")
+        self._data_size = self._data_file.tell()
+        self._segment_name = name
+        self._segment_start = timestamp
+        self.segments_created += 1
+        self._apply_retention()
+
+    def _close_segment(self) -> None:
+        for f in (self._data_file, self._index_file):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self._data_file = None
+        self._index_file = None
+        self._segment_name = None
+
+    def _apply_retention(self) -> None:
+        """보관 기간이 지났거나 전체 용량을 넘긴 오래된 세그먼트를 삭제합니다. (현재 세그먼트 제외)"""
+        segments = self.list_segments()
+        sizes = {name: self._segment_size(name) for name in segments}
+        total = sum(sizes.values())
+        now = time.time()
+
+        deleted = 0
+        for i, name in enumerate(segments):
+            if name == self._segment_name:
+                break
+            # 세그먼트의 끝 시각 = 다음 세그먼트의 시작 시각
+            segment_end = int(segments[i + 1]) / 1000 if i + 1 < len(segments) else now
+            expired = self.retention_seconds and now - segment_end > self.retention_seconds
+            over_quota = self.max_total_bytes and total > self.max_total_bytes
+            if not (expired or over_quota):
+                break
+
+            for suffix in (DATA_SUFFIX, INDEX_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.root_dir, name + suffix))
+                except FileNotFoundError:
+                    pass
+            total -= sizes[name]
+            deleted += 1
+            self.segments_deleted += 1
+
+        # 오래된 것부터 지우므로 남은 세그먼트는 앞부분을 뺀 나머지
+        self._segments = segments[deleted:]
+
+    def _segment_size(self, name: str) -> int:
+        size = 0
+        for suffix in (DATA_SUFFIX, INDEX_SUFFIX):
+            try:
+                size += os.path.getsize(os.path.join(self.root_dir, name + suffix))
+            except OSError:
+                pass
+        return size
+
+    def list_segments(self) -> List[str]:
+        """세그먼트 이름(시작 시각 ms) 목록을 오래된 순으로 반환합니다."""
+        try:
+            names = os.listdir(self.root_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(INDEX_SUFFIX)] for name in names
+                      if name.endswith(INDEX_SUFFIX) and name[:-len(INDEX_SUFFIX)].isdigit())
+
+    def read_range(self, start: float, end: float) -> List[ArchivedFrame]:
+        """[start, end] (time.time 기준) 구간의 프레임을 시간 순으로 반환합니다."""
+        return list(self.iter_range(start, end))
+
+    def iter_range(self, start: float = float("-inf"), end: float = float("inf")) -> Iterator[ArchivedFrame]:
+        """read_range()와 같지만 세그먼트 단위로 매핑하며 하나씩 돌려줍니다. (긴 구간 재생용)"""
+        segments = self.list_segments()
+        for i, name in enumerate(segments):
+            segment_start = int(name) / 1000
+            segment_end = int(segments[i + 1]) / 1000 if i + 1 < len(segments) else float("inf")
+            if segment_start > end or segment_end < start:
+                continue
+            yield from self._read_segment(name, start, end)
+
+    def _read_segment(self, name: str, start: float, end: float) -> List[ArchivedFrame]:
+        path = os.path.join(self.root_dir, name)
+        index = _map_file(path + INDEX_SUFFIX)
+        if index is None:
+            return []
+
+        # 기록 중인 세그먼트라면 마지막 레코드가 덜 쓰였을 수 있으므로 완전한 레코드만 사용합니다.
+        records = np.frombuffer(index, dtype=INDEX_DTYPE, count=len(index) // INDEX_DTYPE.itemsize)
+        first = int(np.searchsorted(records["timestamp"], start, side="left"))
+        last = int(np.searchsorted(records["timestamp"], end, side="right"))
+        if first >= last:
+            return []
+
+        data = _map_file(path + DATA_SUFFIX)
+        if data is None:
+            return []
+        view = memoryview(data)
+
+        frames = []
+        for record in records[first:last]:
+            offset, length = int(record["offset"]), int(record["length"])
+            if offset + length > len(view):
+                break
+            frames.append(ArchivedFrame(int(record["seq"]), float(record["timestamp"]),
+                                        int(record["width"]), int(record["height"]),
+                                        view[offset:offset + length]))
+        return frames
+
+    def get_stats(self) -> dict:
+        # 이벤트 루프에서 호출되므로 디렉터리를 읽지 않고 기록 스레드가 관리하는 목록을 사용
+        segments = self._segments
+        return {
+            "root_dir": self.root_dir,
+            "segments": len(segments),
+            "oldest": int(segments[0]) / 1000 if segments else None,
+            "pending": self._queue.qsize(),
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "bytes_written": self.bytes_written,
+            "avg_batch_frames": round(self.frames_written / self.batches_written, 2) if self.batches_written else 0.0,
+            "segments_created": self.segments_created,
+            "segments_deleted": self.segments_deleted,
+            "write_errors": self.write_errors,
+        }
+
+
+def _map_file(path: str) -> Optional[mmap.mmap]:
+    """파일 전체를 읽기 전용으로 메모리 매핑합니다. 없거나 비어 있으면 None을 반환합니다."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,751 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from AdaptiveQualityController import AdaptiveQualityController
+from CameraHealth import CaptureHealth
+from FrameArchive import FrameArchive
+from FrameBufferPool import FrameBufferPool
+from FramePacer import FramePacer
+from FrameRingBuffer import FrameRingBuffer
+from FrameSource import FrameSource
+from JpegEncodeCache import EncodedFrame, EncodeVariant, JpegEncodeCache, encode_variant
+from MotionGate import MotionGate
+from SharedMemoryEncodePool import SharedMemoryEncodePool
+from StreamMetrics import CAPTURE_ERRORS, CAPTURE_FRAMES, CAPTURE_READ_SECONDS, FRAMES_DROPPED
+
+
+class CapturedFrame(NamedTuple):
+    """브로드캐스터가 발행하는 프레임입니다. 인코딩은 구독자가 원하는 변형으로 필요할 때 수행됩니다."""
+    seq: int
+    image: Optional[np.ndarray]
+    timestamp: float    # 캡처 시각 (time.monotonic)
+    encoded: Optional[EncodedFrame] = None  # 이미 인코딩된 공급원(재생)의 프레임이면 image 대신 사용
+
+
+class SubscriberClosed(Exception):
+    """구독자가 드롭 정책에 의해 연결 해제되었을 때 발생합니다."""
+    pass
+
+
+class FrameSubscriber:
+    """
+    FrameBroadcaster에 연결된 구독자(웹소켓 클라이언트) 하나의 상태입니다.
+
+    구독자마다 크기가 제한된 큐를 가지며, 브로드캐스터는 큐에 넣기만 하고 송신을 기다리지 않습니다.
+    따라서 느린 클라이언트 하나가 캡처나 다른 클라이언트를 느리게 만들지 않습니다.
+    큐가 가득 찼을 때의 동작은 drop_policy로 정합니다.
+
+    - "latest"      : 큐에 최신 프레임 하나만 유지합니다. (낙상 감지처럼 신선한 프레임이 중요한 경우, 기본값)
+    - "drop_oldest" : 가장 오래된 프레임을 버리고 새 프레임을 넣습니다.
+    - "disconnect"  : 새 프레임을 버리고, 프레임을 가져가지 못한 채 max_drops번 버려지면 연결을 해제합니다.
+
+    브로드캐스터는 카메라 속도로 발행하며, 구독자마다 max_fps(0이면 모든 프레임)로 받을 속도를 정하고 paused로 멈출 수 있습니다.
+    속도에 맞지 않는 프레임은 큐에 넣기 전에 건너뛰므로(frames_skipped) 드롭으로 세지 않고 인코딩되지도 않습니다.
+
+    frame_pool이 주어지면 큐에 넣은 프레임과 마지막으로 꺼내간 프레임의 배열을 사용 중으로 표시합니다.
+    꺼내간 프레임은 다음 get() 호출(앞 프레임을 다 썼다는 뜻)이나 release()까지 사용 중으로 남습니다.
+    """
+
+    DROP_POLICIES = ("latest", "drop_oldest", "disconnect")
+
+    def __init__(self, name: str, queue_size: int = 2, drop_policy: str = "latest", max_drops: int = 30,
+                 variant: EncodeVariant = EncodeVariant(),
+                 controller: Optional[AdaptiveQualityController] = None, internal: bool = False,
+                 shared_encode: bool = True, max_fps: float = 0.0, paused: bool = False,
+                 frame_pool: Optional[FrameBufferPool] = None):
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"지원하지 않는 드롭 정책입니다: {drop_policy} (가능한 값: {', '.join(self.DROP_POLICIES)})")
+        if queue_size < 1 or max_drops < 1:
+            raise ValueError("queue_size와 max_drops는 1 이상이어야 합니다.")
+        self._validate_fps(max_fps)
+
+        self.name = name
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.max_drops = max_drops
+        self.variant = variant      # 이 구독자가 받을 JPEG 인코딩 변형
+        self.controller = controller  # 설정 시 송신 상태에 따라 variant를 자동 조절
+        self.internal = internal      # 서버 내부 구독자 (예: 링 버퍼 기록) 여부
+        self.shared_encode = shared_encode  # 공유 인코딩 캐시의 JPEG를 받는지 여부 (타일/원본 프레임 구독자는 False)
+        self.max_fps = max_fps      # 이 구독자가 받을 최대 초당 프레임 수 (0이면 발행되는 모든 프레임)
+        self.paused = paused        # True면 프레임을 받지 않음 (연결은 유지)
+        self.frame_pool = frame_pool  # 프레임 배열의 사용 중 표시 (브로드캐스터의 캡처 배열 풀)
+
+        self.frames_delivered = 0   # 송신을 위해 꺼내간 프레임 수
+        self.frames_dropped = 0     # 큐가 가득 차서 버려진 프레임 수
+        self.frames_skipped = 0     # 요청 속도(max_fps)나 일시 중지 때문에 받지 않은 프레임 수
+        self.closed = False
+        self.close_reason: Optional[str] = None
+
+        self._queue: deque = deque()
+        self._ready = asyncio.Event()
+        self._drained = asyncio.Event()   # 큐가 비었을 때 설정 (수신 측 속도에 맞춘 재생용)
+        self._drained.set()
+        self._drops_since_delivery = 0
+        self._subscribed_at = time.monotonic()
+        self.first_frame_seconds: Optional[float] = None   # 구독부터 첫 프레임을 꺼내가기까지 걸린 시간
+        self._next_due = 0.0        # 다음 프레임을 받을 캡처 시각 (max_fps 간격)
+        self._current: Optional[CapturedFrame] = None   # 마지막으로 꺼내가 아직 사용 중인 프레임
+        self._preloaded = 0         # preload()로 넣은 프레임 중 아직 큐에 남은 수
+        self._preload_allowance = 0  # preload()로 넣은 프레임이 남아 있는 동안 늘어난 큐 한도
+
+    @staticmethod
+    def _validate_fps(fps: float) -> None:
+        if not 0 <= fps <= 120:
+            raise ValueError("max_fps는 0(모든 프레임)에서 120 사이의 값이어야 합니다.")
+
+    def set_rate(self, fps: float) -> None:
+        """받을 최대 프레임 속도를 바꿉니다. (0이면 모든 프레임, 다음 프레임부터 반영)"""
+        self._validate_fps(fps)
+        self.max_fps = fps
+        self._next_due = 0.0
+
+    def set_paused(self, paused: bool) -> None:
+        self.paused = paused
+        self._next_due = 0.0
+
+    def _wants(self, timestamp: float) -> bool:
+        """
+        이 캡처 시각의 프레임을 받을지 정합니다.
+        다음 수신 시각을 간격만큼씩 앞으로 옮기므로 카메라 속도가 요청 속도의 배수가 아니어도 평균 속도가 밀리지 않으며,
+        캡처 간격의 흔들림으로 프레임을 하나씩 놓치지 않도록 간격의 1/4까지는 일찍 도착한 프레임도 받습니다.
+        """
+        if self.paused:
+            return False
+        if self.max_fps <= 0:
+            return True
+        interval = 1 / self.max_fps
+        if timestamp < self._next_due - interval / 4:
+            return False
+        self._next_due += interval
+        if self._next_due <= timestamp:
+            # 첫 프레임이거나 카메라가 요청보다 느리면 밀린 슬롯을 몰아서 받지 않고 지금부터 다시 셈
+            self._next_due = timestamp + interval
+        return True
+
+    def offer(self, frame: CapturedFrame) -> bool:
+        """
+        브로드캐스터가 호출합니다. 대기하지 않고 드롭 정책에 따라 큐에 넣습니다.
+        프레임을 큐에 넣지 않았으면(요청 속도, 일시 중지, disconnect 정책의 드롭) False를 반환합니다.
+        """
+        if self.closed:
+            return False
+        if not self._wants(frame.timestamp):
+            self.frames_skipped += 1
+            return False
+
+        if self.drop_policy == "latest":
+            if self._queue:
+                self.frames_dropped += len(self._queue)
+                FRAMES_DROPPED.inc(len(self._queue))
+                self._clear_queue()
+        elif len(self._queue) >= self.queue_size + self._preload_allowance:
+            if self.drop_policy == "drop_oldest":
+                # preload로 늘었던 한도가 끝났으면 쌓인 프레임도 함께 버려 queue_size로 돌아옴
+                while len(self._queue) >= self.queue_size + self._preload_allowance:
+                    self._release_frame(self._pop())
+                    self.frames_dropped += 1
+                    FRAMES_DROPPED.inc()
+            else:
+                self.frames_dropped += 1
+                FRAMES_DROPPED.inc()
+                self._drops_since_delivery += 1
+                if self._drops_since_delivery >= self.max_drops:
+                    self.close(f"{self.max_drops}개 프레임 연속 드롭")
+                return False
+
+        if self.frame_pool is not None and frame.image is not None:
+            self.frame_pool.retain(frame.image)
+        self._queue.append(frame)
+        self._ready.set()
+        self._drained.clear()
+        return True
+
+    def preload(self, frames: List[CapturedFrame]) -> None:
+        """
+        구독 직후 큐 크기와 관계없이 frames를 먼저 넣습니다. (예: H.264 마지막 키프레임부터의 프레임)
+        넣은 프레임이 큐에 남아 있는 동안만 그 수만큼 한도가 늘어나고, 모두 꺼내가거나 버려지면 원래 queue_size로 돌아갑니다.
+        """
+        for frame in frames:
+            if self.frame_pool is not None and frame.image is not None:
+                self.frame_pool.retain(frame.image)
+            self._queue.append(frame)
+        self._preloaded += len(frames)
+        self._preload_allowance = self._preloaded
+        if self._queue:
+            self._ready.set()
+            self._drained.clear()
+
+    async def get(self) -> CapturedFrame:
+        """
+        큐에서 다음 프레임을 꺼냅니다. 비어 있으면 새 프레임이 들어올 때까지 대기합니다.
+        호출하면 앞에서 꺼내간 프레임은 다 쓴 것으로 보고 배열의 사용 중 표시를 해제합니다.
+        """
+        self.release()
+        while not self._queue:
+            if self.closed:
+                raise SubscriberClosed(self.close_reason)
+            self._ready.clear()
+            await self._ready.wait()
+
+        if self.first_frame_seconds is None:
+            self.first_frame_seconds = time.monotonic() - self._subscribed_at
+        self.frames_delivered += 1
+        self._drops_since_delivery = 0
+        frame = self._pop()
+        if not self._queue:
+            self._drained.set()
+        self._current = frame
+        return frame
+
+    def _pop(self) -> CapturedFrame:
+        """큐 맨 앞의 프레임을 꺼냅니다. (preload로 넣은 프레임이 먼저 나옴)"""
+        if self._preloaded:
+            self._preloaded -= 1
+            if not self._preloaded:
+                self._preload_allowance = 0
+        return self._queue.popleft()
+
+    def release(self) -> None:
+        """마지막으로 꺼내간 프레임을 다 썼음을 알립니다. (구독 해제 시에는 브로드캐스터가 호출)"""
+        if self._current is not None:
+            self._release_frame(self._current)
+            self._current = None
+
+    def _release_frame(self, frame: CapturedFrame) -> None:
+        if self.frame_pool is not None and frame.image is not None:
+            self.frame_pool.release(frame.image)
+
+    def _clear_queue(self) -> None:
+        while self._queue:
+            self._release_frame(self._pop())
+
+    async def wait_drained(self) -> None:
+        """큐에 남은 프레임을 모두 가져갈 때까지 대기합니다."""
+        await self._drained.wait()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def close(self, reason: str) -> None:
+        self.closed = True
+        self.close_reason = reason
+        self._clear_queue()
+        self._ready.set()
+        self._drained.set()
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            "internal": self.internal,
+            "drop_policy": self.drop_policy,
+            "queue_size": self.queue_size,
+            "max_fps": self.max_fps,
+            "paused": self.paused,
+            "variant": self.variant._asdict(),
+            "queued": self.queued,
+            "frames_delivered": self.frames_delivered,
+            "frames_dropped": self.frames_dropped,
+            "frames_skipped": self.frames_skipped,
+            "first_frame_ms": round(self.first_frame_seconds * 1000, 1) if self.first_frame_seconds is not None else None,
+            "closed": self.closed,
+            "adaptive": self.controller.get_stats() if self.controller else None,
+        }
+
+
+class FrameBroadcaster:
+    """
+    하나의 프레임 공급원을 소유하고, 프레임을 한 번만 읽고 인코딩하여 모든 구독자에게 나눠주는 클래스입니다.
+    FastAPI lifespan에서 시작/종료되는 싱글톤으로 사용됩니다.
+
+    - 캡처: 전용 스레드에서 source.read()를 반복하며 최신 프레임만 보관합니다.
+    - 발행: 이벤트 루프는 새로 캡처된 프레임을 각 구독자의 큐에 넣기만 합니다. 기본적으로 카메라 속도로 발행하며
+      (frame_rate=0), 구독자마다 max_fps로 받을 속도를 줄입니다. frame_rate를 지정하면 카메라 전체의 상한이 됩니다.
+    - 인코딩: 크기가 제한된 스레드 풀에서 실행되며, 프레임마다 변형(품질/해상도/색상)별로 한 번만 인코딩하여
+      같은 변형을 원하는 클라이언트끼리 결과 버퍼를 공유합니다. 이벤트 루프는 완성된 버퍼를 기다리기만 합니다.
+      encode_processes를 지정하면 JPEG 인코딩은 공유 메모리 슬롯을 쓰는 워커 프로세스에서 병렬로 실행됩니다.
+    """
+
+    def __init__(self, source: FrameSource, frame_rate: float = 0, jpeg_quality: int = 50,
+                 encode_workers: int = 2, motion_gate: Optional[MotionGate] = None,
+                 ring_buffer: Optional[FrameRingBuffer] = None, archive: Optional[FrameArchive] = None,
+                 cpus: Tuple[int, ...] = (), encode_processes: int = 0, encode_slots: int = 0,
+                 frame_buffers: int = 8, record_fps: float = 0.0, warmup_frames: int = 0,
+                 reopen_after_failures: int = 30, reopen_backoff_initial: float = 1.0,
+                 reopen_backoff_max: float = 30.0):
+        self.source = source
+        self.frame_rate = frame_rate        # 초당 발행 프레임 수 상한 (0이면 카메라 속도 그대로)
+        self.is_streaming = True            # REST API로 제어되는 전송 상태 플래그
+        self.jpeg_quality = jpeg_quality    # 기본 JPEG 인코딩 품질 (0~100)
+        self.encode_workers = encode_workers
+        self.encode_cache = JpegEncodeCache()
+        self.motion_gate = motion_gate       # 설정 시 변화 없는 프레임은 발행하지 않음
+        self.ring_buffer = ring_buffer       # 설정 시 최근 프레임을 인코딩된 상태로 보관 (낙상 전 구간 내보내기)
+        self.archive = archive               # 설정 시 인코딩된 프레임을 세그먼트 파일에 녹화
+        self.record_fps = record_fps         # 링 버퍼/아카이브에 기록할 최대 초당 프레임 수 (0이면 발행되는 모든 프레임)
+        self.warmup_frames = warmup_frames   # 실제 장치를 연 뒤 버릴 프레임 수 (자동 노출/화이트밸런스 안정화)
+        # 공급원을 열지 못했거나 연속 reopen_after_failures번 읽지 못하면 지수 백오프로 다시 엽니다. (0이면 다시 열지 않음)
+        self.reopen_after_failures = reopen_after_failures
+        self.reopen_backoff_initial = reopen_backoff_initial
+        self.reopen_backoff_max = reopen_backoff_max
+        self.cpus = tuple(cpus)              # 설정 시 캡처/인코딩 스레드를 이 CPU 코어에 고정 (카메라 여러 대일 때)
+        # 설정 시 JPEG 인코딩을 공유 메모리 슬롯 + 워커 프로세스로 실행 (0이면 스레드 풀만 사용)
+        self.encode_processes = encode_processes
+        self.encode_slots = encode_slots
+        self.frame_buffers = frame_buffers  # 프레임 배열 풀의 최소 크기 (구독자가 많으면 최대 참조 수만큼 늘어남)
+        self.frame_pool = FrameBufferPool(frame_buffers)  # 캡처 스레드가 재사용하는 프레임 배열
+        self.pacer = FramePacer(frame_rate)  # 절대 시각 기준 송출 간격 스케줄러
+        self.health = CaptureHealth()        # 캡처 루프가 기록하는 장치 상태 (/api/webcam_status)
+        # 마지막 start()의 구간별 소요 시간 (장치 열기, 워밍업, 시작부터 첫 프레임 캡처까지)
+        self.startup: dict = {}
+        self._started_at = 0.0
+
+        self.frame_seq = 0                  # 마지막으로 발행된 프레임 번호
+        self.subscribers: set[FrameSubscriber] = set()
+
+        # 캡처 스레드와 이벤트 루프가 공유하는 최신 프레임 (self._frame_lock으로 보호)
+        self._frame_lock = threading.Lock()
+        self._captured_frame: Optional[np.ndarray] = None
+        self._captured_seq = 0
+        self._captured_time = 0.0
+        # 카메라 속도 모드에서 캡처 스레드가 새 프레임을 알리는 이벤트 (start()에서 이벤트 루프와 함께 생성)
+        self._frame_ready: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._capture_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._encode_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[SharedMemoryEncodePool] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._record_task: Optional[asyncio.Task] = None
+        self._retry_task: Optional[asyncio.Task] = None     # 시작 실패 후 다시 열기
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_reopening(self) -> bool:
+        """시작에 실패해 백그라운드에서 공급원을 다시 열려고 기다리거나 여는 중인지 여부"""
+        return (self._retry_task is not None and not self._retry_task.done()) or self.health.next_reopen_at is not None
+
+    async def start(self) -> bool:
+        """
+        프레임 공급원을 열고 캡처 스레드와 송출 루프를 시작합니다.
+        열지 못하면 False를 반환하고, 장치가 나중에 연결될 수 있으므로 백그라운드에서 백오프하며 다시 시작을 시도합니다.
+        """
+        if self.is_running():
+            return True
+
+        # 장치 열기도 수백 ms가 걸릴 수 있으므로 이벤트 루프 밖에서 실행합니다.
+        self._started_at = time.monotonic()
+        if not await asyncio.to_thread(self.source.open):
+            print(f"❌ 프레임 공급원({self.source.name})을 열 수 없습니다.")
+            await asyncio.to_thread(self.source.release)
+            if self.reopen_after_failures > 0 and (self._retry_task is None or self._retry_task.done()):
+                self._retry_task = asyncio.create_task(self._retry_start())
+            return False
+        opened_at = time.monotonic()
+        warmed = 0
+        if self.source.live and self.warmup_frames > 0:
+            warmed = await asyncio.to_thread(self._warm_up)
+        self.startup = {
+            "open_seconds": round(opened_at - self._started_at, 3),
+            "warmup_seconds": round(time.monotonic() - opened_at, 3),
+            "warmup_frames": warmed,
+            "first_frame_seconds": None,
+        }
+        self.health.reset()
+        self.health.set_properties(self.source.get_properties())
+
+        self._encode_pool = ThreadPoolExecutor(max_workers=self.encode_workers, thread_name_prefix="jpeg-encode",
+                                               initializer=self._pin_thread)
+        if self.encode_processes > 0 and not self.source.encoded:
+            self._process_pool = SharedMemoryEncodePool(workers=self.encode_processes, slots=self.encode_slots,
+                                                        cpus=self.cpus)
+            await asyncio.to_thread(self._process_pool.start)
+        if self.source.encoded:
+            # 녹화 재생: 공급원이 재생 속도를 정하므로 캡처 스레드와 송출 간격 제한 없이 읽는 대로 발행
+            self._task = asyncio.create_task(self._replay())
+        else:
+            self._stop_event.clear()
+            self._frame_ready = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            self._capture_thread = threading.Thread(target=self._capture_loop, name="frame-capture", daemon=True)
+            self._capture_thread.start()
+            self._task = asyncio.create_task(self._run())
+        if self.archive is not None:
+            self.archive.start()
+        if self.ring_buffer is not None or self.archive is not None:
+            self._record_task = asyncio.create_task(self._record())
+        print(f"✅ 프레임 브로드캐스터 시작 (공급원: {self.source.name}, 열기 {self.startup['open_seconds']}초, "
+              f"워밍업 {warmed}프레임 {self.startup['warmup_seconds']}초)")
+        return True
+
+    async def _retry_start(self) -> None:
+        """시작에 실패한 공급원을 지수 백오프로 다시 열어 시작합니다. 성공하거나 stop()이 취소할 때까지 반복합니다."""
+        delay = self.reopen_backoff_initial
+        while True:
+            print(f"🔄 {delay:.1f}초 후 프레임 공급원({self.source.name})을 다시 엽니다.")
+            self.health.schedule_reopen(time.monotonic() + delay)
+            await asyncio.sleep(delay)
+            started = await self.start()
+            self.health.record_reopen(started)
+            if started:
+                return
+            delay = min(delay * 2, self.reopen_backoff_max)
+
+    async def stop(self) -> None:
+        """송출 루프와 캡처 스레드를 멈추고 프레임 공급원을 해제합니다."""
+        if self._retry_task is asyncio.current_task():
+            self._retry_task = None
+        for task in (self._task, self._record_task, self._retry_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._record_task = None
+        self._retry_task = None
+        self.health.next_reopen_at = None
+
+        self._stop_event.set()
+        if self._capture_thread is not None:
+            await asyncio.to_thread(self._capture_thread.join, 2)
+            self._capture_thread = None
+
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown(wait=False)
+            self._encode_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+
+        if self.archive is not None:
+            await asyncio.to_thread(self.archive.stop)
+
+        await asyncio.to_thread(self.source.release)
+        self.frame_pool.clear()
+        print("✅ 프레임 브로드캐스터 종료 및 공급원 해제 완료")
+
+    def get_stats(self) -> dict:
+        """송출 상태와 타이밍 통계를 반환합니다."""
+        return {
+            "is_streaming": self.is_streaming,
+            "source": self.source.name,
+            "cpus": list(self.cpus),
+            "startup": self.startup,
+            "frame_seq": self.frame_seq,
+            "subscribers": self.client_count(),
+            "clients": [subscriber.get_stats() for subscriber in self.subscribers],
+            **self.pacer.get_stats(),
+            "target_fps": self.output_fps(),
+            "rate_cap": self.frame_rate,
+            "encode_cache": self.encode_cache.get_stats(),
+            "frame_pool": self.frame_pool.get_stats(),
+            "process_pool": self._process_pool.get_stats() if self._process_pool else None,
+            "motion_gate": self.motion_gate.get_stats() if self.motion_gate else None,
+            "ring_buffer": self.ring_buffer.get_stats() if self.ring_buffer else None,
+            "archive": self.archive.get_stats() if self.archive else None,
+        }
+
+    def output_fps(self) -> float:
+        """발행 속도: 상한(frame_rate)이 설정되어 있으면 그 값, 아니면 공급원이 보고한 fps (알 수 없으면 30)"""
+        if self.frame_rate > 0:
+            return float(self.frame_rate)
+        return float(self.health.properties.get("fps") or 30.0)
+
+    def frame_size(self) -> Tuple[int, int]:
+        """발행되는 프레임의 해상도: 마지막으로 읽은 프레임의 크기, 아직 없으면 협상된 크기 (알 수 없으면 640x480)"""
+        if self.health.width and self.health.height:
+            return self.health.width, self.health.height
+        properties = self.health.properties
+        return int(properties.get("width") or 640), int(properties.get("height") or 480)
+
+    def client_count(self) -> int:
+        """내부 구독자를 제외한 외부 클라이언트 수"""
+        return sum(1 for subscriber in self.subscribers if not subscriber.internal)
+
+    def default_variant(self) -> EncodeVariant:
+        return EncodeVariant(quality=self.jpeg_quality)
+
+    def subscribe(self, name: str, **options) -> FrameSubscriber:
+        """새 구독자를 등록합니다. options는 FrameSubscriber의 큐 크기/드롭 정책 설정입니다."""
+        subscriber = FrameSubscriber(name, frame_pool=self.frame_pool, **options)
+        self.subscribers.add(subscriber)
+        self._resize_frame_pool()
+        return subscriber
+
+    def unsubscribe(self, subscriber: FrameSubscriber) -> None:
+        """구독을 해제하고, 큐에 남은 프레임과 사용 중이던 프레임의 배열을 풀에 돌려줍니다."""
+        self.subscribers.discard(subscriber)
+        if not subscriber.closed:
+            subscriber.close("구독 해제")
+        subscriber.release()
+        self._resize_frame_pool()
+
+    def _resize_frame_pool(self) -> None:
+        """
+        동시에 참조될 수 있는 프레임 수에 맞춰 배열 풀의 크기를 정합니다.
+        최신 프레임과 읽는 중인 프레임, 인코딩 스레드마다 하나, 구독자마다 큐 크기 + 송신 중인 프레임 하나
+        """
+        referenced = 2 + self.encode_workers + sum(subscriber.queue_size + 1 for subscriber in self.subscribers)
+        self.frame_pool.set_capacity(max(self.frame_buffers, referenced))
+
+    async def encode(self, frame: CapturedFrame, variant: EncodeVariant) -> Optional[EncodedFrame]:
+        """
+        프레임을 요청한 변형으로 인코딩합니다. 같은 프레임/변형은 캐시된 버퍼를 공유합니다.
+        재생 공급원의 프레임은 변형과 관계없이 저장된 JPEG를 그대로 반환합니다.
+        """
+        if frame.encoded is not None:
+            return frame.encoded
+        return await self.encode_cache.get_or_encode(frame.seq, frame.image, variant, self._start_encode)
+
+    def _start_encode(self, image: np.ndarray, variant: EncodeVariant) -> asyncio.Future:
+        """
+        프로세스 풀이 설정되어 있으면 공유 메모리 슬롯으로, 아니면(또는 슬롯보다 큰 프레임이면) 스레드 풀로 인코딩합니다.
+        요청한 구독자가 먼저 연결을 끊어도 인코딩이 끝날 때까지 배열을 덮어쓰지 않도록 작업이 따로 사용 중 표시를 합니다.
+        """
+        if self._process_pool is not None and self._process_pool.fits(image):
+            future = self._process_pool.submit(image, variant)
+        else:
+            future = asyncio.get_running_loop().run_in_executor(self._encode_pool, encode_variant, image, variant)
+        self._hold_until_done(future, (image,))
+        return future
+
+    def _hold_until_done(self, future: asyncio.Future, images) -> None:
+        """future가 끝날 때까지 images 배열을 사용 중으로 표시합니다."""
+        for image in images:
+            self.frame_pool.retain(image)
+
+        def release(_):
+            for image in images:
+                self.frame_pool.release(image)
+
+        future.add_done_callback(release)
+
+    def _prefetch(self, frame: CapturedFrame, subscribers: List[FrameSubscriber]) -> None:
+        """
+        프로세스 풀 모드: 발행 시점에 프레임을 받은 구독자들이 원하는 변형의 인코딩을 미리 시작합니다.
+        구독자가 앞 프레임을 송신하는 동안 다음 프레임들이 다른 프로세스에서 동시에 인코딩되며,
+        각 구독자는 자신의 큐 순서(프레임 번호 순)대로 결과를 기다리므로 출력 순서는 유지됩니다.
+        """
+        variants = {subscriber.variant for subscriber in subscribers
+                    if subscriber.shared_encode and not subscriber.closed}
+        for variant in variants:
+            self.encode_cache.prefetch(frame.seq, frame.image, variant, self._start_encode)
+
+    async def run_encode(self, func, *args):
+        """캐시를 거치지 않는 연결별 인코딩 작업(예: 타일 델타)을 인코딩 스레드 풀에서 실행합니다."""
+        future = asyncio.get_running_loop().run_in_executor(self._encode_pool, func, *args)
+        self._hold_until_done(future, [arg for arg in args if isinstance(arg, np.ndarray)])
+        return await future
+
+    async def _record(self) -> None:
+        """
+        녹화: 발행된 프레임을 기본 변형으로 인코딩(클라이언트와 캐시 공유)하여 링 버퍼에 복사하고 아카이브 대기열에 넣습니다.
+        """
+        subscriber = self.subscribe("recorder", drop_policy="drop_oldest", queue_size=4,
+                                    variant=self.default_variant(), internal=True, max_fps=self.record_fps)
+        try:
+            while True:
+                frame = await subscriber.get()
+                encoded = await self.encode(frame, subscriber.variant)
+                if encoded is None:
+                    continue
+                wall_time = time.time() - (time.monotonic() - frame.timestamp)
+                if self.ring_buffer is not None:
+                    self.ring_buffer.append(frame.seq, frame.timestamp, wall_time,
+                                            encoded.width, encoded.height, encoded.data)
+                if self.archive is not None:
+                    self.archive.append(frame.seq, wall_time, encoded.width, encoded.height, encoded.data)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _pin_thread(self) -> None:
+        """현재 스레드를 self.cpus 코어에 고정합니다. (Linux에서는 스레드 단위로 적용되며, 다른 OS에서는 무시)"""
+        if not self.cpus or not hasattr(os, "sched_setaffinity"):
+            return
+        try:
+            os.sched_setaffinity(0, self.cpus)
+        except OSError as e:
+            print(f"⚠️ CPU 코어 고정 실패 ({self.cpus}): {e}")
+
+    def _warm_up(self) -> int:
+        """
+        장치를 연 직후의 프레임을 버립니다. (캡처 시작 전, 이벤트 루프 밖에서 실행)
+        처음 몇 프레임은 자동 노출이 안정되지 않아 어둡거나 색이 틀어져 있고, 포맷 협상/버퍼 할당으로 읽기도 느립니다.
+        lifespan에서 미리 버려 두면 첫 클라이언트가 연결 직후 정상 프레임을 받습니다. 버린 프레임 수를 반환합니다.
+        """
+        frame = None
+        discarded = 0
+        for _ in range(self.warmup_frames):
+            ret, image = self.source.read(frame)
+            if not ret:
+                continue
+            frame = image   # 같은 배열에 덮어써서 읽음
+            discarded += 1
+        return discarded
+
+    def _mark_first_frame(self) -> None:
+        """start()부터 첫 프레임을 읽기까지 걸린 시간을 기록합니다. (시작 후 한 번만)"""
+        if self.startup and self.startup["first_frame_seconds"] is None:
+            self.startup["first_frame_seconds"] = round(time.monotonic() - self._started_at, 3)
+
+    def _reopen_source(self, delay: float) -> bool:
+        """캡처 스레드: 공급원을 닫고 delay초 뒤 다시 엽니다. (연결이 끊긴 웹캠 복구)"""
+        self.source.release()
+        self.health.schedule_reopen(time.monotonic() + delay)
+        if self._stop_event.wait(delay):
+            return False
+        opened = self.source.open()
+        self.health.record_reopen(opened)
+        if not opened:
+            self.source.release()
+            return False
+        self.health.set_properties(self.source.get_properties())
+        if self.source.live and self.warmup_frames > 0:
+            self._warm_up()
+        print(f"✅ 프레임 공급원({self.source.name})을 다시 열었습니다.")
+        return True
+
+    def _capture_loop(self) -> None:
+        """
+        캡처 스레드: 장치에서 프레임을 계속 읽어 최신 프레임만 보관합니다.
+        전송 중이 아니어도 장치 버퍼에 오래된 프레임이 쌓이지 않도록 계속 읽어줍니다.
+        프레임은 사용 중이 아닌 배열(frame_pool)에 덮어써서 읽으므로 정상 상태에서는 새로 할당하지 않습니다.
+        읽은 배열의 사용 중 표시는 최신 프레임 자리로 넘기고, 밀려난 이전 최신 프레임의 표시는 해제합니다.
+        연속 reopen_after_failures번 읽지 못하면(웹캠 분리 등) 장치를 닫고 지수 백오프로 다시 엽니다.
+        """
+        self._pin_thread()
+        consecutive_errors = 0
+        reopen_delay = self.reopen_backoff_initial
+        while not self._stop_event.is_set():
+            buffer = self.frame_pool.acquire()
+            read_started = time.monotonic()
+            ret, frame = self.source.read(buffer)
+            if buffer is not None and (not ret or frame is not buffer):
+                # 읽지 못했거나 공급원이 새 배열을 반환한 경우(해상도 변경 등) 빌린 배열은 바로 돌려줌
+                self.frame_pool.release(buffer)
+            if not ret:
+                # 일시적인 읽기 실패 시 바쁜 대기를 피합니다.
+                CAPTURE_ERRORS.inc()
+                self.health.record_error()
+                consecutive_errors += 1
+                if 0 < self.reopen_after_failures <= consecutive_errors:
+                    print(f"⚠️ 프레임 공급원({self.source.name}) 연속 {consecutive_errors}회 읽기 실패, 장치를 다시 엽니다.")
+                    while not self._stop_event.is_set() and not self._reopen_source(reopen_delay):
+                        reopen_delay = min(reopen_delay * 2, self.reopen_backoff_max)
+                    # 다시 열었는데도 읽지 못하면 다음에는 더 오래 기다림 (프레임을 읽으면 처음부터)
+                    reopen_delay = min(reopen_delay * 2, self.reopen_backoff_max)
+                    consecutive_errors = 0
+                    continue
+                time.sleep(0.01)
+                continue
+
+            consecutive_errors = 0
+            reopen_delay = self.reopen_backoff_initial
+            CAPTURE_READ_SECONDS.observe(time.monotonic() - read_started)
+            CAPTURE_FRAMES.inc()
+            self._mark_first_frame()
+            self.health.record_frame(frame.shape[1], frame.shape[0])
+            self.frame_pool.adopt(frame)
+
+            with self._frame_lock:
+                previous = self._captured_frame
+                self._captured_frame = frame
+                self._captured_seq += 1
+                self._captured_time = time.monotonic()
+            if previous is not None:
+                self.frame_pool.release(previous)
+            # 카메라 속도로 발행 중인 송출 루프를 깨움 (frame_rate가 언제 바뀌어도 놓치지 않도록 항상 알림)
+            try:
+                self._loop.call_soon_threadsafe(self._frame_ready.set)
+            except RuntimeError:
+                # 종료 중 이벤트 루프가 먼저 닫힌 경우
+                break
+
+    async def _run(self) -> None:
+        """송출 루프: 새로 캡처된 프레임을 모든 구독자의 큐에 발행합니다."""
+        last_captured_seq = 0
+
+        while True:
+            if self.frame_rate > 0:
+                # 상한이 설정되면 다음 프레임 슬롯까지 대기 (frame_rate 변경은 이 시점에 반영)
+                await self.pacer.wait(self.frame_rate)
+            else:
+                # 카메라 속도: 캡처 스레드가 새 프레임을 알릴 때마다 발행
+                self.pacer.reset()
+                await self._frame_ready.wait()
+                self._frame_ready.clear()
+
+            if self.is_streaming and self.subscribers:
+                with self._frame_lock:
+                    image, captured_seq = self._captured_frame, self._captured_seq
+                    captured_time = self._captured_time
+                    if image is None or captured_seq == last_captured_seq:
+                        continue
+                    # 발행하는 동안 캡처 스레드가 최신 프레임을 바꿔도 배열을 덮어쓰지 않도록 사용 중 표시
+                    self.frame_pool.retain(image)
+                last_captured_seq = captured_seq
+
+                try:
+                    # 모션 게이트: 정지 장면이면 인코딩/송신 없이 건너뜀 (축소 사본 비교라 비용이 매우 작음)
+                    if self.motion_gate and not self.motion_gate.check(image):
+                        continue
+
+                    self.frame_seq += 1
+                    frame = CapturedFrame(self.frame_seq, image, captured_time)
+                    # 큐에 넣은 구독자와 미리 시작한 인코딩 작업이 각자 사용 중 표시를 넘겨받음
+                    accepted = self._publish(frame)
+                    if self._process_pool is not None and accepted:
+                        self._prefetch(frame, accepted)
+                    self.pacer.mark_frame()
+                finally:
+                    self.frame_pool.release(image)
+
+    async def _replay(self) -> None:
+        """
+        재생 루프: 인코딩된 공급원에서 읽은 프레임을 바로 발행합니다.
+        최대 속도 재생(speed=0)에서는 모든 외부 구독자가 이전 프레임을 가져갈 때까지 기다렸다가 다음 프레임을 읽습니다.
+        """
+        while True:
+            external = [subscriber for subscriber in self.subscribers if not subscriber.internal]
+            if not self.is_streaming or not external:
+                await asyncio.sleep(0.05)
+                continue
+            if self.source.speed <= 0:
+                await asyncio.gather(*(subscriber.wait_drained() for subscriber in external))
+
+            read_started = time.monotonic()
+            ret, archived = await asyncio.to_thread(self.source.read)
+            if not ret:
+                CAPTURE_ERRORS.inc()
+                self.health.record_error()
+                await asyncio.sleep(0.1)
+                continue
+            CAPTURE_READ_SECONDS.observe(time.monotonic() - read_started)
+            CAPTURE_FRAMES.inc()
+            self._mark_first_frame()
+            self.health.record_frame(archived.width, archived.height)
+
+            self.frame_seq += 1
+            encoded = EncodedFrame(archived.data, archived.width, archived.height, 0.0)
+            self._publish(CapturedFrame(self.frame_seq, None, time.monotonic(), encoded))
+            self.pacer.mark_frame()
+
+    def _publish(self, frame: CapturedFrame) -> List[FrameSubscriber]:
+        """
+        모든 구독자에게 프레임을 제공합니다. 인코딩이나 송신 완료를 기다리지 않습니다.
+        큐에 넣은 구독자 목록을 반환합니다. (요청 속도에 맞지 않아 건너뛴 구독자를 위한 인코딩은 하지 않음)
+        """
+        return [subscriber for subscriber in list(self.subscribers) if subscriber.offer(frame)]
@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class FrameBufferPool:
+    """
+    캡처 스레드가 프레임을 읽어 넣을 배열을 재사용하는 풀입니다. (프레임마다 새 배열을 할당하지 않도록)
+
+    배열마다 사용 중인 곳의 수(참조 수)를 직접 셉니다. acquire()로 빌린 배열은 참조 수 1(캡처 스레드)로 시작하고,
+    프레임을 넘겨받는 곳(최신 프레임 자리, 구독자 큐, 인코딩 작업)이 retain()으로 늘리고 다 쓰면 release()로 줄입니다.
+    참조 수가 0이 된 배열만 다시 빌려주므로, 아직 누군가 읽고 있는 배열에 다음 프레임을 덮어쓰지 않습니다.
+
+    빈 배열이 없으면 None을 반환하며, 호출하는 쪽이 새로 할당한 배열은 max_buffers개까지 풀에 추가됩니다.
+    풀에 들어가지 못한 배열은 추적하지 않으므로(retain/release 무시) 다 쓰면 그대로 해제됩니다.
+    max_buffers가 동시에 사용되는 프레임 수보다 작으면 넘친 배열은 매번 새로 할당되므로,
+    브로드캐스터는 구독자가 바뀔 때 set_capacity()로 최대 사용 수에 맞춥니다. (배열은 필요할 때만 할당되어 늘어남)
+    """
+
+    def __init__(self, max_buffers: int = 8):
+        if max_buffers < 2:
+            raise ValueError("max_buffers는 2 이상이어야 합니다. (최신 프레임과 다음 프레임)")
+        self.max_buffers = max_buffers
+        self.reused = 0         # 재사용한 횟수
+        self.allocated = 0      # 빈 배열이 없어 새로 할당된 횟수
+
+        self._buffers: List[np.ndarray] = []
+        self._refcounts: Dict[int, int] = {}   # id(배열) → 사용 중인 곳의 수 (풀이 배열을 보관하므로 id가 바뀌지 않음)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """사용 중이 아닌 배열을 참조 수 1로 빌려줍니다. 없으면 None"""
+        with self._lock:
+            for buffer in self._buffers:
+                if self._refcounts[id(buffer)] == 0:
+                    self._refcounts[id(buffer)] = 1
+                    self.reused += 1
+                    return buffer
+        return None
+
+    def adopt(self, buffer: np.ndarray) -> None:
+        """
+        공급원이 새로 할당한 배열을 참조 수 1로 풀에 추가합니다. (이미 풀의 배열이면 무시)
+        해상도가 바뀌면 이전 크기의 배열은 더 이상 추적하지 않습니다.
+        """
+        with self._lock:
+            if id(buffer) in self._refcounts:
+                return
+            self.allocated += 1
+            if self._buffers and self._buffers[0].shape != buffer.shape:
+                self._buffers.clear()
+                self._refcounts.clear()
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(buffer)
+                self._refcounts[id(buffer)] = 1
+
+    def retain(self, buffer: np.ndarray) -> None:
+        """배열을 넘겨받는 곳이 참조 수를 하나 늘립니다."""
+        with self._lock:
+            if id(buffer) in self._refcounts:
+                self._refcounts[id(buffer)] += 1
+
+    def release(self, buffer: np.ndarray) -> None:
+        """다 쓴 곳이 참조 수를 하나 줄입니다. 0이 되면 다시 빌려줄 수 있으며, 풀이 줄어든 상태면 풀에서 뺍니다."""
+        with self._lock:
+            count = self._refcounts.get(id(buffer))
+            if not count:
+                return
+            self._refcounts[id(buffer)] = count - 1
+            if count == 1 and len(self._buffers) > self.max_buffers:
+                self._remove(buffer)
+
+    def _remove(self, buffer: np.ndarray) -> None:
+        del self._refcounts[id(buffer)]
+        self._buffers = [existing for existing in self._buffers if existing is not buffer]
+
+    def set_capacity(self, max_buffers: int) -> None:
+        """
+        풀에 보관할 최대 배열 수를 바꿉니다.
+        줄이면 사용 중이 아닌 배열부터 빼고, 사용 중인 배열은 release()로 다 쓴 뒤에 뺍니다.
+        """
+        if max_buffers < 2:
+            raise ValueError("max_buffers는 2 이상이어야 합니다. (최신 프레임과 다음 프레임)")
+        with self._lock:
+            self.max_buffers = max_buffers
+            for buffer in [buffer for buffer in self._buffers if self._refcounts[id(buffer)] == 0]:
+                if len(self._buffers) <= max_buffers:
+                    break
+                self._remove(buffer)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buffers.clear()
+            self._refcounts.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            in_use = sum(1 for count in self._refcounts.values() if count > 0)
+        return {
+            "buffers": len(self._buffers),
+            "in_use": in_use,
+            "max_buffers": self.max_buffers,
+            "reused": self.reused,
+            "allocated": self.allocated,
+        }
@@ -0,0 +1,88 @@
+import struct
+from typing import List, NamedTuple, Optional
+
+# 프레임 봉투(envelope) 형식 (little-endian, 버전 1)
+#   magic(2s) "FE", version(B), codec(B), flags(B), seq(I), 캡처 시각 us(Q, 서버 monotonic),
+#   인코딩 시간 us(I), 가로(H), 세로(H), payload 길이(I) + payload
+# seq는 연결마다 1부터 세는 순번이며, 보낸 프레임과 큐에서 버려진 프레임만큼 늘어납니다.
+# 요청 속도(fps)나 일시 중지로 받지 않은 프레임은 세지 않으므로, 순번이 건너뛴 만큼이 실제로 놓친 프레임입니다.
+# 배치 메시지는 magic "FB", version(B), 프레임 수(H) 뒤에 봉투가 이어 붙습니다.
+ENVELOPE_MAGIC = b"FE"
+BATCH_MAGIC = b"FB"
+ENVELOPE_VERSION = 1
+ENVELOPE_HEADER = struct.Struct("<2sBBBIQIHHI")
+BATCH_HEADER = struct.Struct("<2sBH")
+
+CODEC_JPEG = 0
+CODEC_TILES = 1
+CODEC_H264 = 2   # H.264 액세스 유닛 (Annex B, 키프레임이면 FLAG_KEYFRAME)
+
+FLAG_KEYFRAME = 0x01
+
+
+class FrameMessage(NamedTuple):
+    """수신한 프레임 하나. payload는 수신 버퍼를 복사하지 않은 memoryview입니다."""
+    seq: Optional[int]          # 연결별 순번 (봉투 없는 기존 JPEG 메시지는 None)
+    capture_us: Optional[int]
+    encode_us: Optional[int]
+    width: int
+    height: int
+    codec: int
+    flags: int
+    payload: memoryview
+
+
+def pack_envelope(payload: bytes, seq: int, capture_time: float, encode_seconds: float,
+                  width: int, height: int, codec: int = CODEC_JPEG, flags: int = 0) -> list:
+    """봉투 헤더와 payload를 리스트로 반환합니다. 여러 프레임을 모아 한 번에 b"".join 하여 복사를 한 번으로 줄입니다."""
+    header = ENVELOPE_HEADER.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, codec, flags,
+                                  seq & 0xFFFFFFFF, int(capture_time * 1_000_000),
+                                  min(int(encode_seconds * 1_000_000), 0xFFFFFFFF),
+                                  width, height, len(payload))
+    return [header, payload]
+
+
+def pack_batch(envelopes: List[list]) -> bytes:
+    """pack_envelope 결과 여러 개를 하나의 배치 메시지로 묶습니다."""
+    parts = [BATCH_HEADER.pack(BATCH_MAGIC, ENVELOPE_VERSION, len(envelopes))]
+    for envelope in envelopes:
+        parts.extend(envelope)
+    return b"".join(parts)
+
+
+def _unpack_envelope(view: memoryview, offset: int):
+    (magic, version, codec, flags, seq, capture_us, encode_us,
+     width, height, length) = ENVELOPE_HEADER.unpack_from(view, offset)
+    if magic != ENVELOPE_MAGIC or version != ENVELOPE_VERSION:
+        raise ValueError(f"지원하지 않는 봉투 형식입니다: {bytes(magic)!r} v{version}")
+
+    start = offset + ENVELOPE_HEADER.size
+    message = FrameMessage(seq, capture_us, encode_us, width, height, codec, flags, view[start:start + length])
+    return message, start + length
+
+
+def unpack_message(data: bytes) -> List[FrameMessage]:
+    """
+    웹소켓 메시지 하나를 프레임 목록으로 해석합니다.
+    봉투 메시지, 배치 메시지, 봉투 없는 기존 JPEG 메시지를 모두 지원하며 payload는 복사하지 않습니다.
+    """
+    view = memoryview(data)
+    magic = bytes(view[:2])
+
+    if magic == ENVELOPE_MAGIC:
+        message, _ = _unpack_envelope(view, 0)
+        return [message]
+
+    if magic == BATCH_MAGIC:
+        _, version, count = BATCH_HEADER.unpack_from(view, 0)
+        if version != ENVELOPE_VERSION:
+            raise ValueError(f"지원하지 않는 배치 버전입니다: v{version}")
+        offset = BATCH_HEADER.size
+        messages = []
+        for _ in range(count):
+            message, offset = _unpack_envelope(view, offset)
+            messages.append(message)
+        return messages
+
+    # 봉투 없는 기존 형식: JPEG 바이트(또는 타일 메시지) 그대로
+    return [FrameMessage(None, None, None, 0, 0, CODEC_JPEG, 0, view)]
@@ -0,0 +1,77 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Optional
+
+
+class FramePacer:
+    """
+    절대 시각(deadline) 기준으로 프레임 송출 간격을 맞추는 스케줄러입니다.
+
+    asyncio.sleep(1/frame_rate)를 작업 뒤에 호출하면 캡처/인코딩/송신 시간만큼 실제 속도가 느려지므로,
+    "다음 프레임이 나가야 할 시각"을 누적해서 계산하고 그 시각까지 남은 시간만 대기합니다.
+    이미 지나버린 슬롯은 몰아서 처리하지 않고 건너뛰며, frame_rate 변경은 다음 틱부터 반영됩니다.
+    """
+
+    def __init__(self, frame_rate: float, stats_window: float = 2.0):
+        self.frame_rate = frame_rate
+        self.stats_window = stats_window  # 달성 FPS/지터를 계산할 최근 구간 (초)
+
+        self.ticks = 0
+        self.skipped_slots = 0
+
+        self._next_deadline: Optional[float] = None
+        self._lateness = deque(maxlen=120)      # 틱마다 deadline 대비 늦게 깨어난 시간 (초)
+        self._frame_times = deque(maxlen=512)   # 실제로 프레임이 발행된 시각
+
+    def reset(self) -> None:
+        """일시 중지 후 재개할 때처럼 기준 시각을 새로 잡습니다."""
+        self._next_deadline = None
+
+    async def wait(self, frame_rate: Optional[float] = None) -> None:
+        """다음 프레임 슬롯의 시각까지 대기합니다."""
+        if frame_rate:
+            self.frame_rate = frame_rate
+        period = 1 / self.frame_rate
+
+        now = time.monotonic()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        else:
+            self._next_deadline += period
+
+        # 한 주기 이상 밀렸다면 놓친 슬롯은 건너뛰고 가장 최근 슬롯에 맞춥니다.
+        if now - self._next_deadline >= period:
+            missed = int((now - self._next_deadline) / period)
+            self.skipped_slots += missed
+            self._next_deadline += missed * period
+
+        delay = self._next_deadline - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        self.ticks += 1
+        self._lateness.append(time.monotonic() - self._next_deadline)
+
+    def mark_frame(self) -> None:
+        """프레임 하나가 실제로 발행되었음을 기록합니다."""
+        self._frame_times.append(time.monotonic())
+
+    def get_stats(self) -> dict:
+        """목표 FPS, 달성 FPS, 지터 등 송출 타이밍 통계를 반환합니다."""
+        now = time.monotonic()
+        recent = [t for t in self._frame_times if now - t <= self.stats_window]
+
+        intervals = [b - a for a, b in zip(recent, recent[1:])]
+        jitter_ms = statistics.pstdev(intervals) * 1000 if len(intervals) >= 2 else 0.0
+        lateness_ms = statistics.fmean(self._lateness) * 1000 if self._lateness else 0.0
+
+        return {
+            "target_fps": self.frame_rate,
+            "achieved_fps": round(len(recent) / self.stats_window, 2),
+            "jitter_ms": round(jitter_ms, 2),
+            "avg_tick_lateness_ms": round(lateness_ms, 2),
+            "skipped_slots": self.skipped_slots,
+            "ticks": self.ticks,
+        }
@@ -0,0 +1,140 @@
+import threading
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+
+class BufferedFrame(NamedTuple):
+    """링 버퍼에서 꺼낸(복사된) 프레임입니다."""
+    seq: int
+    timestamp: float    # 캡처 시각 (time.monotonic)
+    wall_time: float    # 캡처 시각 (time.time, 중앙 서버와 비교용)
+    width: int
+    height: int
+    data: bytes
+
+
+class FrameRingBuffer:
+    """
+    인코딩된 프레임을 최근 max_seconds초 / max_bytes바이트만큼 메모리에 보관하는 링 버퍼입니다.
+
+    JPEG 바이트는 미리 할당한 하나의 bytearray에 순환하며 복사하고, 프레임 정보는 미리 할당한 NumPy 배열에 기록하므로
+    정상 스트리밍 중에는 새로운 메모리 할당이 없습니다. 낙상이 감지되면 snapshot()으로 원하는 구간을 복사해 내보냅니다.
+    """
+
+    def __init__(self, max_seconds: float = 10.0, max_bytes: int = 32 * 1024 * 1024, max_frames: int = 1024):
+        self.max_seconds = max_seconds
+        self.capacity = max_bytes
+        self.max_frames = max_frames
+
+        self._arena = bytearray(max_bytes)
+        self._arena_view = memoryview(self._arena)
+
+        self._offsets = np.zeros(max_frames, dtype=np.int64)
+        self._lengths = np.zeros(max_frames, dtype=np.int64)
+        self._seqs = np.zeros(max_frames, dtype=np.int64)
+        self._timestamps = np.zeros(max_frames, dtype=np.float64)
+        self._wall_times = np.zeros(max_frames, dtype=np.float64)
+        self._sizes = np.zeros((max_frames, 2), dtype=np.int32)
+
+        self._oldest = 0        # 가장 오래된 프레임의 인덱스 슬롯
+        self._count = 0         # 보관 중인 프레임 수
+        self._write_pos = 0     # 다음 JPEG를 쓸 arena 위치
+        self._lock = threading.Lock()
+
+        self.frames_appended = 0
+        self.frames_evicted = 0
+        self.frames_rejected = 0    # 버퍼 전체보다 커서 보관하지 못한 프레임
+
+    def _evict_oldest(self) -> None:
+        self._oldest = (self._oldest + 1) % self.max_frames
+        self._count -= 1
+        self.frames_evicted += 1
+
+    def _make_room(self, length: int) -> None:
+        """arena의 write_pos부터 length바이트가 연속으로 비도록 오래된 프레임을 밀어냅니다."""
+        while self._count:
+            oldest_offset = int(self._offsets[self._oldest])
+            if oldest_offset >= self._write_pos:
+                # 빈 구간: [write_pos, oldest_offset)
+                if oldest_offset - self._write_pos >= length:
+                    return
+                self._evict_oldest()
+            else:
+                # 빈 구간: [write_pos, capacity) 와 [0, oldest_offset)
+                if self.capacity - self._write_pos >= length:
+                    return
+                self._write_pos = 0
+
+        if self.capacity - self._write_pos < length:
+            self._write_pos = 0
+
+    def append(self, seq: int, timestamp: float, wall_time: float, width: int, height: int, data) -> bool:
+        """인코딩된 프레임을 링 버퍼에 복사합니다."""
+        length = len(data)
+        if length == 0 or length > self.capacity:
+            self.frames_rejected += 1
+            return False
+
+        with self._lock:
+            # 보관 시간이 지났거나 슬롯이 가득 찬 프레임부터 밀어냄
+            while self._count and (self._count >= self.max_frames
+                                   or timestamp - self._timestamps[self._oldest] > self.max_seconds):
+                self._evict_oldest()
+            self._make_room(length)
+
+            slot = (self._oldest + self._count) % self.max_frames
+            position = self._write_pos
+            self._arena_view[position:position + length] = data
+
+            self._offsets[slot] = position
+            self._lengths[slot] = length
+            self._seqs[slot] = seq
+            self._timestamps[slot] = timestamp
+            self._wall_times[slot] = wall_time
+            self._sizes[slot] = (width, height)
+
+            self._write_pos = position + length
+            self._count += 1
+            self.frames_appended += 1
+        return True
+
+    def snapshot(self, start: float, end: float, wall_clock: bool = False) -> List[BufferedFrame]:
+        """[start, end] 구간의 프레임을 복사하여 반환합니다. wall_clock=True면 time.time() 기준 시각으로 비교합니다."""
+        times = self._wall_times if wall_clock else self._timestamps
+        frames = []
+        with self._lock:
+            for i in range(self._count):
+                slot = (self._oldest + i) % self.max_frames
+                if start <= times[slot] <= end:
+                    offset, length = int(self._offsets[slot]), int(self._lengths[slot])
+                    frames.append(BufferedFrame(int(self._seqs[slot]), float(self._timestamps[slot]),
+                                                float(self._wall_times[slot]), int(self._sizes[slot][0]),
+                                                int(self._sizes[slot][1]),
+                                                bytes(self._arena_view[offset:offset + length])))
+        return frames
+
+    def newest_timestamp(self, wall_clock: bool = False) -> Optional[float]:
+        with self._lock:
+            if not self._count:
+                return None
+            slot = (self._oldest + self._count - 1) % self.max_frames
+            return float((self._wall_times if wall_clock else self._timestamps)[slot])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            used = int(self._lengths[[(self._oldest + i) % self.max_frames for i in range(self._count)]].sum()) \
+                if self._count else 0
+            span = 0.0
+            if self._count:
+                newest = (self._oldest + self._count - 1) % self.max_frames
+                span = float(self._timestamps[newest] - self._timestamps[self._oldest])
+        return {
+            "frames": self._count,
+            "seconds": round(span, 2),
+            "bytes_used": used,
+            "capacity_bytes": self.capacity,
+            "frames_appended": self.frames_appended,
+            "frames_evicted": self.frames_evicted,
+            "frames_rejected": self.frames_rejected,
+        }
@@ -0,0 +1,302 @@
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from FrameArchive import ArchivedFrame, FrameArchive
+
+
+class FrameSource:
+    """
+    프레임 공급원의 공통 인터페이스입니다.
+    FrameBroadcaster는 이 인터페이스만 사용하므로 웹캠, 동영상 파일, 합성 프레임을 자유롭게 교체할 수 있습니다.
+    """
+
+    name = "base"
+    encoded = False     # True면 read()가 이미지 대신 인코딩된 프레임(ArchivedFrame)을 반환합니다.
+    live = False        # True면 실제 장치입니다. (열고 난 직후 자동 노출이 안정될 때까지 워밍업 프레임을 버림)
+    _next_frame_time = 0.0
+
+    def open(self) -> bool:
+        """장치 또는 파일을 엽니다. 성공 여부를 반환합니다."""
+        raise NotImplementedError
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        프레임 하나를 읽습니다. cv2.VideoCapture.read()와 같은 (ret, frame) 형태입니다.
+        out을 주면 크기가 맞을 때 그 배열에 덮어써서 반환합니다. (맞지 않으면 새 배열을 반환)
+        """
+        raise NotImplementedError
+
+    def release(self) -> None:
+        """열려 있는 자원을 해제합니다."""
+        pass
+
+    def is_opened(self) -> bool:
+        return False
+
+    def get_properties(self) -> dict:
+        """장치와 협상된 설정(width, height, fps)을 반환합니다. 열린 뒤에 호출합니다."""
+        return {}
+
+    def _wait_next_frame(self, fps: float) -> None:
+        """
+        실제 카메라처럼 fps 간격으로 프레임이 나오도록 캡처 스레드를 대기시킵니다.
+        (웹캠은 read()가 다음 프레임까지 블로킹되지만, 파일/합성 공급원은 즉시 반환되기 때문입니다)
+        """
+        if not fps or fps <= 0:
+            return
+
+        now = time.monotonic()
+        if self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        self._next_frame_time = max(self._next_frame_time, now) + 1 / fps
+
+
+class CameraFrameSource(FrameSource):
+    """cv2.VideoCapture를 사용하는 웹캠 프레임 공급원입니다."""
+
+    name = "camera"
+    live = True
+
+    def __init__(self, index: int = 0, width: Optional[int] = None, height: Optional[int] = None):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.cap: Optional[cv2.VideoCapture] = None
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.index)
+        if self.width and self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return self.cap.isOpened()
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.cap is None:
+            return False, None
+        return self.cap.read(out) if out is not None else self.cap.read()
+
+    def release(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def is_opened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def get_properties(self) -> dict:
+        if self.cap is None:
+            return {}
+        # 요청한 해상도와 다를 수 있으므로 드라이버가 실제로 선택한 값을 읽음
+        return {
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": round(self.cap.get(cv2.CAP_PROP_FPS), 2),
+        }
+
+
+class VideoFileFrameSource(FrameSource):
+    """동영상 파일을 프레임 공급원으로 사용합니다. loop=True면 파일 끝에서 처음으로 되감습니다."""
+
+    name = "file"
+
+    def __init__(self, path: str, loop: bool = True, realtime: bool = True):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime  # True면 파일에 기록된 fps 속도로 프레임을 내보냅니다.
+        self.fps = 0.0
+        self.cap: Optional[cv2.VideoCapture] = None
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        return self.cap.isOpened()
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.cap is None:
+            return False, None
+
+        if self.realtime:
+            self._wait_next_frame(self.fps)
+
+        ret, frame = self.cap.read(out) if out is not None else self.cap.read()
+        if not ret and self.loop:
+            # 파일 끝에 도달하면 처음으로 되감아서 다시 읽습니다.
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(out) if out is not None else self.cap.read()
+        return ret, frame
+
+    def release(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def is_opened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def get_properties(self) -> dict:
+        if self.cap is None:
+            return {}
+        return {
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": round(self.fps, 2),
+        }
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    웹캠 없이 테스트하기 위한 합성 프레임 공급원입니다.
+    그라디언트 배경 위로 사각형이 움직이고, 프레임 번호가 화면에 표시됩니다.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps  # 0 이하이면 대기 없이 최대한 빠르게 생성합니다.
+        self.frame_index = 0
+        self._background: Optional[np.ndarray] = None
+        self._opened = False
+
+    def open(self) -> bool:
+        gradient = np.linspace(0, 255, self.width, dtype=np.uint8)
+        self._background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._background[:, :, 0] = gradient
+        self._background[:, :, 1] = gradient[::-1]
+        self._background[:, :, 2] = 96
+        self.frame_index = 0
+        self._opened = True
+        return True
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened:
+            return False, None
+
+        self._wait_next_frame(self.fps)
+
+        if out is not None and out.shape == self._background.shape:
+            frame = out
+            np.copyto(frame, self._background)
+        else:
+            frame = self._background.copy()
+        box = max(self.height // 6, 8)
+        x = (self.frame_index * 8) % max(self.width - box, 1)
+        y = (self.height - box) // 2
+        frame[y:y + box, x:x + box] = 255
+        cv2.putText(frame, str(self.frame_index), (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        self.frame_index += 1
+        return True, frame
+
+    def release(self) -> None:
+        self._opened = False
+        self._background = None
+
+    def is_opened(self) -> bool:
+        return self._opened
+
+    def get_properties(self) -> dict:
+        return {"width": self.width, "height": self.height, "fps": self.fps}
+
+
+class ArchiveReplayFrameSource(FrameSource):
+    """
+    FrameArchive에 녹화된 세그먼트를 다시 재생하는 프레임 공급원입니다. (낙상 감지 모델 회귀 테스트/부하 테스트용)
+
+    저장된 JPEG를 메모리 매핑한 그대로 내보내며 디코딩/재인코딩하지 않습니다. (encoded = True)
+    speed=1이면 녹화된 시간 간격대로, N이면 N배속으로, 0이면 기다리지 않고 내보냅니다.
+    (0일 때는 브로드캐스터가 수신 측이 프레임을 가져갈 때까지 기다리므로 수신 측 속도에 맞춰집니다)
+    """
+
+    name = "replay"
+    encoded = True
+
+    def __init__(self, root_dir: str, speed: float = 1.0, loop: bool = True, max_gap: float = 1.0):
+        self.root_dir = root_dir
+        self.speed = speed
+        self.loop = loop
+        self.max_gap = max_gap      # 녹화가 끊겼던 구간은 이 시간(초)으로 줄여서 재생
+        self.frames_replayed = 0
+        self.loops = 0
+        self._archive: Optional[FrameArchive] = None
+        self._frames = None
+        self._last_timestamp: Optional[float] = None
+        self._opened = False
+
+    def open(self) -> bool:
+        self._archive = FrameArchive(self.root_dir)
+        if not self._archive.list_segments():
+            print(f"❌ 재생할 세그먼트가 없습니다: {self.root_dir}")
+            return False
+        self._frames = self._archive.iter_range()
+        self._last_timestamp = None
+        self._next_frame_time = 0.0
+        self._opened = True
+        return True
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[ArchivedFrame]]:
+        if not self._opened:
+            return False, None
+
+        frame = next(self._frames, None)
+        if frame is None and self.loop:
+            # 마지막 세그먼트까지 재생하면 처음부터 다시 재생합니다.
+            self.loops += 1
+            self._frames = self._archive.iter_range()
+            self._last_timestamp = None
+            frame = next(self._frames, None)
+        if frame is None:
+            return False, None
+
+        if self.speed > 0:
+            gap = 0.0 if self._last_timestamp is None else frame.timestamp - self._last_timestamp
+            gap = min(max(gap, 0.0), self.max_gap) / self.speed
+            now = time.monotonic()
+            if self._next_frame_time > now:
+                time.sleep(self._next_frame_time - now)
+            self._next_frame_time = max(self._next_frame_time, now) + gap
+        self._last_timestamp = frame.timestamp
+
+        self.frames_replayed += 1
+        return True, frame
+
+    def release(self) -> None:
+        self._opened = False
+        self._frames = None
+        self._archive = None
+
+    def is_opened(self) -> bool:
+        return self._opened
+
+
+def create_frame_source(spec: str) -> FrameSource:
+    """
+    문자열 설정으로 프레임 공급원을 생성합니다.
+
+    - "camera:0"            : 0번 웹캠
+    - "file:/path/video.avi" : 동영상 파일 (반복 재생)
+    - "synthetic:640x480"   : 합성 프레임 (기본 30fps, "synthetic:640x480@15"처럼 fps 지정 가능)
+    - "replay:/path/archive" : 녹화 아카이브 재생 (기본 1배속, "replay:/path/archive@4"는 4배속, "@max"는 최대 속도)
+    """
+    kind, _, arg = spec.partition(":")
+
+    if kind == "camera":
+        return CameraFrameSource(index=int(arg) if arg else 0)
+    if kind == "file":
+        return VideoFileFrameSource(path=arg)
+    if kind == "synthetic":
+        if arg:
+            size, _, fps = arg.partition("@")
+            width, height = (int(v) for v in size.lower().split("x"))
+            return SyntheticFrameSource(width=width, height=height, fps=float(fps) if fps else 30.0)
+        return SyntheticFrameSource()
+
+    if kind == "replay":
+        path, _, speed = arg.rpartition("@") if "@" in arg else (arg, "", "")
+        return ArchiveReplayFrameSource(path, speed=0.0 if speed == "max" else float(speed) if speed else 1.0)
+
+    raise ValueError(f"알 수 없는 프레임 공급원입니다: {spec}")
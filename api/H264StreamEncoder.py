@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, List, Optional
+
+from FrameBroadcaster import CapturedFrame, FrameSubscriber
+from JpegEncodeCache import EncodedFrame
+from RtspStreamManager import PIPE_INPUTS, EncodingProfile, RtspStreamManager
+from StreamDecoders import AUD_PREFIX, NAL_IDR, nal_types
+
+if TYPE_CHECKING:
+    from FrameBroadcaster import FrameBroadcaster
+
+
+
+class H264StreamEncoder(RtspStreamManager):
+    """
+    웹소켓 h264 모드용 H.264 인코더입니다. (프레임마다 JPEG를 보내는 것보다 대역폭이 몇 배 작음)
+
+    RTSP 송출과 같은 FFmpeg 명령(인코딩 프로파일, pipe_* 입력, 감시/재시작)을 그대로 사용하되,
+    출력만 RTSP 대신 stdout의 H.264 elementary stream으로 바꿉니다. 카메라마다 하나의 FFmpeg을 웹소켓 구독자들이 공유하며,
+    첫 구독자가 연결될 때 시작하고 마지막 구독자가 나가면 멈춥니다.
+
+    stdout은 프레임마다 삽입된 AUD(액세스 유닛 구분자)를 기준으로 프레임 단위로 나눠 구독자 큐에 넣습니다.
+    마지막 키프레임(SPS/PPS 포함)부터의 프레임을 보관해 두었다가 새 구독자에게 먼저 넣어주므로,
+    새로 연결한 클라이언트는 다음 키프레임을 기다리지 않고 바로 디코딩을 시작할 수 있습니다.
+    """
+
+    def __init__(self, broadcaster: "FrameBroadcaster", default_profile: str = "pipe_raw",
+                 max_gop_frames: int = 300, **options):
+        super().__init__(rtsp_url="pipe:1", default_profile=default_profile, broadcaster=broadcaster, **options)
+        self.max_gop_frames = max_gop_frames    # 키프레임 간격이 이보다 길면 새 구독자는 다음 키프레임부터 받음
+        self.subscribers: set[FrameSubscriber] = set()
+
+        self.access_units = 0
+        self.keyframes = 0
+        self.bytes_out = 0
+        self._seq = 0
+        self._gop: List[CapturedFrame] = []     # 마지막 키프레임부터 지금까지의 프레임
+        # 구독자 등록/해제에 따른 FFmpeg 시작/종료를 직렬화 (동시 연결 시 FFmpeg이 두 번 뜨거나, 종료 중에 새로 뜬 프로세스가 정리되지 않도록)
+        self._lifecycle_lock = asyncio.Lock()
+
+    def resolve_profile(self, name: Optional[str] = None, **overrides) -> EncodingProfile:
+        profile = super().resolve_profile(name, **overrides)
+        if profile.input_kind not in PIPE_INPUTS:
+            raise ValueError(f"웹소켓 H.264 송출은 브로드캐스터의 프레임을 입력하는 pipe_* 프로파일만 사용할 수 있습니다: {name}")
+        return profile
+
+    def _construct_ffmpeg_command(self, profile: Optional[EncodingProfile] = None,
+                                  output: Optional[list] = None) -> list:
+        return super()._construct_ffmpeg_command(profile, output or [
+            # 키프레임마다 SPS/PPS를 넣고(새 구독자가 바로 디코딩), 프레임마다 AUD를 넣어 프레임 경계를 표시
+            '-bsf:v', 'dump_extra=freq=keyframe,h264_metadata=aud=insert',
+            '-flush_packets', '1',
+            '-f', 'h264', 'pipe:1',
+        ])
+
+    async def _spawn(self) -> bool:
+        # 새 프로세스의 스트림은 키프레임부터 시작하므로 이전 스트림의 프레임은 새 구독자에게 주지 않음
+        self._gop = []
+        return await super()._spawn()
+
+    async def _read_progress(self, stream: asyncio.StreamReader) -> None:
+        """stdout의 H.264 스트림을 AUD 기준으로 프레임 단위로 나눠 발행합니다. (-progress 대신 진행 상태도 여기서 갱신)"""
+        pending = bytearray()
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            # 버퍼 맨 앞은 현재 프레임의 AUD이므로 그 뒤부터 찾음 (청크 경계에 걸친 AUD도 찾도록 겹쳐서 검색)
+            search_from = max(len(pending) - len(AUD_PREFIX), len(AUD_PREFIX) + 1)
+            pending += chunk
+
+            while True:
+                # 다음 프레임의 AUD가 나오면 그 앞까지가 한 프레임
+                position = pending.find(AUD_PREFIX, search_from)
+                if position == -1:
+                    break
+                end = position - 1 if pending[position - 1] == 0 else position
+                self._publish_access_unit(bytes(pending[:end]))
+                del pending[:end]
+                search_from = len(AUD_PREFIX) + 1
+
+    def _publish_access_unit(self, data: bytes) -> None:
+        keyframe = NAL_IDR in nal_types(data)
+        width = self.profile.width or self.broadcaster.health.width
+        height = self.profile.height or self.broadcaster.health.height
+
+        self._seq += 1
+        frame = CapturedFrame(self._seq, None, time.monotonic(), EncodedFrame(data, width, height, 0.0, keyframe))
+        if keyframe:
+            self._gop = [frame]
+            self.keyframes += 1
+        elif self._gop:
+            self._gop.append(frame)
+            if len(self._gop) > self.max_gop_frames:
+                self._gop = []
+
+        for subscriber in list(self.subscribers):
+            subscriber.offer(frame)
+
+        self.access_units += 1
+        self.bytes_out += len(data)
+        self.progress.stats = {"frame": self.access_units, "keyframes": self.keyframes, "total_size": self.bytes_out}
+        self.progress.updated_at = time.monotonic()
+
+    async def subscribe(self, name: str, **options) -> FrameSubscriber:
+        """
+        H.264 프레임 구독자를 등록합니다. 인코더가 멈춰 있으면 시작하며, 시작하지 못하면 RuntimeError가 발생합니다.
+        새 구독자의 큐에는 보관 중인 마지막 키프레임부터의 프레임이 먼저 들어갑니다.
+        이 프레임들은 queue_size와 별도로 넣으며, 보내고 나면 큐는 요청한 크기로 돌아옵니다.
+        (따라가지 못해 프레임이 버려지면 송신 측이 다음 키프레임부터 다시 보냄)
+        """
+        async with self._lifecycle_lock:
+            if not self.is_running() and not await self.start_stream():
+                raise RuntimeError("H.264 인코더(FFmpeg)를 시작할 수 없습니다.")
+
+            subscriber = FrameSubscriber(name, shared_encode=False, **options)
+            subscriber.preload(self._gop)
+            self.subscribers.add(subscriber)
+            return subscriber
+
+    async def unsubscribe(self, subscriber: FrameSubscriber) -> None:
+        """구독자를 제거하고, 남은 구독자가 없으면 인코더를 멈춥니다."""
+        self.subscribers.discard(subscriber)
+        async with self._lifecycle_lock:
+            # 잠금을 기다리는 동안 새 구독자가 등록되었을 수 있으므로 잠금 안에서 다시 확인
+            if not self.subscribers and self.is_running():
+                await self.stop_stream()
+
+    def get_status(self) -> dict:
+        return {
+            **super().get_status(),
+            "subscribers": len(self.subscribers),
+            "access_units": self.access_units,
+            "keyframes": self.keyframes,
+            "bytes_out": self.bytes_out,
+            "cached_gop_frames": len(self._gop),
+        }
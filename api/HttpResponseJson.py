@@ -3,4 +3,5 @@ from typing import Optional
 
 class HttpResponseJson(BaseModel):
     status: int
-    message: str
\ No newline at end of file
+    message: str
+    data: Optional[dict] = None
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple, Optional, Union
+
+import cv2
+import numpy as np
+
+from StreamMetrics import ENCODE_SECONDS
+
+
+class EncodeVariant(NamedTuple):
+    """JPEG 인코딩 변형 (품질, 가로 해상도, 흑백 여부). 같은 변형을 요청한 클라이언트는 같은 버퍼를 공유합니다."""
+    quality: int = 50   # JPEG 품질 (1~100)
+    width: int = 0      # 출력 가로 픽셀 (0이면 원본 해상도, 세로는 비율 유지)
+    gray: bool = False  # True면 흑백으로 인코딩
+
+
+class EncodedFrame(NamedTuple):
+    """
+    인코딩 결과. 봉투 헤더에 필요한 실제 해상도와 인코딩 소요 시간을 함께 담습니다.
+    data는 인코더 출력 버퍼를 복사하지 않은 바이트 뷰(memoryview) 또는 bytes입니다.
+    """
+    data: Union[bytes, memoryview]
+    width: int
+    height: int
+    encode_seconds: float
+    keyframe: bool = True
+
+
+def make_variant(quality: int = 50, width: int = 0, color: str = "color") -> EncodeVariant:
+    """웹소켓 쿼리 파라미터로부터 인코딩 변형을 만듭니다. 잘못된 값이면 ValueError를 발생시킵니다."""
+    if not 1 <= quality <= 100:
+        raise ValueError("quality는 1에서 100 사이의 값이어야 합니다.")
+    if width < 0:
+        raise ValueError("width는 0 이상이어야 합니다.")
+    if color not in ("color", "gray"):
+        raise ValueError("color는 color 또는 gray만 가능합니다.")
+    return EncodeVariant(quality=quality, width=width, gray=(color == "gray"))
+
+
+def prepare_image(image: np.ndarray, variant: EncodeVariant) -> np.ndarray:
+    """변형에 맞게 프레임을 축소하고 흑백으로 변환합니다. (인코딩 직전 단계)"""
+    height, width = image.shape[:2]
+    if variant.width and variant.width < width:
+        new_height = max(int(height * variant.width / width), 1)
+        image = cv2.resize(image, (variant.width, new_height), interpolation=cv2.INTER_AREA)
+
+    if variant.gray and image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    return image
+
+
+def encode_variant(image: np.ndarray, variant: EncodeVariant) -> Optional[EncodedFrame]:
+    """프레임 하나를 지정한 변형으로 JPEG 인코딩합니다. 인코딩 스레드 풀에서 실행됩니다."""
+    started = time.perf_counter()
+    image = prepare_image(image, variant)
+    ok, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), variant.quality])
+    if not ok:
+        return None
+
+    encode_seconds = time.perf_counter() - started
+    ENCODE_SECONDS.observe(encode_seconds)
+    # tobytes() 복사 없이 인코더 출력 배열을 1차원 바이트 뷰로 그대로 사용합니다.
+    return EncodedFrame(memoryview(buffer).cast("B"), image.shape[1], image.shape[0], encode_seconds)
+
+
+class JpegEncodeCache:
+    """
+    프레임 번호(seq)별로 변형마다 한 번만 인코딩하도록 보장하는 작은 캐시입니다.
+
+    같은 프레임의 같은 변형을 여러 클라이언트가 동시에 요청해도 인코딩은 한 번만 실행되고,
+    모두 같은 결과 버퍼를 받습니다. 최신 프레임 기준으로 max_frames보다 오래된 프레임은 제거됩니다.
+    """
+
+    def __init__(self, max_frames: int = 4):
+        self.max_frames = max_frames
+        self.encodes = 0    # 실제로 인코딩한 횟수
+        self.hits = 0       # 캐시된 결과를 재사용한 횟수
+
+        self._frames: "OrderedDict[int, dict]" = OrderedDict()
+        self._newest_seq = 0
+
+    async def get_or_encode(self, seq: int, image: np.ndarray, variant: EncodeVariant,
+                            start_encode: Callable[[np.ndarray, EncodeVariant], Awaitable]) -> Optional[EncodedFrame]:
+        """
+        인코딩 결과를 기다립니다. start_encode는 인코딩을 시작하고 결과 Future를 반환하는 함수입니다.
+        (FrameBroadcaster가 스레드 풀 또는 프로세스 풀 중 설정된 쪽으로 보냅니다)
+        """
+        future = self.prefetch(seq, image, variant, start_encode)
+        if future is None:
+            # 이미 캐시에서 밀려난 오래된 프레임은 캐시하지 않고 인코딩만 합니다.
+            self.encodes += 1
+            return await start_encode(image, variant)
+
+        # 한 클라이언트의 연결이 끊겨 취소되더라도 같은 결과를 기다리는 다른 클라이언트에는 영향이 없도록 합니다.
+        return await asyncio.shield(future)
+
+    def prefetch(self, seq: int, image: np.ndarray, variant: EncodeVariant,
+                 start_encode: Callable[[np.ndarray, EncodeVariant], Awaitable]) -> Optional[asyncio.Future]:
+        """
+        결과를 기다리지 않고 인코딩을 시작(또는 진행 중인 인코딩을 재사용)하여 Future를 반환합니다.
+        프레임이 발행될 때 미리 호출하면 여러 프레임이 동시에 인코딩됩니다. 오래된 프레임이면 None을 반환합니다.
+        """
+        if seq <= self._newest_seq - self.max_frames:
+            return None
+
+        entry = self._frames.get(seq)
+        if entry is None:
+            entry = {}
+            self._frames[seq] = entry
+            self._evict(seq)
+
+        future = entry.get(variant)
+        if future is None:
+            future = asyncio.ensure_future(start_encode(image, variant))
+            entry[variant] = future
+            self.encodes += 1
+        else:
+            self.hits += 1
+        return future
+
+    def _evict(self, seq: int) -> None:
+        self._newest_seq = max(self._newest_seq, seq)
+        while self._frames:
+            oldest_seq = next(iter(self._frames))
+            if oldest_seq > self._newest_seq - self.max_frames:
+                break
+            del self._frames[oldest_seq]
+
+    def get_stats(self) -> dict:
+        return {
+            "cached_frames": len(self._frames),
+            "encodes": self.encodes,
+            "hits": self.hits,
+        }
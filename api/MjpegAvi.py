@@ -0,0 +1,52 @@
+import struct
+from typing import Iterable, List
+
+# AVI(RIFF) 컨테이너에 이미 인코딩된 JPEG 프레임을 그대로 담습니다. (디코딩/재인코딩 없음)
+AVIF_HASINDEX = 0x10
+AVIIF_KEYFRAME = 0x10
+
+AVIH = struct.Struct("<14I")            # MainAVIHeader (56 bytes)
+STRH = struct.Struct("<4s4sIHHIIIIIIII4h")  # AVIStreamHeader (56 bytes)
+STRF = struct.Struct("<IiiHH4sIiiII")   # BITMAPINFOHEADER (40 bytes)
+IDX1_ENTRY = struct.Struct("<4sIII")
+
+
+def _chunk(fourcc: bytes, payload: bytes) -> bytes:
+    padding = b"\0" if len(payload) % 2 else b""
+    return fourcc + struct.pack("<I", len(payload)) + payload + padding
+
+
+def _list(list_type: bytes, payload: bytes) -> bytes:
+    return b"LIST" + struct.pack("<I", len(payload) + 4) + list_type + payload
+
+
+def build_mjpeg_avi(frames: Iterable[bytes], fps: float, width: int, height: int) -> bytes:
+    """JPEG 바이트 목록을 MJPG 코덱 AVI 파일(bytes)로 묶습니다."""
+    frames: List[bytes] = list(frames)
+    fps = fps if fps > 0 else 15.0
+    rate_scale = 1000
+    max_size = max((len(frame) for frame in frames), default=0)
+
+    # movi 리스트와 idx1 인덱스 (오프셋은 "movi" 태그 위치 기준)
+    movi_parts = []
+    index_parts = []
+    offset = 4
+    for frame in frames:
+        chunk = _chunk(b"00dc", frame)
+        movi_parts.append(chunk)
+        index_parts.append(IDX1_ENTRY.pack(b"00dc", AVIIF_KEYFRAME, offset, len(frame)))
+        offset += len(chunk)
+    movi = _list(b"movi", b"".join(movi_parts))
+    idx1 = _chunk(b"idx1", b"".join(index_parts))
+
+    avih = AVIH.pack(int(1_000_000 / fps), int(max_size * fps), 0, AVIF_HASINDEX, len(frames), 0, 1,
+                     max_size, width, height, 0, 0, 0, 0)
+    strh = STRH.pack(b"vids", b"MJPG", 0, 0, 0, 0, rate_scale, int(fps * rate_scale), 0, len(frames),
+                     max_size, 0xFFFFFFFF, 0, 0, 0, width, height)
+    strf = STRF.pack(STRF.size, width, height, 1, 24, b"MJPG", width * height * 3, 0, 0, 0, 0)
+
+    strl = _list(b"strl", _chunk(b"strh", strh) + _chunk(b"strf", strf))
+    hdrl = _list(b"hdrl", _chunk(b"avih", avih) + strl)
+
+    body = b"AVI " + hdrl + movi + idx1
+    return b"RIFF" + struct.pack("<I", len(body)) + body
@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+
+class MotionGate:
+    """
+    변화가 없는 프레임은 발행하지 않도록 걸러내는 모션 게이트입니다.
+
+    프레임을 간격(step)마다 샘플링한 작은 흑백 사본을 만들고, 마지막으로 발행한 프레임의 사본과의
+    평균 밝기 차이(0~255)가 threshold를 넘으면 움직임으로 판단합니다.
+    정지 장면에서는 keepalive_fps 속도로만 프레임을 내보내고, 움직임이 생기면 바로 다음 프레임부터 전체 속도로 돌아갑니다.
+    """
+
+    def __init__(self, threshold: float = 4.0, keepalive_fps: float = 1.0, sample_width: int = 80):
+        self.threshold = threshold
+        self.keepalive_fps = keepalive_fps  # 정지 장면에서 유지할 최소 전송 속도 (0이면 유지 안 함)
+        self.sample_width = sample_width    # 비교용 사본의 대략적인 가로 픽셀 수
+
+        self.frames_checked = 0
+        self.frames_suppressed = 0
+        self.last_score = 0.0
+
+        self._reference: Optional[np.ndarray] = None
+        self._last_pass_time = 0.0
+
+    def _thumbnail(self, image: np.ndarray) -> np.ndarray:
+        step = max(image.shape[1] // self.sample_width, 1)
+        small = image[::step, ::step]
+        if small.ndim == 3:
+            # 채널 합으로 흑백 근사 (정확한 휘도 변환은 필요 없음)
+            return small.sum(axis=2, dtype=np.int16) // 3
+        return small.astype(np.int16)
+
+    def check(self, image: np.ndarray) -> bool:
+        """프레임을 발행해야 하면 True, 변화가 없어 건너뛰어도 되면 False를 반환합니다."""
+        self.frames_checked += 1
+        now = time.monotonic()
+        thumbnail = self._thumbnail(image)
+
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            self.last_score = 255.0
+        else:
+            self.last_score = float(np.abs(thumbnail - self._reference).mean())
+
+        keepalive_due = self.keepalive_fps > 0 and now - self._last_pass_time >= 1 / self.keepalive_fps
+        if self.last_score >= self.threshold or keepalive_due:
+            # 다음 비교는 마지막으로 보낸 프레임 기준이므로 느린 변화도 누적되어 감지됩니다.
+            self._reference = thumbnail
+            self._last_pass_time = now
+            return True
+
+        self.frames_suppressed += 1
+        return False
+
+    def get_stats(self) -> dict:
+        ratio = self.frames_suppressed / self.frames_checked if self.frames_checked else 0.0
+        return {
+            "threshold": self.threshold,
+            "keepalive_fps": self.keepalive_fps,
+            "last_score": round(self.last_score, 2),
+            "frames_checked": self.frames_checked,
+            "frames_suppressed": self.frames_suppressed,
+            "suppression_ratio": round(ratio, 3),
+        }
@@ -0,0 +1,116 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from typing import Optional
+
+# HTTP 응답 모델 (기존 코드에서 사용됨)
+from HttpResponseJson import HttpResponseJson
+
+from RtspStreamManager import ENCODING_PROFILES, RtspStreamManager
+
+# 메트릭 레지스트리 (/api/metrics)
+from StreamMetrics import REGISTRY
+
+RTSP_STARTS = REGISTRY.counter("edge_rtsp_starts_total", "RTSP 스트리밍 시작 횟수")
+RTSP_STOPS = REGISTRY.counter("edge_rtsp_stops_total", "RTSP 스트리밍 중지 횟수")
+
+
+def create_rtsp_router(manager: RtspStreamManager) -> APIRouter:
+    """
+    RTSP 제어 API(/api/rtsp/*)를 만듭니다.
+    RTSP 단독 서버(Api_Rtsp)와 웹소켓 서버(Api_Websocket, 같은 캡처를 stdin으로 송출)가 함께 사용합니다.
+    """
+    router = APIRouter()
+
+    REGISTRY.gauge("edge_rtsp_streaming", "RTSP 스트리밍 상태 (1: 전송중, 0: 중지)", manager.is_streaming)
+    REGISTRY.gauge("edge_rtsp_restarts", "감시 태스크가 FFmpeg을 재시작한 횟수", lambda: manager.restarts)
+    REGISTRY.gauge("edge_rtsp_stalls", "진행 상태가 멈춰 FFmpeg을 종료한 횟수", lambda: manager.stalls)
+    REGISTRY.gauge("edge_rtsp_spawn_failures", "재시작 시 FFmpeg을 실행하지 못한 횟수", lambda: manager.spawn_failures)
+
+    @router.post("/api/rtsp/start") 
+    async def start_rtsp_transmission(profile: Optional[str] = None, width: Optional[int] = None,
+                                      height: Optional[int] = None, fps: Optional[int] = None,
+                                      gop: Optional[int] = None, bitrate: Optional[str] = None):
+        """
+        FFmpeg을 사용하여 RTSP 스트리밍을 시작합니다.
+
+        profile로 인코딩 프로파일을 선택하고(GET /api/rtsp/profiles 참고, 없으면 RTSP_PROFILE 환경변수),
+        width / height / fps / gop / bitrate 쿼리 파라미터로 프로파일의 일부 설정을 덮어쓸 수 있습니다.
+        (예: POST /api/rtsp/start?profile=mjpeg_640x480_15&bitrate=600k)
+        """
+        try:
+            started = await manager.start_stream(profile, width=width, height=height, fps=fps,
+                                           gop=gop, bitrate=bitrate)
+        except ValueError as e:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=HttpResponseJson(
+                    status=400,
+                    message=str(e)
+                ).model_dump()
+            )
+
+        if started:
+            RTSP_STARTS.inc()
+            return JSONResponse(
+                status_code=status.HTTP_200_OK,
+                content=HttpResponseJson(
+                    status=200, 
+                    message=f"RTSP 스트리밍이 시작되었습니다. URL: rtsp://<요청주소>:8554/live/stream"
+                ).model_dump()
+            )
+        else :
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=HttpResponseJson(
+                    status=400, 
+                    message="RTSP 스트리밍이 이미 실행 중이거나 시작에 실패했습니다."
+                ).model_dump()
+            )
+
+    @router.post("/api/rtsp/stop") 
+    async def stop_rtsp_transmission():
+        """실행 중인 FFmpeg RTSP 스트리밍을 중지합니다."""
+        if await manager.stop_stream():
+            RTSP_STOPS.inc()
+            return JSONResponse(
+                status_code=status.HTTP_200_OK,
+                content=HttpResponseJson(
+                    status=200, 
+                    message="RTSP 스트리밍이 성공적으로 중지되었습니다."
+                ).model_dump()
+            )
+        else : 
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=HttpResponseJson(
+                    status=400, 
+                    message="RTSP 스트리밍이 이미 중지된 상태입니다."
+                ).model_dump()
+            )
+        
+    @router.get("/api/rtsp/status") 
+    async def get_rtsp_status():
+        """RTSP 스트리밍 상태 정보를 조회합니다."""
+        rtsp_info = manager.get_status()
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=HttpResponseJson(
+                status=200,
+                message=f"현재 RTSP 스트리밍 상태: {rtsp_info['status']}",
+                data=rtsp_info
+            ).model_dump()
+        )
+
+    @router.get("/api/rtsp/profiles")
+    async def get_rtsp_profiles():
+        """선택 가능한 인코딩 프로파일 목록을 조회합니다."""
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=HttpResponseJson(
+                status=200,
+                message=f"기본 프로파일: {manager.default_profile}",
+                data={name: profile._asdict() for name, profile in ENCODING_PROFILES.items()}
+            ).model_dump()
+        )
+
+    return router
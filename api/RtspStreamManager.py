@@ -1,112 +1,549 @@
+import asyncio
 import subprocess
 import os
 import signal
 import time
-from typing import Optional
+from collections import deque
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from FrameBroadcaster import FrameBroadcaster
 
 # 본 코드는 GEMINI가 작성하였습니다.
 
+
+class EncodingProfile(NamedTuple):
+    """FFmpeg 입력/인코딩 설정 묶음입니다. /api/rtsp/start?profile=<이름>으로 선택합니다."""
+    input_kind: str = "v4l2"        # "v4l2": 웹캠 장치, "lavfi": ffmpeg 테스트 패턴(testsrc, 웹캠 없이 테스트)
+                                    # "pipe_mjpeg" / "pipe_raw": FrameBroadcaster의 프레임을 stdin으로 입력
+    input_format: str = ""          # v4l2 입력 픽셀 포맷 (예: "mjpeg", "yuyv422", 빈 값이면 장치 기본값)
+    width: int = 0                  # 0이면 장치 기본 해상도
+    height: int = 0
+    fps: int = 0                    # 0이면 장치 기본 프레임 속도
+    codec: str = "libx264"          # "libx264" 또는 라즈베리파이 하드웨어 인코더 "h264_v4l2m2m"
+    preset: str = "veryfast"        # libx264 전용: CPU 사용량과 품질 트레이드오프
+    tune: str = "zerolatency"       # libx264 전용: 지연 시간 최소화 설정
+    gop: int = 0                    # 키프레임 간격 (프레임 수, 0이면 인코더 기본값). 짧을수록 접속 직후 화면이 빨리 나옴
+    bitrate: str = ""               # 목표 비트레이트 (예: "800k", 빈 값이면 인코더 기본 품질 기준)
+
+
+# 이름으로 선택 가능한 인코딩 프로파일
+ENCODING_PROFILES = {
+    # 기존 동작: 장치 기본 설정, libx264 veryfast
+    "default": EncodingProfile(),
+    # 웹캠의 MJPEG 출력을 받아 USB 대역폭을 줄이고, 15fps / 1초 GOP로 송출
+    "mjpeg_640x480_15": EncodingProfile(input_format="mjpeg", width=640, height=480, fps=15,
+                                        preset="ultrafast", gop=15, bitrate="800k"),
+    # CPU 사용량 최소화 (저해상도, 저프레임)
+    "low_cpu": EncodingProfile(input_format="mjpeg", width=320, height=240, fps=10,
+                               preset="ultrafast", gop=10, bitrate="300k"),
+    # 라즈베리파이 하드웨어 H.264 인코더 사용
+    "hw_640x480_30": EncodingProfile(input_format="mjpeg", width=640, height=480, fps=30,
+                                     codec="h264_v4l2m2m", gop=30, bitrate="1500k"),
+    # 웹캠 없이 테스트: ffmpeg 내장 테스트 패턴
+    "testsrc": EncodingProfile(input_kind="lavfi", width=640, height=480, fps=15,
+                               preset="ultrafast", gop=15, bitrate="800k"),
+    # 웹소켓과 같은 캡처 사용: 브로드캐스터가 인코딩한 JPEG를 그대로 입력 (웹소켓 클라이언트와 인코딩 캐시 공유)
+    "pipe_mjpeg": EncodingProfile(input_kind="pipe_mjpeg", preset="ultrafast", gop=15, bitrate="800k"),
+    # 웹소켓과 같은 캡처 사용: 원본 BGR 프레임을 입력 (JPEG 손실 없음, 파이프 전송량이 큼)
+    # 해상도를 지정하지 않으면 브로드캐스터의 프레임 크기 그대로, 지정하면 비율을 유지하여 축소 후 남는 부분을 검은색으로 채움
+    "pipe_raw": EncodingProfile(input_kind="pipe_raw", preset="ultrafast", gop=15, bitrate="800k"),
+}
+PIPE_INPUTS = ("pipe_mjpeg", "pipe_raw")
+
+
+def letterbox(image, width: int, height: int):
+    """가로세로 비율을 유지한 채 width x height 안에 맞게 크기를 바꾸고, 남는 부분은 검은색으로 채웁니다."""
+    import cv2
+
+    scale = min(width / image.shape[1], height / image.shape[0])
+    resized_width = min(width, max(1, round(image.shape[1] * scale)))
+    resized_height = min(height, max(1, round(image.shape[0] * scale)))
+    resized = cv2.resize(image, (resized_width, resized_height), interpolation=cv2.INTER_AREA)
+    left, top = (width - resized_width) // 2, (height - resized_height) // 2
+    return cv2.copyMakeBorder(resized, top, height - resized_height - top, left, width - resized_width - left,
+                              cv2.BORDER_CONSTANT, value=(0, 0, 0))
+
+
+class FfmpegProgress:
+    """
+    ffmpeg -progress 출력(key=value 줄)을 해석하여 최신 인코딩 상태를 보관합니다.
+    progress= 줄이 나올 때마다 한 묶음이 완성되므로 그 시점에 값을 갱신합니다.
+    """
+
+    def __init__(self):
+        self._pending: dict = {}
+        self.stats: dict = {}
+        self.updated_at: Optional[float] = None   # 마지막 갱신 시각 (time.monotonic)
+
+    def reset(self) -> None:
+        self._pending = {}
+        self.stats = {}
+        self.updated_at = None
+
+    def feed_line(self, line: str) -> None:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return
+        if key != "progress":
+            self._pending[key] = value
+            return
+
+        values, self._pending = self._pending, {}
+        self.stats = {
+            "frame": _to_int(values.get("frame")),
+            "fps": _to_float(values.get("fps")),
+            "speed": _to_float(values.get("speed", "").rstrip("x")),
+            "bitrate_kbps": _to_float(values.get("bitrate", "").replace("kbits/s", "")),
+            "total_size": _to_int(values.get("total_size")),
+            "out_time_us": _to_int(values.get("out_time_us")),
+            "dup_frames": _to_int(values.get("dup_frames")),
+            "drop_frames": _to_int(values.get("drop_frames")),
+            "state": value,     # "continue" 또는 "end"
+        }
+        self.updated_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        age = round(time.monotonic() - self.updated_at, 2) if self.updated_at is not None else None
+        return {**self.stats, "seconds_since_update": age}
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None     # "N/A" 등
+
+
 class RtspStreamManager:
     """
     웹캠 RTSP 스트리밍을 위한 FFmpeg 프로세스를 관리하는 클래스입니다.
     FastAPI 애플리케이션의 싱글톤으로 사용됩니다.
+
+    FFmpeg은 asyncio 서브프로세스로 실행되므로 시작/중지가 이벤트 루프를 막지 않습니다.
+    broadcaster를 지정하면 pipe_* 프로파일로 웹소켓과 같은 캡처의 프레임을 FFmpeg stdin에 넣어 송출합니다.
+    (장치를 한 번만 읽고 웹소켓 구독자와 RTSP 송출이 함께 사용)
+
+    시작 후에는 감시 태스크가 프로세스를 지켜보다가, 비정상 종료되거나 -progress 출력이
+    stall_timeout초 동안 갱신되지 않으면(멈춤) 지수 백오프(backoff_initial ~ backoff_max초) 후 다시 실행합니다.
     """
-    
+
     # 클래스 수준 또는 인스턴스 변수로 관리 (여기서는 인스턴스 변수)
-    def __init__(self, rtsp_url: str = "rtsp://127.0.0.1:8554/live/stream"):
+    def __init__(self, rtsp_url: str = "rtsp://127.0.0.1:8554/live/stream", default_profile: str = "default",
+                 broadcaster: Optional["FrameBroadcaster"] = None, stall_timeout: float = 10.0, startup_grace: float = 15.0,
+                 backoff_initial: float = 1.0, backoff_max: float = 60.0, healthy_after: float = 30.0):
         self.rtsp_url = rtsp_url  # RTSP 서버의 주소 및 스트림 경로
-        self.ffmpeg_process: Optional[subprocess.Popen] = None
-        
+        self.ffmpeg_process: Optional[asyncio.subprocess.Process] = None
+
         # 라즈베리파이의 기본 웹캠 장치 경로
-        self.webcam_device = "/dev/video0" 
-        
-    def _construct_ffmpeg_command(self) -> list:
-        """FFmpeg 실행 명령어를 구성합니다."""
+        self.webcam_device = "/dev/video0"
+
+        # pipe_* 프로파일의 프레임 공급원 (웹소켓 서버와 같은 FrameBroadcaster)
+        self.broadcaster = broadcaster
+        self.frames_fed = 0
+        self.last_fed_at: Optional[float] = None
+
+        if default_profile not in ENCODING_PROFILES:
+            raise ValueError(f"알 수 없는 인코딩 프로파일입니다: {default_profile}")
+        self.default_profile = default_profile
+        self.profile_name = default_profile
+        self.profile = ENCODING_PROFILES[default_profile]
+
+        # ffmpeg 출력 해석 (-progress는 stdout, 경고/오류 메시지는 stderr)
+        self.progress = FfmpegProgress()
+        self.stderr_tail: deque = deque(maxlen=20)
+        self._reader_tasks: list = []
+
+        # 감시(watchdog) 설정
+        self.stall_timeout = stall_timeout      # 진행 상태가 이 시간 동안 갱신되지 않으면 멈춘 것으로 판단
+        self.startup_grace = startup_grace      # 시작 직후 첫 진행 상태가 나올 때까지 기다리는 시간 (장치 열기 포함)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.healthy_after = healthy_after      # 이 시간 이상 정상 동작했다면 백오프를 처음부터 다시 계산
+        self.check_interval = 1.0
+
+        # 감시 상태 및 재시작 카운터
+        self._supervisor: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None     # 현재 프로세스 시작 시각 (time.monotonic)
+        self.restarts = 0
+        self.crashes = 0
+        self.stalls = 0
+        self.spawn_failures = 0                 # 재시작 시 프로세스를 실행하지 못한 횟수 (crashes와 별도)
+        self.spawn_error: Optional[str] = None  # 마지막 실행 실패 사유
+        self.consecutive_failures = 0
+        self.next_restart_at: Optional[float] = None
+        self.last_failure: Optional[dict] = None
+
+    def resolve_profile(self, name: Optional[str] = None, **overrides) -> EncodingProfile:
+        """이름으로 프로파일을 찾고, None이 아닌 overrides 값(예: fps=10)으로 일부 설정을 덮어씁니다."""
+        name = name or self.default_profile
+        if name not in ENCODING_PROFILES:
+            raise ValueError(f"알 수 없는 인코딩 프로파일입니다: {name} (가능한 값: {', '.join(ENCODING_PROFILES)})")
+        overrides = {key: value for key, value in overrides.items() if value is not None}
+        profile = ENCODING_PROFILES[name]._replace(**overrides)
+        if profile.input_kind in PIPE_INPUTS and self.broadcaster is None:
+            raise ValueError(f"{name} 프로파일은 프레임 브로드캐스터와 함께 실행할 때(Api_Websocket)만 사용할 수 있습니다.")
+        return profile
+
+    def _construct_ffmpeg_command(self, profile: Optional[EncodingProfile] = None,
+                                  output: Optional[list] = None) -> list:
+        """
+        FFmpeg 실행 명령어를 구성합니다.
+        output을 주면 RTSP 송출 대신 그 출력 인자를 사용합니다. (예: 웹소켓 H.264 송출의 stdout 출력, -progress 없음)
+        """
         # V4L2 (Video4Linux2)를 사용하여 웹캠 장치에서 영상을 가져와 H.264로 인코딩하고 RTSP로 송출하는 명령입니다.
-        
-        command = [
-            'ffmpeg', 
-            '-f', 'v4l2',             # 입력 포맷: Video4Linux2
-            '-i', self.webcam_device, # 입력 장치 경로
-            '-c:v', 'libx264',        # 비디오 코덱: H.264
+        profile = profile or self.profile
+
+        command = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'warning']
+
+        if profile.input_kind == "lavfi":
+            # 테스트 패턴은 실시간 속도(-re)로 생성
+            size = f"{profile.width or 640}x{profile.height or 480}"
+            command += ['-re', '-f', 'lavfi', '-i', f"testsrc=size={size}:rate={profile.fps or 15}"]
+        elif profile.input_kind in PIPE_INPUTS:
+            # stdin으로 들어오는 프레임: 프레임 속도가 일정하지 않으므로 도착 시각을 타임스탬프로 사용
+            command += ['-use_wallclock_as_timestamps', '1']
+            if profile.input_kind == "pipe_raw":
+                command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24',
+                            '-video_size', f"{profile.width}x{profile.height}"]
+            else:
+                command += ['-f', 'mjpeg']
+            command += ['-i', 'pipe:0']
+        else:
+            command += ['-f', 'v4l2']              # 입력 포맷: Video4Linux2
+            if profile.input_format:
+                command += ['-input_format', profile.input_format]
+            if profile.width and profile.height:
+                command += ['-video_size', f"{profile.width}x{profile.height}"]
+            if profile.fps:
+                command += ['-framerate', str(profile.fps)]
+            command += ['-i', self.webcam_device]  # 입력 장치 경로
+
+        command += [
+            '-c:v', profile.codec,    # 비디오 코덱: H.264
             '-pix_fmt', 'yuv420p',    # 픽셀 포맷 (호환성 향상)
-            '-preset', 'veryfast',    # 인코딩 속도 (CPU 사용량과 품질 트레이드오프)
-            '-tune', 'zerolatency',   # 지연 시간 최소화 설정
+        ]
+        if profile.codec == "libx264":
+            command += ['-preset', profile.preset, '-tune', profile.tune]
+        if profile.gop:
+            command += ['-g', str(profile.gop), '-keyint_min', str(profile.gop)]
+        if profile.bitrate:
+            command += ['-b:v', profile.bitrate, '-maxrate', profile.bitrate, '-bufsize', profile.bitrate]
+        if profile.input_kind in PIPE_INPUTS:
+            # 도착 시각 타임스탬프를 일정한 출력 프레임 속도로 맞춤 (부족하면 중복, 넘치면 드롭 → progress에 집계)
+            fps = profile.fps or (self.broadcaster.output_fps() if self.broadcaster else 15)
+            command += ['-r', str(fps)]
+
+        if output is not None:
+            return command + output
+
+        command += [
+            '-progress', 'pipe:1',    # 인코딩 진행 상태를 stdout으로 출력 (get_status에서 사용)
             '-rtsp_transport', 'tcp', # 전송 프로토콜: TCP (안정성)
             '-f', 'rtsp',             # 출력 포맷: RTSP
             self.rtsp_url             # RTSP 출력 주소
         ]
-        
+
         return command
 
     def is_streaming(self) -> bool:
         """현재 FFmpeg 스트리밍 프로세스가 실행 중인지 확인합니다."""
         if self.ffmpeg_process is None:
             return False
-        
-        # poll() 메서드는 프로세스가 종료되면 리턴 코드를, 아니면 None을 반환합니다.
-        return self.ffmpeg_process.poll() is None
 
-    def start_stream(self) -> bool:
-        """RTSP 스트리밍을 시작합니다."""
-        if self.is_streaming():
+        # returncode는 프로세스가 종료되면 리턴 코드, 아니면 None입니다.
+        return self.ffmpeg_process.returncode is None
+
+    def is_running(self) -> bool:
+        """스트리밍이 요청된 상태(감시 태스크 동작 중)인지 확인합니다. 재시작 대기 중에도 True입니다."""
+        return self._supervisor is not None and not self._supervisor.done()
+
+    async def start_stream(self, profile_name: Optional[str] = None, **overrides) -> bool:
+        """
+        RTSP 스트리밍을 시작합니다.
+        profile_name으로 인코딩 프로파일을 선택하며, 알 수 없는 이름이면 ValueError가 발생합니다.
+        """
+        if self.is_running():
             print("🚨 RTSP 스트리밍이 이미 실행 중입니다.")
             return False
-        
+
+        profile = self.resolve_profile(profile_name, **overrides)
+        self.profile_name = profile_name or self.default_profile
+        self.profile = profile
+        self.consecutive_failures = 0
+        self.last_failure = None
+
+        if not await self._spawn():
+            return False
+
+        self._supervisor = asyncio.create_task(self._supervise())
+        return True
+
+    async def _spawn(self) -> bool:
+        """FFmpeg 프로세스를 실행하고 출력 읽기 태스크를 시작합니다."""
+        # 이전 프로세스의 태스크가 남아 있으면 새 태스크로 덮어쓰기 전에 정리
+        await self._cancel_reader_tasks()
+        profile = self.profile
+        if profile.input_kind == "pipe_raw" and not (profile.width and profile.height):
+            # 원본 프레임 입력은 크기를 미리 알려야 하므로 실행 시점의 브로드캐스터 프레임 크기를 사용
+            width, height = self.broadcaster.frame_size()
+            profile = profile._replace(width=width, height=height)
         try:
-            command = self._construct_ffmpeg_command()
-            
-            # Popen을 사용하여 새로운 프로세스로 FFmpeg 실행
-            # stdout/stderr를 DEVNULL로 리다이렉션하여 출력을 무시하고 백그라운드에서 실행
-            self.ffmpeg_process = subprocess.Popen(
-                command, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL,
-                preexec_fn=os.setsid # 프로세스 그룹 ID 설정 (종료를 깔끔하게 하기 위해)
+            command = self._construct_ffmpeg_command(profile)
+
+            # start_new_session: 새 프로세스 그룹으로 실행 (종료 시 하위 프로세스까지 깔끔하게 종료하기 위해)
+            # stdout(-progress)과 stderr(경고/오류)는 읽기 태스크에서 읽어 상태로 보관
+            self.ffmpeg_process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=subprocess.PIPE if self.profile.input_kind in PIPE_INPUTS else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True
             )
-            print(f"✅ FFmpeg RTSP 스트리밍 시작됨 (PID: {self.ffmpeg_process.pid})")
-            return True
-            
         except FileNotFoundError:
             print("❌ 오류: 'ffmpeg' 명령어를 찾을 수 없습니다. FFmpeg이 설치되어 있나요?")
+            self.spawn_error = "ffmpeg not found"
             return False
         except Exception as e:
             print(f"❌ RTSP 스트리밍 시작 중 예상치 못한 오류 발생: {e}")
+            self.spawn_error = str(e)
             return False
 
-    def stop_stream(self) -> bool:
-        """RTSP 스트리밍을 중지합니다."""
-        if not self.is_streaming():
+        self.spawn_error = None
+        self.started_at = time.monotonic()
+        self.progress.reset()
+        self.stderr_tail.clear()
+        self._reader_tasks = [
+            asyncio.create_task(self._read_progress(self.ffmpeg_process.stdout)),
+            asyncio.create_task(self._read_stderr(self.ffmpeg_process.stderr)),
+        ]
+        if self.profile.input_kind in PIPE_INPUTS:
+            self._reader_tasks.append(asyncio.create_task(self._feed_frames(self.ffmpeg_process, profile)))
+        print(f"✅ FFmpeg RTSP 스트리밍 시작됨 (PID: {self.ffmpeg_process.pid}, 프로파일: {self.profile_name})")
+        return True
+
+    async def _read_progress(self, stream: asyncio.StreamReader) -> None:
+        """-progress 출력 읽기 (프로세스가 종료되어 파이프가 닫히면 끝남)"""
+        async for line in stream:
+            self.progress.feed_line(line.decode(errors="replace"))
+
+    async def _read_stderr(self, stream: asyncio.StreamReader) -> None:
+        """ffmpeg 경고/오류 메시지를 최근 몇 줄만 보관 (파이프가 가득 차서 ffmpeg가 멈추지 않도록 계속 읽음)"""
+        async for line in stream:
+            line = line.decode(errors="replace").strip()
+            if line:
+                self.stderr_tail.append(line)
+
+    async def _feed_frames(self, process: asyncio.subprocess.Process, profile: EncodingProfile) -> None:
+        """
+        브로드캐스터의 내부 구독자로 프레임을 받아 FFmpeg stdin에 씁니다.
+        FFmpeg이 느리면 drain()에서 기다리는 동안 구독자 큐에서 오래된 프레임이 버려지므로 캡처는 영향을 받지 않습니다.
+        프로파일에 fps가 있으면 그 속도로만 받으므로 출력에서 버려질 프레임은 인코딩/입력하지 않습니다.
+        """
+        # 브로드캐스터 입력(pipe_*)에서만 필요하므로 단독 RTSP 서버(Api_Rtsp)는 cv2/numpy를 임포트하지 않고 시작합니다.
+        import cv2
+        import numpy as np
+        from JpegEncodeCache import EncodeVariant
+
+        broadcaster = self.broadcaster
+        variant = EncodeVariant(quality=broadcaster.jpeg_quality, width=profile.width)
+        subscriber = broadcaster.subscribe("rtsp", drop_policy="drop_oldest", queue_size=4,
+                                           variant=variant, internal=True, max_fps=profile.fps,
+                                           shared_encode=(profile.input_kind == "pipe_mjpeg"))
+        try:
+            while True:
+                frame = await subscriber.get()
+                if profile.input_kind == "pipe_mjpeg":
+                    # 같은 변형을 요청한 웹소켓 클라이언트/녹화와 인코딩 결과를 공유
+                    encoded = await broadcaster.encode(frame, variant)
+                    if encoded is None:
+                        continue
+                    data = encoded.data
+                else:
+                    image = frame.image
+                    if image is None:
+                        # 녹화 재생 공급원은 인코딩된 프레임만 있으므로 디코딩
+                        image = cv2.imdecode(np.frombuffer(frame.encoded.data, np.uint8), cv2.IMREAD_COLOR)
+                    if image.shape[1] != profile.width or image.shape[0] != profile.height:
+                        image = letterbox(image, profile.width, profile.height)
+                    data = memoryview(np.ascontiguousarray(image)).cast("B")   # 1차원 바이트 뷰 (복사 없음)
+
+                process.stdin.write(data)
+                await process.stdin.drain()
+                self.frames_fed += 1
+                self.last_fed_at = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError):
+            # FFmpeg 종료: 감시 태스크가 재시작을 처리
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+            process.stdin.close()
+
+    async def _supervise(self) -> None:
+        """감시 태스크: 프로세스가 죽거나 멈추면 지수 백오프 후 다시 실행합니다. stop_stream()이 취소할 때까지 반복합니다."""
+        spawned = True
+        while True:
+            # 직전 재시작에서 실행하지 못했다면 ffmpeg_process는 이전에 죽은 프로세스이므로 감시하지 않음
+            reason = await self._watch(self.ffmpeg_process) if spawned else "spawn_failed"
+            if reason == "stall":
+                self.stalls += 1
+                # 멈춘 인코더는 정상 종료 처리를 기대하기 어려우므로 짧게 기다린 뒤 강제 종료
+                await self._terminate(timeout=2.0)
+            elif reason == "spawn_failed":
+                self.spawn_failures += 1
+            else:
+                self.crashes += 1
+                # 종료 직전의 오류 메시지까지 읽히도록 파이프가 닫힐 때까지 잠시 대기
+                if self._reader_tasks:
+                    await asyncio.wait(self._reader_tasks, timeout=1.0)
+                # 죽은 프로세스에 묶인 공급 태스크(내부 구독자)가 남지 않도록 재시작 전에 정리
+                await self._cancel_reader_tasks()
+
+            # 충분히 오래 정상 동작했다면 일시적인 장애로 보고 백오프를 처음부터 계산
+            if self.started_at is not None and time.monotonic() - self.started_at >= self.healthy_after:
+                self.consecutive_failures = 0
+            delay = min(self.backoff_initial * 2 ** self.consecutive_failures, self.backoff_max)
+            self.consecutive_failures += 1
+            if reason == "spawn_failed":
+                # 실행된 프로세스가 없으므로 종료 코드 없이 실행 실패 사유를 기록
+                exit_code, message = None, self.spawn_error
+            else:
+                exit_code = self.ffmpeg_process.returncode if self.ffmpeg_process is not None else None
+                message = self.stderr_tail[-1] if self.stderr_tail else None
+            self.last_failure = {"reason": reason, "exit_code": exit_code, "message": message, "time": time.time()}
+            print(f"⚠️ FFmpeg {reason} 감지, {delay:.1f}초 후 재시작 (연속 {self.consecutive_failures}회)")
+
+            self.next_restart_at = time.monotonic() + delay
+            await asyncio.sleep(delay)
+            self.next_restart_at = None
+            spawned = await self._spawn()
+            if spawned:
+                self.restarts += 1
+
+    async def _watch(self, process: Optional[asyncio.subprocess.Process]) -> str:
+        """프로세스가 종료되면 "crash", 진행 상태 갱신이 멈추면 "stall"을 반환합니다."""
+        if process is None or self.started_at is None:
+            return "spawn_failed"
+
+        exited = asyncio.ensure_future(process.wait())
+        try:
+            while True:
+                done, _ = await asyncio.wait({exited}, timeout=self.check_interval)
+                if done:
+                    return "crash"
+
+                # 첫 진행 상태가 나오기 전에는 startup_grace, 이후에는 stall_timeout 기준
+                if self.progress.updated_at is None:
+                    stalled = time.monotonic() - self.started_at > self.startup_grace
+                else:
+                    stalled = time.monotonic() - self.progress.updated_at > self.stall_timeout
+                # stdin 입력은 브로드캐스터가 일시중지되면 프레임이 없어 진행이 멈추는 것이 정상이므로,
+                # 마지막 진행 상태 이후에도 프레임을 넣었는데 진행하지 않을 때만 멈춘 것으로 판단
+                if stalled and self.profile.input_kind in PIPE_INPUTS:
+                    last_progress = self.progress.updated_at or self.started_at
+                    stalled = self.last_fed_at is not None and self.last_fed_at > last_progress
+                if stalled:
+                    return "stall"
+        finally:
+            exited.cancel()
+
+    async def _terminate(self, timeout: float = 5.0) -> None:
+        """프로세스 그룹에 SIGTERM을 보내고 기다립니다. timeout 안에 종료되지 않으면 SIGKILL로 강제 종료합니다."""
+        process = self.ffmpeg_process
+        if process is not None and process.returncode is None and process.stdin is not None:
+            # 파이프 입력: 공급 태스크를 먼저 멈추고 stdin을 닫아야 FFmpeg이 입력 대기에서 빠져나와 종료됩니다.
+            await self._cancel_reader_tasks()
+            if not process.stdin.is_closing():
+                process.stdin.close()
+        if process is not None and process.returncode is None:
+            try:
+                # start_new_session으로 실행했으므로 프로세스 그룹 ID = PID
+                os.killpg(process.pid, signal.SIGTERM)
+                os.killpg(process.pid, signal.SIGCONT)   # 일시정지(SIGSTOP)된 프로세스도 SIGTERM을 처리하도록
+                await asyncio.wait_for(process.wait(), timeout)
+                print("✅ FFmpeg RTSP 스트리밍 프로세스가 안전하게 종료되었습니다.")
+            except asyncio.TimeoutError:
+                print("⚠️ 종료 시간 초과, 강제 종료 (SIGKILL) 시도.")
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            except ProcessLookupError:
+                pass
+
+        # 파이프가 닫히면 읽기 태스크도 끝나지만, 하위 프로세스가 파이프를 잡고 있을 수 있으므로 취소
+        await self._cancel_reader_tasks()
+
+    async def _cancel_reader_tasks(self) -> None:
+        """
+        이전 프로세스의 출력 읽기/프레임 공급 태스크를 취소하고 끝날 때까지 기다립니다.
+        공급 태스크는 구독자 큐에서 대기 중일 수 있으므로, 취소해야 브로드캐스터에서 내부 구독자가 해제됩니다.
+        """
+        for task in self._reader_tasks:
+            task.cancel()
+        await asyncio.gather(*self._reader_tasks, return_exceptions=True)
+        self._reader_tasks = []
+
+    async def stop_stream(self) -> bool:
+        """RTSP 스트리밍(감시 태스크 포함)을 중지합니다. 프로세스 종료는 이벤트 루프를 막지 않고 기다립니다."""
+        if not self.is_running():
             print("🚨 RTSP 스트리밍이 이미 중지 상태입니다.")
             return False
-        
+
+        self._supervisor.cancel()
         try:
-            # os.setsid로 설정된 전체 프로세스 그룹에 SIGTERM을 전송하여 하위 프로세스까지 안전하게 종료 시도
-            os.killpg(os.getpgid(self.ffmpeg_process.pid), signal.SIGTERM)
-            
-            # 프로세스 종료 대기 (최대 5초)
-            self.ffmpeg_process.wait(timeout=5)
-            print("✅ FFmpeg RTSP 스트리밍 프로세스가 안전하게 종료되었습니다.")
-            
-        except subprocess.TimeoutExpired:
-            # 5초 내에 종료되지 않으면 강제 종료 (SIGKILL)
-            print("⚠️ 종료 시간 초과, 강제 종료 (SIGKILL) 시도.")
-            os.killpg(os.getpgid(self.ffmpeg_process.pid), signal.SIGKILL)
-            self.ffmpeg_process.wait()
-            
+            await self._supervisor
+        except asyncio.CancelledError:
+            pass
+        self._supervisor = None
+        self.next_restart_at = None
+
+        try:
+            await self._terminate()
         except Exception as e:
             print(f"❌ RTSP 스트리밍 중지 중 오류 발생: {e}")
             return False
-            
         finally:
             self.ffmpeg_process = None # 프로세스 객체 초기화
-            return True
-        
+        return True
+
     def get_status(self) -> dict:
         """현재 스트리밍 상태 정보를 반환합니다."""
-        status = self.is_streaming()
+        streaming = self.is_streaming()
+        if streaming:
+            status = "전송중"
+        elif self.is_running():
+            status = "재시작 대기중"
+        else:
+            status = "일시중지"
+
+        now = time.monotonic()
         return {
-            "status": "전송중" if status else "일시중지",
+            "status": status,
             "url": self.rtsp_url,
-            "pid": self.ffmpeg_process.pid if status else None
-        }
\ No newline at end of file
+            "pid": self.ffmpeg_process.pid if streaming else None,
+            "profile": self.profile_name,
+            "settings": self.profile._asdict(),
+            "progress": self.progress.to_dict(),   # 중지/종료 후에는 마지막으로 보고된 값
+            "frames_fed": self.frames_fed if self.profile.input_kind in PIPE_INPUTS else None,
+            "uptime_seconds": round(now - self.started_at, 1) if streaming and self.started_at else None,
+            "last_error": self.stderr_tail[-1] if self.stderr_tail else None,
+            "watchdog": {
+                "restarts": self.restarts,
+                "crashes": self.crashes,
+                "stalls": self.stalls,
+                "spawn_failures": self.spawn_failures,
+                "consecutive_failures": self.consecutive_failures,
+                "next_restart_in": round(max(self.next_restart_at - now, 0.0), 1)
+                if self.next_restart_at is not None else None,
+                "last_failure": self.last_failure,
+            },
+        }
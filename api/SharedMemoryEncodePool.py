@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from JpegEncodeCache import EncodedFrame, EncodeVariant, encode_variant
+from StreamMetrics import ENCODE_SECONDS
+
+# 워커 프로세스에서 연결해 둔 공유 메모리 (이름 -> SharedMemory)
+_attached: dict = {}
+
+
+def _init_worker(cpus: Tuple[int, ...]) -> None:
+    """워커 프로세스 초기화: 지정한 CPU 코어에 고정합니다. (Linux 외에서는 무시)"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"⚠️ 인코딩 프로세스 CPU 코어 고정 실패 ({cpus}): {e}")
+
+
+def _encode_slot(shm_name: str, offset: int, shape: tuple, dtype: str,
+                 variant: EncodeVariant) -> Optional[EncodedFrame]:
+    """워커 프로세스: 공유 메모리 슬롯의 프레임을 복사 없이 배열로 보고 인코딩합니다."""
+    shm = _attached.get(shm_name)
+    if shm is None:
+        # 브로드캐스터가 재시작되어 공유 메모리가 바뀌었으면 이전 것은 닫습니다.
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        shm = _attached[shm_name] = shared_memory.SharedMemory(name=shm_name)
+
+    image = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+    encoded = encode_variant(image, variant)
+    # memoryview는 pickle할 수 없으므로 프로세스 간 전달 시에만 bytes로 바꿉니다.
+    return encoded._replace(data=bytes(encoded.data)) if encoded is not None else None
+
+
+class SharedMemoryEncodePool:
+    """
+    JPEG 인코딩을 여러 워커 프로세스에서 병렬로 실행하는 풀입니다. (GIL을 피해 라즈베리파이의 코어를 모두 사용)
+
+    프레임은 공유 메모리의 슬롯(slots개)에 복사하고 워커에는 슬롯 위치와 모양만 전달하므로 numpy 배열이 pickle되지 않습니다.
+    워커가 돌려주는 것은 인코딩된 JPEG 바이트뿐이며, 인코딩이 끝나면 슬롯은 다시 사용됩니다.
+    빈 슬롯이 없으면 슬롯이 반환될 때까지 기다립니다. (이벤트 루프는 막지 않음)
+
+    공유 메모리는 첫 프레임의 크기로 만들어지며, 그보다 큰 프레임은 fits()가 False를 반환하므로
+    호출하는 쪽(FrameBroadcaster)이 스레드 풀로 인코딩합니다.
+    출력 순서는 호출하는 쪽이 프레임 번호 순서대로 결과를 기다리는 것으로 보장됩니다.
+    """
+
+    def __init__(self, workers: int = 3, slots: int = 0, cpus: Tuple[int, ...] = ()):
+        if workers < 1:
+            raise ValueError("workers는 1 이상이어야 합니다.")
+        self.workers = workers
+        self.slots = max(slots or workers * 2, workers)   # 워커가 모두 일할 수 있도록 최소 workers개
+        self.cpus = tuple(cpus)
+
+        self.slot_bytes = 0
+        self.encodes = 0        # 워커 프로세스에서 인코딩한 횟수
+        self.slot_waits = 0     # 빈 슬롯이 없어 기다린 횟수
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._free_slots: deque = deque()
+        self._slot_available: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """
+        워커 프로세스를 띄웁니다. 프로세스 생성과 cv2 임포트에 시간이 걸리므로 이벤트 루프 밖에서 호출합니다.
+        캡처 스레드가 도는 프로세스를 fork하지 않도록 spawn으로 시작합니다.
+        """
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(self.cpus,))
+        # 첫 프레임이 프로세스 생성 시간을 기다리지 않도록 워커를 미리 띄워 둡니다.
+        for future in [self._executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        self.slot_bytes = 0
+        self._free_slots.clear()
+        self._slot_available = None
+
+    def fits(self, image: np.ndarray) -> bool:
+        """이 프레임을 슬롯에 담을 수 있는지 반환합니다. (공유 메모리를 만들기 전에는 항상 True)"""
+        return self._executor is not None and (self._shm is None or image.nbytes <= self.slot_bytes)
+
+    def submit(self, image: np.ndarray, variant: EncodeVariant) -> asyncio.Future:
+        """프레임 하나의 인코딩을 예약합니다. 이벤트 루프에서 호출하며, 결과는 EncodedFrame입니다."""
+        if self._shm is None:
+            self._allocate(image.nbytes)
+        return asyncio.ensure_future(self._encode(image, variant))
+
+    def _allocate(self, slot_bytes: int) -> None:
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=slot_bytes * self.slots)
+        self._free_slots = deque(range(self.slots))
+        self._slot_available = asyncio.Semaphore(self.slots)
+        self._loop = asyncio.get_running_loop()
+
+    async def _encode(self, image: np.ndarray, variant: EncodeVariant) -> Optional[EncodedFrame]:
+        if self._slot_available.locked():
+            self.slot_waits += 1
+        await self._slot_available.acquire()
+        slot = self._free_slots.popleft()
+
+        offset = slot * self.slot_bytes
+        np.copyto(np.ndarray(image.shape, dtype=image.dtype, buffer=self._shm.buf, offset=offset), image)
+        try:
+            future: Future = self._executor.submit(_encode_slot, self._shm.name, offset, image.shape,
+                                                   image.dtype.str, variant)
+        except Exception:
+            self._release(slot, self._shm)
+            raise
+        # 이 코루틴이 취소되더라도 워커가 슬롯을 다 읽은 뒤에 반환되도록 워커 쪽 Future 완료 시점에 반환합니다.
+        loop = self._loop
+        shm = self._shm
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, slot, shm))
+
+        encoded = await asyncio.wrap_future(future)
+        self.encodes += 1
+        if encoded is not None:
+            # 워커 프로세스의 메트릭은 전달되지 않으므로 여기서 기록합니다.
+            ENCODE_SECONDS.observe(encoded.encode_seconds)
+        return encoded
+
+    def _release(self, slot: int, shm: shared_memory.SharedMemory) -> None:
+        if shm is not self._shm:
+            # 이미 종료(shutdown)된 풀의 슬롯
+            return
+        self._free_slots.append(slot)
+        self._slot_available.release()
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "slots_in_use": self.slots - len(self._free_slots) if self._shm is not None else 0,
+            "encodes": self.encodes,
+            "slot_waits": self.slot_waits,
+        }
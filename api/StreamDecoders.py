@@ -0,0 +1,124 @@
+import struct
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+# 수신 측(WebsocketClient)이 사용하는 tiles / h264 모드의 메시지 형식과 디코더입니다.
+# 중앙 서버의 클라이언트가 엣지 서버 모듈(브로드캐스터, FFmpeg 관리 등)을 임포트하지 않도록 서버 모듈에 의존하지 않으며,
+# 서버의 인코더(TileDeltaEncoder, H264StreamEncoder)도 같은 형식 정의를 여기서 가져옵니다.
+
+# 타일 메시지 형식 (little-endian)
+#   헤더: magic(2s) "TL", flags(B), 프레임 가로(H), 세로(H), 열 수(B), 행 수(B), 타일 개수(H)
+#   타일: 열(B), 행(B), JPEG 길이(I) + JPEG 바이트
+# flags의 0번 비트가 1이면 모든 타일이 포함된 키프레임입니다.
+TILE_MAGIC = b"TL"
+TILE_HEADER = struct.Struct("<2sBHHBBH")
+TILE_ENTRY = struct.Struct("<BBI")
+FLAG_KEYFRAME = 0x01
+
+
+def tile_edges(length: int, count: int) -> list:
+    """길이를 count개 구간으로 나눈 경계 좌표입니다. 인코더와 디코더가 같은 계산을 사용합니다."""
+    return [i * length // count for i in range(count + 1)]
+
+
+def is_tile_message(data: bytes) -> bool:
+    return data[:2] == TILE_MAGIC
+
+
+class TileDeltaDecoder:
+    """TileDeltaEncoder가 만든 타일 메시지를 받아 전체 프레임을 복원하는 디코더입니다. (수신 측 사용)"""
+
+    def __init__(self):
+        self.canvas: Optional[np.ndarray] = None
+        self.has_keyframe = False
+
+    def decode(self, data: bytes) -> Optional[np.ndarray]:
+        """
+        타일 메시지를 적용한 전체 프레임을 반환합니다.
+        첫 키프레임을 받기 전에는 None을 반환합니다. (반환된 배열은 다음 호출 시 갱신되므로 필요하면 복사하세요)
+        """
+        view = memoryview(data)
+        _, flags, width, height, cols, rows, tile_count = TILE_HEADER.unpack_from(view, 0)
+        keyframe = bool(flags & FLAG_KEYFRAME)
+
+        if keyframe:
+            self.has_keyframe = True
+        if not self.has_keyframe:
+            return None
+
+        x_edges = tile_edges(width, cols)
+        y_edges = tile_edges(height, rows)
+        offset = TILE_HEADER.size
+
+        for _ in range(tile_count):
+            col, row, length = TILE_ENTRY.unpack_from(view, offset)
+            offset += TILE_ENTRY.size
+            tile = cv2.imdecode(np.frombuffer(view[offset:offset + length], np.uint8), cv2.IMREAD_UNCHANGED)
+            offset += length
+            if tile is None:
+                continue
+
+            if self.canvas is None or self.canvas.shape[:2] != (height, width) or self.canvas.ndim != tile.ndim:
+                shape = (height, width) if tile.ndim == 2 else (height, width, tile.shape[2])
+                self.canvas = np.zeros(shape, dtype=np.uint8)
+
+            self.canvas[y_edges[row]:y_edges[row + 1], x_edges[col]:x_edges[col + 1]] = tile
+
+        return self.canvas
+
+
+# H.264 Annex B elementary stream: NAL 유닛은 시작 코드(00 00 01 또는 00 00 00 01)로 구분됩니다.
+START_CODE = b"\x00\x00\x01"
+NAL_IDR = 5     # 키프레임 슬라이스
+NAL_AUD = 9     # 액세스 유닛 구분자 (프레임마다 맨 앞에 삽입)
+AUD_PREFIX = START_CODE + bytes([NAL_AUD])
+
+
+def nal_types(access_unit) -> List[int]:
+    """액세스 유닛에 들어 있는 NAL 유닛 종류 목록을 반환합니다."""
+    data = bytes(access_unit)
+    types = []
+    position = data.find(START_CODE)
+    while position != -1 and position + 3 < len(data):
+        types.append(data[position + 3] & 0x1F)
+        position = data.find(START_CODE, position + 3)
+    return types
+
+
+def is_h264_message(payload) -> bool:
+    """봉투 없이 받은 메시지가 H.264 액세스 유닛(Annex B)인지 확인합니다."""
+    head = bytes(payload[:4])
+    return head == b"\x00" + START_CODE or head[:3] == START_CODE
+
+
+class H264Decoder:
+    """
+    수신 측(WebsocketClient)에서 H.264 프레임을 BGR 이미지로 복원하는 디코더입니다. PyAV(pip install av)가 필요합니다.
+    디코더 상태가 이전 프레임에 의존하므로 스트림(엣지)마다 하나씩 만들어 순서대로 decode()를 호출해야 합니다.
+    """
+
+    def __init__(self):
+        # 수신 측에서만 필요한 선택 의존성이며, 임포트가 무거우므로 서버(Api_Websocket) 시작 시에는 임포트하지 않습니다.
+        try:
+            import av
+        except ImportError:
+            raise RuntimeError("h264 모드를 수신하려면 PyAV가 필요합니다. (pip install av)")
+        self._av = av
+        self._codec = av.CodecContext.create("h264", "r")
+        self.frames_decoded = 0
+        self.decode_errors = 0
+
+    def decode(self, payload) -> Optional[np.ndarray]:
+        """프레임 하나(액세스 유닛)를 디코딩합니다. 키프레임을 받기 전이거나 디코딩할 수 없으면 None을 반환합니다."""
+        # 메시지 하나가 완전한 액세스 유닛이므로 파서를 거치지 않고 바로 패킷으로 디코딩 (파서는 다음 프레임까지 기다림)
+        image = None
+        try:
+            for frame in self._codec.decode(self._av.Packet(bytes(payload))):
+                image = frame.to_ndarray(format="bgr24")
+                self.frames_decoded += 1
+        except self._av.error.FFmpegError:
+            # 참조 프레임을 놓친 P 프레임 등: 다음 키프레임부터 다시 복원됩니다.
+            self.decode_errors += 1
+        return image
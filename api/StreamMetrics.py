@@ -0,0 +1,189 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Callable, Optional
+
+# 초 단위 지연시간 히스토그램의 기본 버킷 (1ms ~ 1s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# 연결/시작처럼 초 단위까지 걸릴 수 있는 구간용 버킷 (초)
+STARTUP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """단조 증가하는 카운터입니다."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> list:
+        return [(self.name, self.value)]
+
+    def to_dict(self):
+        return self.value
+
+
+class Gauge:
+    """
+    현재 값을 나타내는 게이지입니다. function을 지정하면 조회할 때마다 값을 계산합니다.
+    label을 지정하면 function은 {레이블 값: 값} dict를 반환하며, 레이블 값마다 샘플 하나씩 내보냅니다. (예: 카메라별)
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, function: Optional[Callable[[], float]] = None,
+                 label: Optional[str] = None):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0.0
+        self.function = function
+        self.label = label
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return 0.0
+        return self.value
+
+    def get_labeled(self) -> dict:
+        try:
+            return {str(key): float(value) for key, value in self.function().items()}
+        except Exception:
+            return {}
+
+    def samples(self) -> list:
+        if self.label is not None:
+            return [(f'{self.name}{{{self.label}="{key}"}}', value) for key, value in self.get_labeled().items()]
+        return [(self.name, self.get())]
+
+    def to_dict(self):
+        if self.label is not None:
+            return self.get_labeled()
+        return self.get()
+
+
+class Histogram:
+    """
+    고정 버킷 히스토그램입니다. observe()는 이진 탐색과 덧셈 몇 번뿐이므로 30fps에서도 켜둘 수 있습니다.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def samples(self) -> list:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+
+        result = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            result.append((f'{self.name}_bucket{{le="{bound}"}}', cumulative))
+        result.append((f'{self.name}_bucket{{le="+Inf"}}', count))
+        result.append((f"{self.name}_sum", total))
+        result.append((f"{self.name}_count", count))
+        return result
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "avg": round(total / count, 6) if count else 0.0,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts)),
+        }
+
+
+class MetricsRegistry:
+    """메트릭을 모아 Prometheus 텍스트 형식 또는 JSON(dict)으로 내보냅니다."""
+
+    def __init__(self):
+        self._metrics: dict = {}
+
+    def register(self, metric):
+        # 같은 이름으로 다시 등록하면 기존 메트릭을 그대로 돌려줍니다. (모듈 재임포트 대비)
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self.register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str, function: Optional[Callable[[], float]] = None,
+              label: Optional[str] = None) -> Gauge:
+        gauge = self.register(Gauge(name, help_text, label=label))
+        if function is not None:
+            gauge.set_function(function)
+        return gauge
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, buckets))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, value in metric.samples():
+                lines.append(f"{sample_name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        return {name: metric.to_dict() for name, metric in self._metrics.items()}
+
+
+# **메트릭 레지스트리 싱글톤** (FastAPI 앱마다 /api/metrics로 노출)
+REGISTRY = MetricsRegistry()
+
+# 스트리밍 파이프라인 공통 메트릭
+CAPTURE_READ_SECONDS = REGISTRY.histogram("edge_capture_read_seconds", "프레임 공급원 read() 소요 시간")
+CAPTURE_FRAMES = REGISTRY.counter("edge_capture_frames_total", "캡처한 프레임 수")
+CAPTURE_ERRORS = REGISTRY.counter("edge_capture_errors_total", "프레임 읽기 실패 수")
+ENCODE_SECONDS = REGISTRY.histogram("edge_encode_seconds", "JPEG/타일 인코딩 소요 시간")
+FRAMES_SENT = REGISTRY.counter("edge_frames_sent_total", "웹소켓으로 송신한 프레임 수")
+BYTES_SENT = REGISTRY.counter("edge_bytes_sent_total", "웹소켓으로 송신한 바이트 수")
+SEND_SECONDS = REGISTRY.histogram("edge_send_seconds", "웹소켓 send_bytes 완료까지 걸린 시간")
+FRAMES_DROPPED = REGISTRY.counter("edge_frames_dropped_total", "구독자 큐가 가득 차서 버려진 프레임 수")
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram("edge_event_loop_lag_seconds", "이벤트 루프 지연 (예정 시각 대비 늦게 깨어난 시간)")
+FIRST_FRAME_SECONDS = REGISTRY.histogram("edge_first_frame_seconds", "웹소켓 연결 수락부터 첫 프레임 송신까지 걸린 시간",
+                                         STARTUP_BUCKETS)
+STARTUP_SECONDS = REGISTRY.gauge("edge_startup_seconds", "서버 시작 시간 (앱 모듈 임포트 + lifespan 시작)")
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """주기적으로 잠들었다가 예정보다 얼마나 늦게 깨어났는지 측정하여 이벤트 루프 지연을 기록합니다."""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(time.monotonic() - started - interval, 0.0))
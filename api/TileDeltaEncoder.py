@@ -0,0 +1,109 @@
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from JpegEncodeCache import EncodedFrame, EncodeVariant, prepare_image
+from StreamDecoders import FLAG_KEYFRAME, TILE_ENTRY, TILE_HEADER, TILE_MAGIC, tile_edges
+from StreamMetrics import ENCODE_SECONDS
+
+
+
+class TileDeltaEncoder:
+    """
+    프레임을 격자로 나누어 마지막으로 보낸 프레임과 달라진 타일만 JPEG 인코딩하는 인코더입니다.
+
+    구독자(연결)마다 하나씩 사용합니다. 고정된 실내 카메라처럼 대부분의 영역이 정지해 있으면
+    인코딩 시간과 대역폭이 크게 줄어듭니다. keyframe_interval 프레임마다, 또는 request_keyframe() 호출 시
+    모든 타일을 담은 키프레임을 보냅니다.
+    """
+
+    def __init__(self, variant: EncodeVariant = EncodeVariant(), cols: int = 8, rows: int = 6,
+                 threshold: float = 6.0, keyframe_interval: int = 60, sample_step: int = 4):
+        self.variant = variant
+        self.cols = cols
+        self.rows = rows
+        self.threshold = threshold                  # 타일 변화 판단 기준 (평균 밝기 차이)
+        self.keyframe_interval = keyframe_interval  # 0이면 요청 시에만 키프레임
+        self.sample_step = sample_step              # 비교 시 샘플링 간격 (픽셀)
+
+        self.frames_encoded = 0
+        self.keyframes = 0
+        self.tiles_sent = 0
+        self.tiles_total = 0
+
+        self._reference: Optional[np.ndarray] = None  # 수신 측이 가지고 있는 것과 같은 이미지
+        self._frames_since_keyframe = 0
+        self._keyframe_requested = True
+
+    def request_keyframe(self) -> None:
+        self._keyframe_requested = True
+
+    def encode(self, image: np.ndarray) -> Optional[EncodedFrame]:
+        """프레임 하나를 타일 메시지로 인코딩합니다. 바뀐 타일이 없으면 None을 반환합니다. (인코딩 스레드 풀에서 실행)"""
+        started = time.perf_counter()
+        image = prepare_image(image, self.variant)
+        height, width = image.shape[:2]
+
+        keyframe = (self._keyframe_requested
+                    or self._reference is None
+                    or self._reference.shape != image.shape
+                    or (self.keyframe_interval and self._frames_since_keyframe >= self.keyframe_interval))
+
+        if keyframe:
+            self._reference = image.copy()
+            self._keyframe_requested = False
+            self._frames_since_keyframe = 0
+        else:
+            self._frames_since_keyframe += 1
+
+        x_edges = tile_edges(width, self.cols)
+        y_edges = tile_edges(height, self.rows)
+        step = self.sample_step
+        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.variant.quality]
+        parts = []
+
+        for row in range(self.rows):
+            for col in range(self.cols):
+                y0, y1 = y_edges[row], y_edges[row + 1]
+                x0, x1 = x_edges[col], x_edges[col + 1]
+                tile = image[y0:y1, x0:x1]
+
+                if not keyframe:
+                    reference_tile = self._reference[y0:y1, x0:x1]
+                    diff = np.abs(tile[::step, ::step].astype(np.int16) - reference_tile[::step, ::step]).mean()
+                    if diff < self.threshold:
+                        continue
+                    reference_tile[...] = tile
+
+                ok, buffer = cv2.imencode('.jpg', tile, encode_param)
+                if not ok:
+                    continue
+                parts.append(TILE_ENTRY.pack(col, row, len(buffer)))
+                parts.append(buffer)
+
+        tile_count = len(parts) // 2
+        self.tiles_total += self.cols * self.rows
+        if tile_count == 0:
+            return None
+
+        self.frames_encoded += 1
+        self.tiles_sent += tile_count
+        if keyframe:
+            self.keyframes += 1
+
+        header = TILE_HEADER.pack(TILE_MAGIC, FLAG_KEYFRAME if keyframe else 0,
+                                  width, height, self.cols, self.rows, tile_count)
+        encode_seconds = time.perf_counter() - started
+        ENCODE_SECONDS.observe(encode_seconds)
+        return EncodedFrame(b"".join([header, *parts]), width, height, encode_seconds, keyframe)
+
+    def get_stats(self) -> dict:
+        ratio = self.tiles_sent / self.tiles_total if self.tiles_total else 0.0
+        return {
+            "grid": f"{self.cols}x{self.rows}",
+            "frames_encoded": self.frames_encoded,
+            "keyframes": self.keyframes,
+            "tile_send_ratio": round(ratio, 3),
+        }
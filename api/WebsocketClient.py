@@ -2,16 +2,32 @@
 # 테스트 시 데스크탑 또는 랩탑으로 같은 네트워크 환경임을 확인 후 연결 바랍니다.
 # 서버IP와 포트는 라즈베리파이 서버의 IP와 포트로 설정해야 합니다.
 
+import argparse
 import asyncio
+import inspect
+import os
+import queue
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
 import websockets
 import cv2
 import numpy as np
 import base64
 
+from StreamDecoders import H264Decoder, TileDeltaDecoder, is_h264_message, is_tile_message
+from FrameEnvelope import CODEC_H264, CODEC_TILES, unpack_message
+
 
 SERVER_IP = "192.168.0.11" 
 SERVER_PORT = 8080
-WEBSOCKET_URL = f"ws://{SERVER_IP}:{SERVER_PORT}/ws/stream"
+# 전송 모드: "jpeg" (프레임마다 JPEG 한 장), "tiles" (바뀐 타일만 수신하여 전체 프레임 복원)
+# 또는 "h264" (H.264 프레임 수신, 대역폭이 가장 작음, PyAV 필요: pip install av)
+STREAM_MODE = "jpeg"
+# 한 메시지에 묶어 받을 프레임 수 (1이면 프레임마다 한 메시지)
+BATCH_SIZE = 1
+WEBSOCKET_URL = f"ws://{SERVER_IP}:{SERVER_PORT}/ws/stream?mode={STREAM_MODE}&envelope=true&batch={BATCH_SIZE}"
 
 
 async def receive_stream():
@@ -23,20 +39,40 @@ async def receive_stream():
             print("✅ WebSocket 연결 성공. 스트리밍 시작 대기중")
 
             cv2.namedWindow('Received Stream', cv2.WINDOW_NORMAL) # 윈도우 생성
+            tile_decoder = TileDeltaDecoder()  # tiles 모드에서 전체 프레임을 복원하는 디코더
+            h264_decoder = None                # h264 모드에서 처음 프레임을 받을 때 생성 (PyAV)
+            last_seq = None     # 봉투의 연결별 순번으로 누락된 프레임을 확인 (요청 속도로 건너뛴 프레임은 세지 않음)
+            missing_frames = 0
             
             while True:
                 try:
-                    # 1. 서버로부터 바이너리 데이터(JPEG 프레임) 수신
-                    image_data = await websocket.recv()
-                    
-                    # 2. 수신된 바이트 데이터를 NumPy 배열로 변환
-                    nparr = np.frombuffer(image_data, np.uint8)
-                    
-                    # 3. OpenCV를 사용하여 JPEG 디코딩
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                    # 1. 서버로부터 바이너리 데이터(봉투 또는 JPEG 프레임) 수신
+                    data = await websocket.recv()
+
+                    # 2. 봉투/배치 헤더 해석 (payload는 복사하지 않는 memoryview)
+                    frame = None
+                    for message in unpack_message(data):
+                        if message.seq is not None:
+                            if last_seq is not None and message.seq > last_seq + 1:
+                                missing_frames += message.seq - last_seq - 1
+                                print(f"⚠️ 프레임 누락 감지: {last_seq + 1} ~ {message.seq - 1} (누적 {missing_frames}개)")
+                            last_seq = message.seq
+
+                        if message.codec == CODEC_TILES or is_tile_message(message.payload):
+                            # 3-1. 타일 메시지: 바뀐 타일만 이전 프레임 위에 덮어써서 전체 프레임 복원
+                            frame = tile_decoder.decode(message.payload)
+                        elif message.codec == CODEC_H264 or is_h264_message(message.payload):
+                            # 3-2. H.264 프레임: 이전 프레임을 참조하므로 같은 디코더로 순서대로 디코딩
+                            if h264_decoder is None:
+                                h264_decoder = H264Decoder()
+                            frame = h264_decoder.decode(message.payload)
+                        else:
+                            # 3. 수신된 바이트 데이터를 NumPy 배열로 변환 후 OpenCV로 JPEG 디코딩
+                            nparr = np.frombuffer(message.payload, np.uint8)
+                            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
                     if frame is not None:
-                        # 4. 화면에 이미지 표시
+                        # 4. 화면에 이미지 표시 (배치로 받은 경우 마지막 프레임만 표시)
                         cv2.imshow('Received Stream', frame)
                         
                         # 5. 'q'를 누르면 종료
@@ -63,8 +99,222 @@ async def receive_stream():
         print("✅ 스트리밍 클라이언트 종료.")
 
 
+# ---------------------------------------------------------------------------
+# 여러 라즈베리파이(엣지)를 한 프로세스에서 동시에 수신하는 헤드리스 모드
+# ---------------------------------------------------------------------------
+
+def decode_jpeg(payload) -> Optional[np.ndarray]:
+    """JPEG 디코딩 (디코딩 풀에서 실행, cv2.imdecode는 실행 중 GIL을 해제합니다)"""
+    return cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+
+
+class EdgeStats:
+    """엣지(라즈베리파이) 하나의 수신 통계입니다."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.connected = False
+        self.reconnects = 0
+        self.frames = 0
+        self.bytes = 0
+        self.missing_frames = 0
+        self.decode_errors = 0
+        self.decode_seconds = 0.0
+        self.last_seq: Optional[int] = None   # 연결별 순번이므로 재연결하면 처음부터
+
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self.fps = 0.0
+
+    def record(self, message, decode_seconds: float) -> None:
+        self.frames += 1
+        self.bytes += len(message.payload)
+        self.decode_seconds += decode_seconds
+
+        if message.seq is not None:
+            if self.last_seq is not None and message.seq > self.last_seq + 1:
+                self.missing_frames += message.seq - self.last_seq - 1
+            self.last_seq = message.seq
+
+        # 최근 구간의 수신 FPS
+        self._window_frames += 1
+        elapsed = time.monotonic() - self._window_start
+        if elapsed >= 2.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = time.monotonic()
+            self._window_frames = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "connected": self.connected,
+            "fps": round(self.fps, 2),
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "missing_frames": self.missing_frames,
+            "decode_errors": self.decode_errors,
+            "avg_decode_ms": round(self.decode_seconds * 1000 / self.frames, 2) if self.frames else 0.0,
+            "reconnects": self.reconnects,
+        }
+
+
+class QueueSink:
+    """
+    디코딩된 프레임을 스레드 안전한 큐에 넣는 싱크입니다. (추론 스레드 등에서 queue.get()으로 꺼내 사용)
+    큐가 가득 차면 가장 오래된 프레임을 버려 항상 최신 프레임이 남도록 합니다.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def __call__(self, edge_name: str, frame: np.ndarray, message) -> None:
+        while True:
+            try:
+                self.queue.put_nowait((edge_name, message.seq, frame))
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class MultiEdgeReceiver:
+    """
+    여러 엣지의 웹소켓 스트림을 하나의 asyncio 프로세스에서 동시에 수신하는 헤드리스 수신기입니다.
+
+    - 이벤트 루프는 수신과 봉투 해석만 하고, JPEG 디코딩은 스레드 풀(또는 프로세스 풀)에서 실행하므로
+      처리량이 코어 수에 비례해 늘어납니다.
+    - 디코딩된 프레임은 sink(edge_name, frame, message)로 전달됩니다. 추론 콜백(동기/비동기)이나 QueueSink를 사용할 수 있습니다.
+    - 엣지마다 메시지를 순서대로 처리하므로 타일/h264 모드의 프레임 복원 상태도 엣지별로 유지됩니다.
+    - 연결이 끊기면 지수 백오프로 다시 연결합니다.
+    """
+
+    def __init__(self, edges: dict, sink: Callable, decode_workers: Optional[int] = None,
+                 use_processes: bool = False):
+        self.edges = edges      # {엣지 이름: 웹소켓 URL}
+        self.sink = sink
+        self.decode_workers = decode_workers or os.cpu_count() or 4
+        self.use_processes = use_processes  # True면 JPEG 디코딩을 프로세스 풀에서 실행 (GIL 회피)
+        self.stats = {name: EdgeStats(name, url) for name, url in edges.items()}
+        self._executor: Optional[Executor] = None
+
+    async def run(self) -> None:
+        if self.use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=self.decode_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="jpeg-decode")
+
+        try:
+            await asyncio.gather(*(self._receive_edge(name, url) for name, url in self.edges.items()))
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def _receive_edge(self, name: str, url: str) -> None:
+        stats = self.stats[name]
+        tile_decoder = TileDeltaDecoder()
+        h264_decoder: Optional[H264Decoder] = None
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+
+        while True:
+            try:
+                async with websockets.connect(url, max_size=None) as websocket:
+                    print(f"✅ [{name}] 연결 성공: {url}")
+                    stats.connected = True
+                    stats.last_seq = None
+                    h264_decoder = None
+                    backoff = 1.0
+
+                    async for data in websocket:
+                        for message in unpack_message(data):
+                            started = time.monotonic()
+                            if message.codec == CODEC_TILES or is_tile_message(message.payload):
+                                # 타일 복원은 엣지별 상태가 있으므로 스레드에서 순서대로 실행
+                                frame = await asyncio.to_thread(tile_decoder.decode, message.payload)
+                            elif message.codec == CODEC_H264 or is_h264_message(message.payload):
+                                # H.264도 디코더 상태가 엣지별로 있으므로 순서대로 실행 (재연결 시 새 디코더)
+                                if h264_decoder is None:
+                                    h264_decoder = H264Decoder()
+                                frame = await asyncio.to_thread(h264_decoder.decode, message.payload)
+                            elif self.use_processes:
+                                # 프로세스 풀은 memoryview를 전달할 수 없으므로 bytes로 변환
+                                frame = await loop.run_in_executor(self._executor, decode_jpeg, bytes(message.payload))
+                            else:
+                                frame = await loop.run_in_executor(self._executor, decode_jpeg, message.payload)
+
+                            if frame is None:
+                                stats.decode_errors += 1
+                                continue
+
+                            stats.record(message, time.monotonic() - started)
+                            result = self.sink(name, frame, message)
+                            if inspect.isawaitable(result):
+                                await result
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ [{name}] 연결 종료/오류: {e} ({backoff:.0f}초 후 재연결)")
+
+            stats.connected = False
+            stats.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def get_stats(self) -> list:
+        return [stats.to_dict() for stats in self.stats.values()]
+
+
+async def run_headless(edges: dict, decode_workers: Optional[int], use_processes: bool, report_interval: float) -> None:
+    """헤드리스 모드 실행: QueueSink로 받은 프레임을 버리면서 엣지별 통계를 주기적으로 출력합니다."""
+    sink = QueueSink()
+    receiver = MultiEdgeReceiver(edges, sink, decode_workers=decode_workers, use_processes=use_processes)
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_interval)
+            # 실제 서비스에서는 추론 스레드가 sink.queue를 소비합니다. 여기서는 비워서 통계만 확인합니다.
+            while not sink.queue.empty():
+                sink.queue.get_nowait()
+            for edge in receiver.get_stats():
+                print(f"[{edge['name']}] {edge['fps']} fps, 누락 {edge['missing_frames']}, "
+                      f"디코딩 {edge['avg_decode_ms']} ms, 재연결 {edge['reconnects']}")
+
+    await asyncio.gather(receiver.run(), report())
+
+
+def parse_edges(value: str, mode: str = "jpeg", fps: float = 0.0) -> dict:
+    """
+    "이름=IP:포트,이름=IP:포트" 형식을 {이름: 웹소켓 URL}로 변환합니다.
+    mode는 전송 모드(jpeg/tiles/h264), fps는 엣지마다 받을 최대 초당 프레임 수(0이면 카메라 속도)입니다.
+    """
+    edges = {}
+    for item in value.split(","):
+        name, _, address = item.partition("=")
+        if not address:
+            name, address = f"edge{len(edges) + 1}", name
+        edges[name] = f"ws://{address}/ws/stream?mode={mode}&envelope=true" + (f"&fps={fps:g}" if fps > 0 else "")
+    return edges
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="라즈베리파이 웹소켓 스트림 수신 클라이언트")
+    parser.add_argument("--edges", help='헤드리스 모드로 여러 엣지 수신 (예: "room1=192.168.0.11:8080,room2=192.168.0.12:8080")')
+    parser.add_argument("--workers", type=int, default=None, help="디코딩 워커 수 (기본값: CPU 코어 수)")
+    parser.add_argument("--processes", action="store_true", help="JPEG 디코딩을 프로세스 풀에서 실행")
+    parser.add_argument("--mode", default="jpeg", choices=("jpeg", "tiles", "h264"), help="헤드리스 모드의 전송 모드")
+    parser.add_argument("--fps", type=float, default=0.0, help="헤드리스 모드에서 엣지마다 받을 최대 FPS (0이면 카메라 속도)")
+    parser.add_argument("--report", type=float, default=5.0, help="통계 출력 간격 (초)")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(receive_stream())
+        if args.edges:
+            asyncio.run(run_headless(parse_edges(args.edges, args.mode, args.fps), args.workers, args.processes, args.report))
+        else:
+            asyncio.run(receive_stream())
     except KeyboardInterrupt:
-        print("✅ 사용자에 의해 클라이언트가 종료됩니다.")
\ No newline at end of file
+        print("✅ 사용자에 의해 클라이언트가 종료됩니다.")
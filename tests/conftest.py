@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 서버 모듈은 api/ 디렉터리에서 실행되는 것을 전제로 서로를 바로 import 합니다.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
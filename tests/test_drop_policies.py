@@ -0,0 +1,113 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from FrameBroadcaster import CapturedFrame, FrameSubscriber, SubscriberClosed
+from FrameBufferPool import FrameBufferPool
+
+
+def frame(seq: int, fps: float = 30.0, image=None) -> CapturedFrame:
+    return CapturedFrame(seq, image, seq / fps)
+
+
+def drain(subscriber: FrameSubscriber) -> list:
+    """큐에 남은 프레임의 seq를 꺼내는 순서대로 반환합니다."""
+    async def collect():
+        seqs = []
+        while subscriber._queue:
+            seqs.append((await subscriber.get()).seq)
+        return seqs
+
+    return asyncio.run(collect())
+
+
+def test_latest_keeps_only_newest_frame():
+    subscriber = FrameSubscriber("latest", queue_size=4, drop_policy="latest")
+    for seq in range(5):
+        assert subscriber.offer(frame(seq))
+
+    assert drain(subscriber) == [4]
+    assert subscriber.frames_dropped == 4
+
+
+def test_drop_oldest_keeps_most_recent_queue_size_frames():
+    subscriber = FrameSubscriber("oldest", queue_size=2, drop_policy="drop_oldest")
+    for seq in range(5):
+        assert subscriber.offer(frame(seq))
+
+    assert drain(subscriber) == [3, 4]
+    assert subscriber.frames_dropped == 3
+
+
+def test_disconnect_closes_after_max_consecutive_drops():
+    subscriber = FrameSubscriber("strict", queue_size=1, drop_policy="disconnect", max_drops=3)
+    assert subscriber.offer(frame(0))
+    assert not subscriber.offer(frame(1))
+    assert not subscriber.offer(frame(2))
+    assert not subscriber.closed
+
+    # 프레임을 가져가면 연속 드롭 수는 처음부터 다시 셈
+    assert drain(subscriber) == [0]
+    for seq in range(3, 7):
+        subscriber.offer(frame(seq))
+    assert subscriber.closed
+    assert subscriber.frames_dropped == 5
+
+    # 연결 해제 시 큐도 비우므로 다음 get()은 바로 연결 해제를 알림
+    async def next_frame():
+        await subscriber.get()
+
+    with pytest.raises(SubscriberClosed):
+        asyncio.run(next_frame())
+    assert not subscriber.offer(frame(7))
+
+
+def test_rate_and_pause_skip_frames_without_counting_drops():
+    subscriber = FrameSubscriber("slow", queue_size=100, drop_policy="drop_oldest", max_fps=10)
+    accepted = [seq for seq in range(30) if subscriber.offer(frame(seq))]
+    assert len(accepted) == 10
+    assert subscriber.frames_skipped == 20
+    assert subscriber.frames_dropped == 0
+
+    subscriber.set_paused(True)
+    assert not any(subscriber.offer(frame(seq)) for seq in range(30, 40))
+    assert subscriber.frames_skipped == 30
+
+
+def test_preloaded_frames_exceed_queue_size_until_consumed():
+    subscriber = FrameSubscriber("h264", queue_size=2, drop_policy="drop_oldest")
+    subscriber.preload([frame(seq) for seq in range(5)])
+    assert subscriber.offer(frame(5))
+    assert subscriber.frames_dropped == 0
+
+    assert drain(subscriber) == [0, 1, 2, 3, 4, 5]
+
+    # 미리 넣은 프레임을 모두 꺼내면 원래 queue_size로 돌아옴
+    for seq in range(6, 10):
+        subscriber.offer(frame(seq))
+    assert drain(subscriber) == [8, 9]
+
+
+def test_dropped_frames_release_pool_buffers():
+    pool = FrameBufferPool(max_buffers=8)
+    subscriber = FrameSubscriber("pool", queue_size=2, drop_policy="drop_oldest", frame_pool=pool)
+    images = []
+    for seq in range(6):
+        image = np.zeros((4, 4, 3), dtype=np.uint8)
+        pool.adopt(image)
+        subscriber.offer(frame(seq, image=image))
+        pool.release(image)     # 캡처 루프는 발행 후 놓음
+        images.append(image)    # 풀은 id()로 배열을 구분하므로 테스트 동안 살려 둠
+
+    # 큐에 남은 두 프레임만 사용 중
+    assert pool.get_stats()["in_use"] == 2
+    drain(subscriber)
+    assert pool.get_stats()["in_use"] == 1     # 마지막으로 꺼낸 프레임은 다음 get()/release()까지 사용 중
+    subscriber.release()
+    assert pool.get_stats()["in_use"] == 0
+
+
+def test_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        FrameSubscriber("bad", drop_policy="newest")
@@ -0,0 +1,87 @@
+from RtspStreamManager import FfmpegProgress
+
+# ffmpeg -progress pipe:1 출력 한 묶음 (progress= 줄로 끝남)
+PROGRESS_BLOCK = """\
+frame=450
+fps=29.97
+stream_0_0_q=23.0
+bitrate= 812.4kbits/s
+total_size=1523712
+out_time_us=15000000
+out_time=00:00:15.000000
+dup_frames=2
+drop_frames=1
+speed=1.01x
+progress=continue
+"""
+
+
+def feed(progress: FfmpegProgress, text: str) -> None:
+    for line in text.splitlines(keepends=True):
+        progress.feed_line(line)
+
+
+def test_parses_a_complete_block():
+    progress = FfmpegProgress()
+    feed(progress, PROGRESS_BLOCK)
+
+    assert progress.stats == {
+        "frame": 450,
+        "fps": 29.97,
+        "speed": 1.01,
+        "bitrate_kbps": 812.4,
+        "total_size": 1523712,
+        "out_time_us": 15000000,
+        "dup_frames": 2,
+        "drop_frames": 1,
+        "state": "continue",
+    }
+    assert progress.updated_at is not None
+    assert progress.to_dict()["seconds_since_update"] >= 0
+
+
+def test_updates_only_when_block_completes():
+    progress = FfmpegProgress()
+    feed(progress, PROGRESS_BLOCK)
+    first_update = progress.updated_at
+
+    # progress= 줄이 나오기 전까지는 이전 묶음의 값을 유지
+    feed(progress, "frame=480\nfps=30.0\n")
+    assert progress.stats["frame"] == 450
+    assert progress.updated_at == first_update
+
+    feed(progress, "progress=end\n")
+    assert progress.stats["frame"] == 480
+    assert progress.stats["state"] == "end"
+    # 이번 묶음에 없던 값은 이전 값을 이어받지 않음
+    assert progress.stats["total_size"] is None
+
+
+def test_unavailable_values_become_none():
+    progress = FfmpegProgress()
+    feed(progress, "frame=0\nfps=0.00\nbitrate=N/A\ntotal_size=N/A\nout_time_us=N/A\nspeed=N/A\nprogress=continue\n")
+
+    assert progress.stats["frame"] == 0
+    assert progress.stats["fps"] == 0.0
+    assert progress.stats["bitrate_kbps"] is None
+    assert progress.stats["total_size"] is None
+    assert progress.stats["speed"] is None
+
+
+def test_ignores_lines_without_key_value():
+    progress = FfmpegProgress()
+    feed(progress, "\nInput #0, lavfi\nframe=3\nprogress=continue\n")
+    assert progress.stats["frame"] == 3
+
+
+def test_reset_clears_state():
+    progress = FfmpegProgress()
+    feed(progress, PROGRESS_BLOCK + "frame=999\n")
+    progress.reset()
+
+    assert progress.stats == {}
+    assert progress.updated_at is None
+    assert progress.to_dict() == {"seconds_since_update": None}
+    # 재시작 전의 덜 끝난 묶음이 섞이지 않음
+    feed(progress, "progress=continue\n")
+    assert progress.stats["frame"] is None
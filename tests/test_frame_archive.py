@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from FrameArchive import FrameArchive
+
+
+def frame_bytes(seq: int) -> bytes:
+    """seq마다 길이와 내용이 다른 가짜 JPEG 바이트"""
+    return b"\xff\xd8" + bytes([seq % 256]) * (50 + seq) + b"\xff\xd9"
+
+
+def record(archive: FrameArchive, base: float, count: int, interval: float = 1.0) -> None:
+    """base부터 interval초 간격으로 count개의 프레임을 기록하고 기록 스레드를 멈춥니다."""
+    archive.start()
+    for seq in range(count):
+        assert archive.append(seq, base + seq * interval, 64, 48, frame_bytes(seq))
+    archive.stop()
+
+
+def test_read_range_across_segments(tmp_path):
+    archive = FrameArchive(str(tmp_path), segment_seconds=10.0, batch_frames=4, flush_interval=0.05)
+    base = time.time() - 60.0
+    record(archive, base, 30)
+
+    # 배치 첫 프레임 기준으로 세그먼트를 넘기므로 30초 분량이 여러 세그먼트에 나뉨
+    assert len(archive.list_segments()) >= 3
+    assert archive.frames_written == 30
+
+    frames = archive.read_range(base + 8.0, base + 21.0)
+    assert [frame.seq for frame in frames] == list(range(8, 22))
+    for frame in frames:
+        assert bytes(frame.data) == frame_bytes(frame.seq)
+        assert (frame.width, frame.height) == (64, 48)
+        assert frame.timestamp == base + frame.seq
+
+    assert [frame.seq for frame in archive.iter_range()] == list(range(30))
+    assert archive.read_range(base + 100.0, base + 200.0) == []
+
+
+def test_reopened_archive_reads_previous_recording(tmp_path):
+    base = time.time() - 60.0
+    record(FrameArchive(str(tmp_path), flush_interval=0.05), base, 5)
+
+    archive = FrameArchive(str(tmp_path))
+    assert [frame.seq for frame in archive.read_range(base, base + 10.0)] == [0, 1, 2, 3, 4]
+
+
+def test_retention_deletes_expired_segments(tmp_path):
+    archive = FrameArchive(str(tmp_path), segment_seconds=600.0, retention_hours=1.0,
+                           batch_frames=1, flush_interval=0.05)
+    now = time.time()
+    archive.start()
+    # 세그먼트의 끝 시각은 다음 세그먼트의 시작 시각이므로, 끝이 1시간보다 오래된 세그먼트만 삭제됨
+    archive.append(0, now - 3 * 3600, 64, 48, frame_bytes(0))
+    archive.append(1, now - 2 * 3600, 64, 48, frame_bytes(1))
+    archive.append(2, now - 1.5 * 3600, 64, 48, frame_bytes(2))
+    archive.append(3, now - 60.0, 64, 48, frame_bytes(3))
+    archive.stop()
+
+    # 2번 세그먼트는 1.5시간 전에 시작했지만 3번이 시작된 1분 전까지 이어지므로 남음
+    assert archive.segments_deleted == 2
+    assert len(archive.list_segments()) == 2
+    assert [frame.seq for frame in archive.read_range(now - 4 * 3600, now)] == [2, 3]
+
+
+def test_size_quota_deletes_oldest_segments(tmp_path):
+    archive = FrameArchive(str(tmp_path), segment_seconds=1.0, retention_hours=0, max_total_mb=1,
+                           batch_frames=1, flush_interval=0.05)
+    base = time.time() - 60.0
+    archive.start()
+    for seq in range(6):
+        archive.append(seq, base + seq * 2.0, 64, 48, bytes(300 * 1024))
+    archive.stop()
+
+    # 세그먼트 하나 ≈ 300KB이므로 새 세그먼트를 열 때 1MB를 넘긴 오래된 세그먼트부터 삭제
+    assert archive.segments_deleted >= 2
+    remaining = archive.read_range(base, base + 100.0)
+    assert remaining[-1].seq == 5
+    assert [frame.seq for frame in remaining] == list(range(remaining[0].seq, 6))
+    assert archive.get_stats()["segments"] == len(archive.list_segments())
+
+
+def test_append_drops_when_queue_is_full(tmp_path):
+    archive = FrameArchive(str(tmp_path), max_pending=2)
+    # 기록 스레드를 시작하지 않았으므로 대기열이 비워지지 않음
+    assert archive.append(0, 1.0, 64, 48, frame_bytes(0))
+    assert archive.append(1, 2.0, 64, 48, frame_bytes(1))
+    assert not archive.append(2, 3.0, 64, 48, frame_bytes(2))
+    assert archive.frames_dropped == 1
+
+
+def test_get_stats_uses_segment_list_kept_by_writer(tmp_path, monkeypatch):
+    archive = FrameArchive(str(tmp_path), segment_seconds=1.0, retention_hours=1.0,
+                           batch_frames=1, flush_interval=0.05)
+    now = time.time()
+    record(archive, now - 3 * 3600, 1)
+    record(archive, now - 2 * 3600, 1)      # 세그먼트를 열면서 끝이 2시간 전인 첫 세그먼트를 삭제
+    record(archive, now - 10.0, 3)
+
+    # 이벤트 루프에서 호출되므로 디렉터리를 읽지 않아야 함
+    def listdir(path):
+        raise AssertionError("get_stats가 디렉터리를 읽음")
+
+    monkeypatch.setattr("FrameArchive.os.listdir", listdir)
+    stats = archive.get_stats()
+    monkeypatch.undo()
+
+    assert stats["segments"] == len(archive.list_segments()) == 4
+    assert stats["segments_deleted"] == 1
+    assert stats["oldest"] == pytest.approx(now - 2 * 3600, abs=0.01)
@@ -0,0 +1,156 @@
+import asyncio
+from collections import deque
+
+import numpy as np
+
+from FrameBroadcaster import FrameBroadcaster
+from FrameBufferPool import FrameBufferPool
+from FrameSource import SyntheticFrameSource
+
+WARMUP_FRAMES = 60
+MEASURED_FRAMES = 90
+
+
+class Holders:
+    """프레임을 한동안 사용하다가 놓는 소비자들 (큐/송신 중인 프레임)"""
+
+    def __init__(self, pool: FrameBufferPool, size: int):
+        self.pool = pool
+        self.frames = deque()
+        self.size = size
+
+    def hold(self, frame: np.ndarray) -> None:
+        self.pool.retain(frame)
+        self.frames.append(frame)
+        if len(self.frames) > self.size:
+            self.pool.release(self.frames.popleft())
+
+
+def read_into_pool(source: SyntheticFrameSource, pool: FrameBufferPool) -> np.ndarray:
+    """캡처 루프와 같은 방식으로 풀의 배열에 다음 프레임을 읽습니다. (반환된 배열은 호출한 쪽이 사용 중)"""
+    buffer = pool.acquire()
+    ret, frame = source.read(buffer)
+    assert ret
+    if buffer is not None and frame is not buffer:
+        pool.release(buffer)
+    pool.adopt(frame)
+    return frame
+
+
+def capture(source: SyntheticFrameSource, pool: FrameBufferPool, holders: Holders, count: int) -> None:
+    for _ in range(count):
+        frame = read_into_pool(source, pool)
+        holders.hold(frame)
+        pool.release(frame)
+
+
+def test_acquire_skips_buffers_in_use():
+    pool = FrameBufferPool(max_buffers=2)
+    first = np.zeros(4, dtype=np.uint8)
+    pool.adopt(first)
+    assert pool.acquire() is None
+
+    pool.retain(first)
+    pool.release(first)
+    assert pool.acquire() is None
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_untracked_buffers_are_ignored():
+    pool = FrameBufferPool(max_buffers=2)
+    for _ in range(3):
+        pool.adopt(np.zeros(4, dtype=np.uint8))
+    untracked = np.zeros(4, dtype=np.uint8)
+    pool.retain(untracked)
+    pool.release(untracked)
+    assert pool.get_stats()["buffers"] == 2
+    assert pool.allocated == 3
+
+
+def test_set_capacity_drops_buffers_in_use_after_release():
+    pool = FrameBufferPool(max_buffers=4)
+    buffers = [np.zeros(4, dtype=np.uint8) for _ in range(4)]
+    for buffer in buffers:
+        pool.adopt(buffer)
+    pool.release(buffers[0])
+
+    pool.set_capacity(2)
+    assert pool.get_stats()["buffers"] == 3   # 사용 중이 아닌 배열만 바로 뺌
+    pool.release(buffers[1])
+    assert pool.get_stats()["buffers"] == 2
+    pool.release(buffers[2])
+    assert pool.get_stats()["buffers"] == 2
+    assert pool.acquire() is buffers[2]
+
+
+def test_no_allocations_while_references_fit_in_pool():
+    source = SyntheticFrameSource(width=64, height=48, fps=0)
+    assert source.open()
+    pool = FrameBufferPool(max_buffers=8)
+    holders = Holders(pool, 6)
+
+    capture(source, pool, holders, WARMUP_FRAMES)
+    allocated = pool.allocated
+    capture(source, pool, holders, MEASURED_FRAMES)
+    assert pool.allocated - allocated == 0
+    assert allocated <= 8
+
+
+def test_set_capacity_keeps_pool_steady_with_more_references():
+    source = SyntheticFrameSource(width=64, height=48, fps=0)
+    assert source.open()
+    pool = FrameBufferPool(max_buffers=4)
+    holders = Holders(pool, 10)
+    pool.set_capacity(holders.size + 1)
+
+    capture(source, pool, holders, WARMUP_FRAMES)
+    allocated = pool.allocated
+    capture(source, pool, holders, MEASURED_FRAMES)
+    assert pool.allocated - allocated == 0
+
+
+def test_broadcaster_reuses_frame_buffers_in_steady_state():
+    async def run():
+        broadcaster = FrameBroadcaster(SyntheticFrameSource(width=64, height=48, fps=300), frame_buffers=2)
+        assert await broadcaster.start()
+        subscribers = [broadcaster.subscribe(f"client{i}", queue_size=2) for i in range(4)]
+        try:
+            async def consume(subscriber, count):
+                # 송신하는 동안 다음 프레임들이 큐에 쌓이도록 프레임마다 잠시 붙잡고 있음
+                for _ in range(count):
+                    await subscriber.get()
+                    await asyncio.sleep(0.002)
+
+            await asyncio.gather(*(consume(subscriber, WARMUP_FRAMES + MEASURED_FRAMES) for subscriber in subscribers))
+            return broadcaster.frame_pool.get_stats()
+        finally:
+            await broadcaster.stop()
+
+    # 동시에 사용되는 프레임이 드물게 늘어 풀이 커질 수는 있지만, 새로 할당된 배열은 모두 풀에 들어가 재사용됨
+    stats = asyncio.run(run())
+    assert stats["allocated"] <= stats["max_buffers"]
+    assert stats["reused"] >= MEASURED_FRAMES
+
+
+def test_frame_in_use_is_not_overwritten():
+    async def run():
+        broadcaster = FrameBroadcaster(SyntheticFrameSource(width=64, height=48, fps=300), frame_buffers=2)
+        assert await broadcaster.start()
+        slow = broadcaster.subscribe("slow", queue_size=1)
+        fast = broadcaster.subscribe("fast", queue_size=1)
+        try:
+            held = await slow.get()
+            expected = held.image.copy()
+            for _ in range(MEASURED_FRAMES):
+                await fast.get()
+            unchanged = np.array_equal(held.image, expected)
+
+            broadcaster.unsubscribe(slow)
+            return unchanged, broadcaster.frame_pool.get_stats()
+        finally:
+            await broadcaster.stop()
+
+    unchanged, stats = asyncio.run(run())
+    assert unchanged
+    assert stats["buffers"] <= stats["max_buffers"]
@@ -0,0 +1,69 @@
+import pytest
+
+from FrameEnvelope import (CODEC_H264, CODEC_JPEG, ENVELOPE_HEADER, FLAG_KEYFRAME, pack_batch, pack_envelope,
+                           unpack_message)
+
+JPEG = b"\xff\xd8" + b"\x11" * 200 + b"\xff\xd9"
+
+
+def test_envelope_roundtrip():
+    message = b"".join(pack_envelope(JPEG, 7, 12.345678, 0.0042, 640, 480))
+    assert len(message) == ENVELOPE_HEADER.size + len(JPEG)
+
+    (frame,) = unpack_message(message)
+    assert frame.seq == 7
+    assert frame.capture_us == 12_345_678
+    assert frame.encode_us == 4200
+    assert (frame.width, frame.height, frame.codec, frame.flags) == (640, 480, CODEC_JPEG, 0)
+    assert bytes(frame.payload) == JPEG
+
+
+def test_payload_is_not_copied():
+    message = bytearray(b"".join(pack_envelope(JPEG, 1, 0.0, 0.0, 64, 48)))
+    (frame,) = unpack_message(message)
+    message[ENVELOPE_HEADER.size] = 0x00
+    assert frame.payload[0] == 0x00
+
+
+def test_accepts_memoryview_payload():
+    # 송신 경로는 인코딩 캐시의 memoryview를 복사 없이 그대로 넣음
+    message = b"".join(pack_envelope(memoryview(JPEG), 3, 1.0, 0.001, 64, 48, codec=CODEC_H264, flags=FLAG_KEYFRAME))
+    (frame,) = unpack_message(message)
+    assert (frame.seq, frame.codec, frame.flags) == (3, CODEC_H264, FLAG_KEYFRAME)
+    assert bytes(frame.payload) == JPEG
+
+
+def test_batch_roundtrip_keeps_order_and_boundaries():
+    payloads = [JPEG, b"", b"\x00" * 3, JPEG * 2]
+    batch = pack_batch([pack_envelope(payload, seq, seq * 0.5, 0.0, 64, 48)
+                        for seq, payload in enumerate(payloads, start=10)])
+
+    frames = unpack_message(batch)
+    assert [frame.seq for frame in frames] == [10, 11, 12, 13]
+    assert [bytes(frame.payload) for frame in frames] == payloads
+    assert [frame.capture_us for frame in frames] == [5_000_000, 5_500_000, 6_000_000, 6_500_000]
+
+
+def test_seq_and_encode_time_wrap_to_header_fields():
+    (frame,) = unpack_message(b"".join(pack_envelope(JPEG, 2 ** 32 + 5, 0.0, 10_000.0, 64, 48)))
+    assert frame.seq == 5
+    assert frame.encode_us == 0xFFFFFFFF
+
+
+def test_plain_jpeg_message_without_envelope():
+    (frame,) = unpack_message(JPEG)
+    assert frame.seq is None
+    assert frame.codec == CODEC_JPEG
+    assert bytes(frame.payload) == JPEG
+
+
+def test_rejects_unknown_version():
+    message = bytearray(b"".join(pack_envelope(JPEG, 1, 0.0, 0.0, 64, 48)))
+    message[2] = 99
+    with pytest.raises(ValueError):
+        unpack_message(bytes(message))
+
+    batch = bytearray(pack_batch([pack_envelope(JPEG, 1, 0.0, 0.0, 64, 48)]))
+    batch[2] = 99
+    with pytest.raises(ValueError):
+        unpack_message(bytes(batch))
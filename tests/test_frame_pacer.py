@@ -0,0 +1,109 @@
+import asyncio
+import types
+
+import pytest
+
+import FramePacer as pacer_module
+from FramePacer import FramePacer
+
+
+class FakeClock:
+    """FramePacer가 보는 time.monotonic()과 asyncio.sleep()을 대신하는 가짜 시계 (실제로 잠들지 않음)"""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+    def advance(self, seconds: float) -> None:
+        """캡처/인코딩/송신처럼 틱 사이에 걸린 작업 시간"""
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(pacer_module, "time", types.SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(pacer_module, "asyncio", types.SimpleNamespace(sleep=fake.sleep))
+    return fake
+
+
+def run_ticks(pacer: FramePacer, clock: FakeClock, count: int, work: float = 0.0) -> list:
+    """count번 틱하며 틱마다 work초 동안 작업하고, 틱이 끝난 시각 목록을 반환합니다."""
+    async def loop():
+        times = []
+        for _ in range(count):
+            await pacer.wait()
+            times.append(clock.now)
+            pacer.mark_frame()
+            clock.advance(work)
+        return times
+
+    return asyncio.run(loop())
+
+
+def test_work_time_does_not_accumulate_drift(clock):
+    pacer = FramePacer(frame_rate=10)
+    start = clock.now
+    times = run_ticks(pacer, clock, 20, work=0.03)
+
+    # 매 틱이 시작 시각 + k * 0.1초 (작업 시간만큼 덜 잠듦)
+    assert times == pytest.approx([start + k * 0.1 for k in range(20)])
+    assert clock.sleeps == pytest.approx([0.07] * 19)
+    assert pacer.skipped_slots == 0
+
+
+def test_missed_slots_are_skipped_not_bursted(clock):
+    pacer = FramePacer(frame_rate=10)
+    start = clock.now
+    run_ticks(pacer, clock, 1)
+
+    clock.advance(0.35)     # 3.5 주기만큼 멈춤
+    times = run_ticks(pacer, clock, 3)
+
+    # 지나간 슬롯 두 개는 건너뛰고, 가장 최근 슬롯(0.3초) 뒤로는 원래 격자(0.4, 0.5초)를 따름
+    assert pacer.skipped_slots == 2
+    assert times == pytest.approx([start + 0.35, start + 0.4, start + 0.5])
+
+
+def test_frame_rate_change_applies_from_next_tick(clock):
+    pacer = FramePacer(frame_rate=10)
+    start = clock.now
+    run_ticks(pacer, clock, 2)
+
+    async def slower():
+        await pacer.wait(frame_rate=2)
+        return clock.now
+
+    assert asyncio.run(slower()) == pytest.approx(start + 0.1 + 0.5)
+    assert pacer.frame_rate == 2
+
+
+def test_reset_starts_a_new_schedule(clock):
+    pacer = FramePacer(frame_rate=10)
+    run_ticks(pacer, clock, 3)
+
+    clock.advance(5.0)      # 일시 중지
+    pacer.reset()
+    resumed = clock.now
+    times = run_ticks(pacer, clock, 2)
+
+    assert times == pytest.approx([resumed, resumed + 0.1])
+    assert pacer.skipped_slots == 0
+
+
+def test_stats_report_achieved_fps(clock):
+    pacer = FramePacer(frame_rate=20, stats_window=2.0)
+    run_ticks(pacer, clock, 41)
+
+    stats = pacer.get_stats()
+    assert stats["target_fps"] == 20
+    assert stats["achieved_fps"] == pytest.approx(20, abs=0.5)  # 구간 경계의 프레임 포함 여부만큼 오차
+    assert stats["jitter_ms"] == pytest.approx(0.0, abs=0.01)
+    assert stats["ticks"] == 41
@@ -0,0 +1,89 @@
+from typing import Optional
+
+from FrameRingBuffer import FrameRingBuffer
+
+
+def frame_bytes(seq: int, length: int) -> bytes:
+    """seq마다 내용이 다른 가짜 JPEG 바이트"""
+    return bytes([seq % 256]) * length
+
+
+def append(buffer: FrameRingBuffer, seq: int, length: int = 100, timestamp: Optional[float] = None) -> bool:
+    timestamp = float(seq) if timestamp is None else timestamp
+    return buffer.append(seq, timestamp, 1000.0 + timestamp, 64, 48, frame_bytes(seq, length))
+
+
+def test_snapshot_returns_frames_in_range_with_metadata():
+    buffer = FrameRingBuffer(max_seconds=100.0, max_bytes=4096, max_frames=16)
+    for seq in range(10):
+        assert append(buffer, seq)
+
+    frames = buffer.snapshot(3.0, 6.0)
+    assert [frame.seq for frame in frames] == [3, 4, 5, 6]
+    assert all(frame.data == frame_bytes(frame.seq, 100) for frame in frames)
+    assert (frames[0].width, frames[0].height, frames[0].wall_time) == (64, 48, 1003.0)
+
+    # wall_clock=True면 time.time() 기준 시각으로 고름
+    assert [frame.seq for frame in buffer.snapshot(1007.0, 1100.0, wall_clock=True)] == [7, 8, 9]
+
+
+def test_arena_wraps_and_evicts_oldest_bytes():
+    # 프레임 300바이트 x 3개만 들어가는 arena: 4번째부터 앞부분을 덮어쓰며 순환
+    buffer = FrameRingBuffer(max_seconds=100.0, max_bytes=1000, max_frames=16)
+    for seq in range(10):
+        assert append(buffer, seq, length=300)
+
+    frames = buffer.snapshot(0.0, 100.0)
+    assert [frame.seq for frame in frames] == [7, 8, 9]
+    # 덮어쓴 뒤에도 남은 프레임의 내용은 온전해야 함
+    assert all(frame.data == frame_bytes(frame.seq, 300) for frame in frames)
+
+    stats = buffer.get_stats()
+    assert stats["frames"] == 3
+    assert stats["frames_evicted"] == 7
+    assert stats["bytes_used"] == 900
+
+
+def test_frames_of_different_sizes_survive_wrap():
+    buffer = FrameRingBuffer(max_seconds=100.0, max_bytes=1000, max_frames=16)
+    lengths = [150, 420, 90, 333, 260, 500, 17, 380, 240, 610]
+    for seq, length in enumerate(lengths):
+        assert append(buffer, seq, length=length)
+
+    frames = buffer.snapshot(0.0, 100.0)
+    assert frames and frames[-1].seq == len(lengths) - 1
+    assert sum(len(frame.data) for frame in frames) <= 1000
+    for frame in frames:
+        assert frame.data == frame_bytes(frame.seq, lengths[frame.seq])
+
+
+def test_evicts_by_age_and_slot_count():
+    by_age = FrameRingBuffer(max_seconds=2.0, max_bytes=4096, max_frames=16)
+    for seq in range(6):
+        append(by_age, seq, length=10)
+    assert [frame.seq for frame in by_age.snapshot(0.0, 100.0)] == [3, 4, 5]
+
+    by_slots = FrameRingBuffer(max_seconds=100.0, max_bytes=4096, max_frames=4)
+    for seq in range(6):
+        append(by_slots, seq, length=10)
+    assert [frame.seq for frame in by_slots.snapshot(0.0, 100.0)] == [2, 3, 4, 5]
+    assert by_slots.newest_timestamp() == 5.0
+
+
+def test_rejects_frames_larger_than_buffer():
+    buffer = FrameRingBuffer(max_seconds=100.0, max_bytes=100, max_frames=4)
+    assert append(buffer, 0, length=50)
+    assert not append(buffer, 1, length=101)
+    assert not buffer.append(2, 2.0, 1002.0, 64, 48, b"")
+
+    assert [frame.seq for frame in buffer.snapshot(0.0, 100.0)] == [0]
+    assert buffer.get_stats()["frames_rejected"] == 2
+
+
+def test_snapshot_is_a_copy():
+    buffer = FrameRingBuffer(max_seconds=100.0, max_bytes=300, max_frames=4)
+    append(buffer, 1, length=100)
+    frames = buffer.snapshot(0.0, 100.0)
+    for seq in range(2, 8):
+        append(buffer, seq, length=100)
+    assert frames[0].data == frame_bytes(1, 100)
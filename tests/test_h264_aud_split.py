@@ -0,0 +1,81 @@
+import asyncio
+import shutil
+import subprocess
+import types
+
+import pytest
+
+from FrameBroadcaster import FrameSubscriber
+from H264StreamEncoder import H264StreamEncoder
+from StreamDecoders import AUD_PREFIX, NAL_AUD, NAL_IDR, nal_types
+
+AUD = b"\x00\x00\x00\x01\x09\xf0"
+SPS = b"\x00\x00\x00\x01\x67" + b"\xab" * 12
+PPS = b"\x00\x00\x01\x68" + b"\xab" * 4
+
+
+def access_unit(index: int, keyframe: bool) -> bytes:
+    """AUD로 시작하는 가짜 액세스 유닛 (키프레임은 SPS/PPS/IDR, 나머지는 P 슬라이스)"""
+    slice_nal = b"\x00\x00\x01" + (b"\x65" if keyframe else b"\x41") + bytes([index % 200 + 1]) * (40 + index)
+    return AUD + (SPS + PPS if keyframe else b"") + slice_nal
+
+
+def make_encoder() -> H264StreamEncoder:
+    broadcaster = types.SimpleNamespace(health=types.SimpleNamespace(width=64, height=48))
+    return H264StreamEncoder(broadcaster)
+
+
+def split(encoder: H264StreamEncoder, stream: bytes, chunk_size: int) -> list:
+    """stream을 chunk_size바이트씩 stdout처럼 넣고 구독자가 받은 액세스 유닛을 반환합니다."""
+    async def run():
+        subscriber = FrameSubscriber("test", queue_size=1000, drop_policy="drop_oldest", shared_encode=False)
+        encoder.subscribers.add(subscriber)
+        reader = asyncio.StreamReader()
+        for start in range(0, len(stream), chunk_size):
+            reader.feed_data(stream[start:start + chunk_size])
+        reader.feed_eof()
+        await encoder._read_progress(reader)
+        return [frame.encoded for frame in list(subscriber._queue)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5, 7, 64, 65536])
+def test_splits_on_aud_regardless_of_chunk_boundaries(chunk_size):
+    units = [access_unit(i, keyframe=i % 4 == 0) for i in range(9)]
+    encoded = split(make_encoder(), b"".join(units), chunk_size)
+
+    # 마지막 액세스 유닛은 다음 AUD가 나와야 끝난 것을 알 수 있으므로 아직 발행되지 않음
+    assert [bytes(frame.data) for frame in encoded] == units[:-1]
+    assert [frame.keyframe for frame in encoded] == [i % 4 == 0 for i in range(8)]
+    assert all((frame.width, frame.height) == (64, 48) for frame in encoded)
+
+
+def test_gop_cache_restarts_at_keyframe():
+    encoder = make_encoder()
+    units = [access_unit(i, keyframe=i in (0, 5)) for i in range(9)]
+    split(encoder, b"".join(units), 4096)
+
+    # 마지막 키프레임(5번)부터 발행된 7번까지를 새 구독자용으로 보관
+    assert [bytes(frame.encoded.data) for frame in encoder._gop] == units[5:8]
+    assert encoder.keyframes == 2
+    assert encoder.access_units == 8
+
+
+def test_nal_types():
+    assert nal_types(access_unit(0, keyframe=True)) == [NAL_AUD, 7, 8, NAL_IDR]
+    assert nal_types(access_unit(1, keyframe=False)) == [NAL_AUD, 1]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg이 설치되어 있지 않음")
+def test_splits_real_ffmpeg_output():
+    # 실제 인코더 출력(키프레임마다 SPS/PPS, 프레임마다 AUD)을 프레임 단위로 나누는지 확인
+    command = ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=size=160x120:rate=10",
+               "-frames:v", "25", "-c:v", "libx264", "-preset", "ultrafast", "-g", "10",
+               "-bsf:v", "dump_extra=freq=keyframe,h264_metadata=aud=insert", "-f", "h264", "pipe:1"]
+    stream = subprocess.run(command, capture_output=True, check=True, timeout=60).stdout
+
+    encoded = split(make_encoder(), stream, 4096)
+    assert len(encoded) == 24
+    assert [index for index, frame in enumerate(encoded) if frame.keyframe] == [0, 10, 20]
+    assert all(AUD_PREFIX in bytes(frame.data[:5]) for frame in encoded)    # 3/4바이트 시작 코드
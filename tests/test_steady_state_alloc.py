@@ -0,0 +1,75 @@
+import asyncio
+import os
+import tracemalloc
+
+from FrameBroadcaster import FrameBroadcaster
+from FrameEnvelope import pack_envelope
+from FrameSource import create_frame_source
+from JpegEncodeCache import EncodeVariant
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+WARMUP_FRAMES = 60
+MEASURED_FRAMES = 120
+MAX_GROWTH_KB = 64   # 320x240 JPEG 하나가 수 KB이므로 프레임마다 하나씩만 남아도 넘는 값
+
+
+def api_growth(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> int:
+    """서버 모듈(api/)에서 할당되어 두 스냅숏 사이에 해제되지 않고 늘어난 바이트 수"""
+    api_only = [tracemalloc.Filter(True, os.path.join(API_DIR, "*"))]
+    return sum(stat.size_diff for stat in after.filter_traces(api_only)
+               .compare_to(before.filter_traces(api_only), "filename"))
+
+
+def test_send_path_does_not_grow_memory_in_steady_state():
+    async def run():
+        broadcaster = FrameBroadcaster(create_frame_source("synthetic:320x240@200"), warmup_frames=5)
+        assert await broadcaster.start()
+        subscribers = [broadcaster.subscribe(f"client{i}", queue_size=2) for i in range(2)]
+        sent = [0] * len(subscribers)
+
+        async def send(index, count):
+            # 웹소켓 송신 경로: 공유 인코딩 캐시의 memoryview를 복사 없이 봉투에 담아 한 번에 이어 붙임
+            subscriber = subscribers[index]
+            for _ in range(count):
+                frame = await subscriber.get()
+                encoded = await broadcaster.encode(frame, EncodeVariant(quality=50))
+                assert isinstance(encoded.data, memoryview)
+                message = b"".join(pack_envelope(encoded.data, frame.seq, frame.timestamp,
+                                                 encoded.encode_seconds, encoded.width, encoded.height))
+                sent[index] += len(message)
+
+        async def send_all(count):
+            await asyncio.gather(*(send(index, count) for index in range(len(subscribers))))
+
+        try:
+            # 스냅숏을 찍는 동안 이벤트 루프가 멈춰 사용 중인 배열이 잠시 늘어나므로 워밍업 중에도 한 번 찍어 둡니다.
+            await send_all(WARMUP_FRAMES)
+            tracemalloc.take_snapshot()
+            await send_all(WARMUP_FRAMES)
+
+            pool = broadcaster.frame_pool
+            allocated = pool.allocated
+            before = tracemalloc.take_snapshot()
+            await send_all(MEASURED_FRAMES)
+            after = tracemalloc.take_snapshot()
+            return {
+                "growth": api_growth(before, after),
+                # 드물게 동시에 사용되는 프레임이 늘어 풀이 커질 수 있으며, 그 배열은 풀이 계속 보관하므로 증가량에서 제외
+                "pool_growth": (pool.allocated - allocated) * 320 * 240 * 3,
+                "allocated": pool.allocated,
+                "max_buffers": pool.max_buffers,
+                "sent": sent,
+            }
+        finally:
+            await broadcaster.stop()
+
+    tracemalloc.start()
+    try:
+        result = asyncio.run(run())
+    finally:
+        tracemalloc.stop()
+
+    assert all(result["sent"])
+    # 새로 할당된 배열은 모두 풀에 들어감 (프레임마다 새로 할당하지 않음)
+    assert result["allocated"] <= result["max_buffers"]
+    assert result["growth"] - result["pool_growth"] < MAX_GROWTH_KB * 1024
@@ -0,0 +1,89 @@
+import numpy as np
+
+from JpegEncodeCache import EncodeVariant
+from StreamDecoders import TILE_HEADER, TileDeltaDecoder, is_tile_message
+from TileDeltaEncoder import TileDeltaEncoder
+
+WIDTH, HEIGHT = 160, 120
+
+
+def scene() -> np.ndarray:
+    """JPEG 손실이 작은 부드러운 그라데이션 장면"""
+    x = np.linspace(0, 255, WIDTH, dtype=np.float32)
+    y = np.linspace(0, 255, HEIGHT, dtype=np.float32)[:, None]
+    image = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    image[..., 0] = x
+    image[..., 1] = y
+    image[..., 2] = 128
+    return image
+
+
+def mean_error(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.abs(a.astype(np.int16) - b).mean())
+
+
+def tile_count(message: bytes) -> int:
+    return TILE_HEADER.unpack_from(message, 0)[-1]
+
+
+def test_keyframe_roundtrip():
+    encoder = TileDeltaEncoder(EncodeVariant(quality=90), cols=4, rows=3)
+    decoder = TileDeltaDecoder()
+    image = scene()
+
+    encoded = encoder.encode(image)
+    assert encoded.keyframe
+    assert is_tile_message(encoded.data)
+    assert tile_count(encoded.data) == 12
+
+    decoded = decoder.decode(encoded.data)
+    assert decoded.shape == image.shape
+    assert mean_error(decoded, image) < 3.0
+
+
+def test_delta_sends_only_changed_tiles():
+    encoder = TileDeltaEncoder(EncodeVariant(quality=90), cols=4, rows=3, keyframe_interval=0)
+    decoder = TileDeltaDecoder()
+    image = scene()
+    decoder.decode(encoder.encode(image).data)
+
+    # 변화가 없으면 보낼 타일이 없음
+    assert encoder.encode(image.copy()) is None
+
+    # 좌상단 타일 하나(40x40)만 바꿈
+    changed = image.copy()
+    changed[5:35, 5:35] = (0, 0, 255)
+    encoded = encoder.encode(changed)
+    assert not encoded.keyframe
+    assert tile_count(encoded.data) == 1
+
+    decoded = decoder.decode(encoded.data)
+    assert mean_error(decoded, changed) < 3.0
+    assert mean_error(decoded[10:30, 10:30], changed[10:30, 10:30]) < 6.0   # 바뀐 타일이 적용됨
+
+
+def test_decoder_waits_for_keyframe():
+    encoder = TileDeltaEncoder(EncodeVariant(quality=90), cols=4, rows=3, keyframe_interval=0)
+    image = scene()
+    encoder.encode(image)
+    changed = image.copy()
+    changed[:, :40] = 0
+
+    # 중간부터 받은 수신 측은 키프레임 전까지 프레임을 만들지 않음
+    late_decoder = TileDeltaDecoder()
+    assert late_decoder.decode(encoder.encode(changed).data) is None
+
+    encoder.request_keyframe()
+    encoded = encoder.encode(changed)
+    assert encoded.keyframe
+    assert mean_error(late_decoder.decode(encoded.data), changed) < 3.0
+
+
+def test_gray_variant_and_resize_roundtrip():
+    encoder = TileDeltaEncoder(EncodeVariant(quality=90, width=80, gray=True), cols=2, rows=2)
+    decoded = TileDeltaDecoder().decode(encoder.encode(scene()).data)
+    assert decoded.shape == (60, 80)
+
+
+def test_plain_jpeg_is_not_tile_message():
+    assert not is_tile_message(b"\xff\xd8\xff\xe0")
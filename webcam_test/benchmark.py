@@ -0,0 +1,280 @@
+# 웹캠 없이 스트리밍 서버의 처리량/지연시간을 재현 가능하게 측정하는 벤치마크 스크립트
+#
+# FastAPI 앱(Api_Websocket)을 같은 프로세스에서 uvicorn으로 띄우고, 합성(또는 동영상 파일) 프레임 공급원에
+# N개의 모의 웹소켓 클라이언트를 붙여 해상도 / JPEG 품질 / 프레임 속도 / 클라이언트 수를 조합별로 측정합니다.
+# 결과는 JSON 파일로 저장되며, --compare 옵션으로 이전 커밋의 결과와 비교할 수 있습니다.
+#
+# 사용 예:
+#   python benchmark.py --resolutions 640x480,1280x720 --qualities 50,80 --rates 15,30 --clients 1,4
+#   python benchmark.py --source file:../video_test.avi --output new.json --compare old.json
+#   python benchmark.py --source replay:/home/pi/archive@max --clients 1,4,16
+#   python benchmark.py --resolutions 1280x720 --rates 30 --encode-processes 3
+#   python benchmark.py --rates 30 --clients 4 --client-fps 5   # 카메라 30fps, 클라이언트마다 5fps로 수신
+#   python benchmark.py --trace-alloc --max-alloc-growth-kb 256   # 정상 상태 메모리 할당 검사 (초과 시 종료 코드 1)
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+API_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+sys.path.insert(0, API_DIR)
+
+# Api_Websocket 임포트 시 웹캠을 열지 않도록 합성 공급원으로 설정합니다. (실행마다 아래에서 교체)
+os.environ.setdefault("FRAME_SOURCE", "synthetic:640x480")
+
+import uvicorn
+import websockets
+
+import Api_Websocket
+from FrameEnvelope import unpack_message
+from FrameSource import SyntheticFrameSource, VideoFileFrameSource, create_frame_source
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def consume(url: str, warmup: float, duration: float, result: dict) -> None:
+    """
+    모의 클라이언트: 봉투 헤더의 캡처 시각으로 종단간 지연시간을 측정합니다. (디코딩은 하지 않음)
+    연결 시작부터 첫 메시지를 받기까지의 시간(first_frame_ms)도 기록합니다.
+    """
+    connect_started = time.monotonic()
+    async with websockets.connect(url, max_size=None) as websocket:
+        measure_from = time.monotonic() + warmup
+        measure_until = measure_from + duration
+
+        while True:
+            now = time.monotonic()
+            if now >= measure_until:
+                break
+            try:
+                data = await asyncio.wait_for(websocket.recv(), timeout=measure_until - now)
+            except asyncio.TimeoutError:
+                break
+
+            received_us = time.monotonic() * 1_000_000
+            if result["first_frame_ms"] is None:
+                result["first_frame_ms"] = received_us / 1000 - connect_started * 1000
+            if received_us < measure_from * 1_000_000:
+                continue
+
+            for message in unpack_message(data):
+                result["frames"] += 1
+                result["bytes"] += len(message.payload)
+                # 같은 프로세스에서 실행되므로 서버의 monotonic 캡처 시각과 바로 비교할 수 있습니다.
+                result["latencies_ms"].append((received_us - message.capture_us) / 1000)
+
+
+async def run_case(source_spec: str, width: int, height: int, quality: int, rate: int, clients: int,
+                   warmup: float, duration: float, encode_processes: int = 0, trace_alloc: bool = False,
+                   client_fps: float = 0.0) -> dict:
+    """한 조합을 실행하고 측정 결과를 반환합니다."""
+    broadcaster = Api_Websocket.FRAME_BROADCASTER
+    variant_width = 0
+    if source_spec == "synthetic":
+        # 공급원은 카메라보다 빠르게 만들어 서버 측 속도 제한(frame_rate)만 측정되도록 합니다.
+        broadcaster.source = SyntheticFrameSource(width=width, height=height, fps=max(rate * 2, 60))
+    elif source_spec.startswith("replay:"):
+        # 녹화 재생은 저장된 JPEG를 그대로 보내므로 해상도/품질 조합은 적용되지 않습니다.
+        broadcaster.source = create_frame_source(source_spec)
+    else:
+        # 동영상 파일은 해상도가 고정이므로 해상도 조합은 인코딩 변형의 가로 크기로 적용합니다.
+        broadcaster.source = VideoFileFrameSource(source_spec.partition(":")[2])
+        variant_width = width
+    broadcaster.frame_rate = rate
+    broadcaster.is_streaming = True
+    broadcaster.encode_processes = encode_processes
+
+    if trace_alloc:
+        tracemalloc.start()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(Api_Websocket.app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="on"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"ws://127.0.0.1:{port}/ws/stream?envelope=true&quality={quality}&width={variant_width}&fps={client_fps:g}"
+    results = [{"frames": 0, "bytes": 0, "latencies_ms": [], "first_frame_ms": None} for _ in range(clients)]
+
+    async def steady_state_snapshot():
+        # 워밍업(버퍼 풀, 인코딩 캐시가 채워지는 구간)이 끝나고 버퍼 풀이 더 늘지 않게 된 시점의 할당 상태
+        # 클라이언트가 많으면 동시에 참조되는 프레임이 늘어나므로, 풀 크기가 0.5초 동안 그대로일 때까지 기다립니다.
+        # (측정 구간의 절반까지만 기다림)
+        await asyncio.sleep(warmup)
+        deadline = time.monotonic() + duration / 2
+        allocated, stable_since = broadcaster.frame_pool.allocated, time.monotonic()
+        while time.monotonic() - stable_since < 0.5 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            if broadcaster.frame_pool.allocated != allocated:
+                allocated, stable_since = broadcaster.frame_pool.allocated, time.monotonic()
+        return tracemalloc.take_snapshot(), broadcaster.frame_pool.allocated
+
+    seq_before = broadcaster.frame_seq
+    cpu_before = time.process_time()
+    consumers = asyncio.gather(*(consume(url, warmup, duration, result) for result in results))
+    if trace_alloc:
+        (alloc_before, frame_allocs_before), _ = await asyncio.gather(steady_state_snapshot(), consumers)
+        alloc_after = tracemalloc.take_snapshot()
+        frame_allocs = broadcaster.frame_pool.allocated - frame_allocs_before
+        tracemalloc.stop()
+    else:
+        await consumers
+    cpu_used = time.process_time() - cpu_before
+    published = broadcaster.frame_seq - seq_before
+
+    server.should_exit = True
+    await server_task
+
+    frames = sum(r["frames"] for r in results)
+    first_frames = [r["first_frame_ms"] for r in results if r["first_frame_ms"] is not None]
+    capture_first_frame = broadcaster.startup.get("first_frame_seconds")
+    latencies = [value for r in results for value in r["latencies_ms"]]
+    alloc = {}
+    if trace_alloc:
+        # 서버 모듈(api/)에서 할당되어 측정 구간 동안 해제되지 않고 늘어난 메모리와, 새로 할당된 캡처 프레임 배열 수
+        api_only = [tracemalloc.Filter(True, os.path.join(API_DIR, "*"))]
+        growth = sum(stat.size_diff for stat in alloc_after.filter_traces(api_only)
+                     .compare_to(alloc_before.filter_traces(api_only), "filename"))
+        alloc = {"alloc_growth_kb": round(growth / 1024, 1), "frame_allocs": frame_allocs}
+    return {
+        "resolution": f"{width}x{height}",
+        "quality": quality,
+        "target_fps": rate,
+        "client_fps": client_fps,
+        "clients": clients,
+        "fps_per_client": round(frames / clients / duration, 2),
+        "aggregate_fps": round(frames / duration, 2),
+        "latency_p50_ms": round(percentile(latencies, 50), 2),
+        "latency_p99_ms": round(percentile(latencies, 99), 2),
+        "cpu_ms_per_frame": round(cpu_used * 1000 / published, 3) if published else None,
+        "bytes_per_frame": round(sum(r["bytes"] for r in results) / frames) if frames else None,
+        # 연결부터 첫 프레임까지 (가장 늦은 클라이언트), 서버 시작(장치 열기/워밍업)부터 첫 프레임 캡처까지
+        "first_frame_ms": round(max(first_frames), 2) if first_frames else None,
+        "capture_first_frame_ms": round(capture_first_frame * 1000, 1) if capture_first_frame is not None else None,
+        **alloc,
+    }
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """이전 결과 파일과 같은 조합끼리 비교하여 변화율을 출력합니다."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(case):
+        return case["resolution"], case["quality"], case["target_fps"], case.get("client_fps", 0), case["clients"]
+
+    previous = {key(case): case for case in baseline["results"]}
+    print(f"\n비교 기준: {baseline_path} (커밋 {baseline['meta'].get('commit')})")
+    for case in results:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("fps_per_client", "latency_p99_ms", "cpu_ms_per_frame", "bytes_per_frame", "first_frame_ms"):
+            if old.get(metric) and case.get(metric) is not None:
+                changes.append(f"{metric} {(case[metric] - old[metric]) / old[metric] * 100:+.1f}%")
+        print(f"  {key(case)}: " + ", ".join(changes))
+
+
+def check_allocations(results: list, max_growth_kb: float) -> None:
+    """
+    정상 상태 할당 검사: 측정 구간 동안 캡처 프레임 배열이 새로 할당되지 않고(재사용),
+    서버 모듈의 메모리가 max_growth_kb 이상 늘지 않아야 합니다. 실패하면 종료 코드 1로 끝납니다.
+    """
+    failures = [case for case in results
+                if case["frame_allocs"] > 0 or case["alloc_growth_kb"] > max_growth_kb]
+    for case in failures:
+        print(f"❌ 할당 검사 실패: {case['resolution']} q{case['quality']} {case['target_fps']}fps "
+              f"x{case['clients']} - 프레임 배열 할당 {case['frame_allocs']}회, 메모리 증가 {case['alloc_growth_kb']}KB")
+    if failures:
+        sys.exit(1)
+    print(f"✅ 할당 검사 통과 (프레임 배열 재할당 없음, 메모리 증가 {max_growth_kb}KB 이하)")
+
+
+async def main(args) -> None:
+    resolutions = [tuple(int(v) for v in r.split("x")) for r in args.resolutions.split(",")]
+    qualities = [int(v) for v in args.qualities.split(",")]
+    rates = [int(v) for v in args.rates.split(",")]
+    client_counts = [int(v) for v in args.clients.split(",")]
+
+    results = []
+    for (width, height), quality, rate, clients in itertools.product(resolutions, qualities, rates, client_counts):
+        case = await run_case(args.source, width, height, quality, rate, clients, args.warmup, args.duration,
+                              args.encode_processes, args.trace_alloc or args.max_alloc_growth_kb is not None,
+                              args.client_fps)
+        print(json.dumps(case, ensure_ascii=False))
+        results.append(case)
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "source": args.source,
+            "duration": args.duration,
+            "encode_processes": args.encode_processes,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"\n결과 저장: {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.max_alloc_growth_kb is not None:
+        check_allocations(results, args.max_alloc_growth_kb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="웹소켓 스트리밍 처리량/지연시간 벤치마크")
+    parser.add_argument("--source", default="synthetic", help='"synthetic", "file:/path/video.avi" 또는 "replay:/path/archive@max"')
+    parser.add_argument("--resolutions", default="640x480")
+    parser.add_argument("--qualities", default="50")
+    parser.add_argument("--rates", default="15,30")
+    parser.add_argument("--clients", default="1,4")
+    parser.add_argument("--warmup", type=float, default=1.0, help="측정 전 버리는 시간 (초)")
+    parser.add_argument("--duration", type=float, default=5.0, help="조합별 측정 시간 (초)")
+    parser.add_argument("--encode-processes", type=int, default=0,
+                        help="JPEG 인코딩 워커 프로세스 수 (0이면 스레드 풀, 공유 메모리 슬롯 사용)")
+    parser.add_argument("--client-fps", type=float, default=0.0,
+                        help="클라이언트마다 요청할 최대 FPS (0이면 --rates로 발행되는 모든 프레임)")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="tracemalloc으로 측정 구간의 메모리 증가와 프레임 배열 할당 횟수를 기록")
+    parser.add_argument("--max-alloc-growth-kb", type=float,
+                        help="지정 시 할당 검사를 실행하여 기준을 넘으면 종료 코드 1 (--trace-alloc 포함)")
+    parser.add_argument("--output", default="benchmark_result.json")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    asyncio.run(main(parser.parse_args()))
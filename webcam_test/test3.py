@@ -5,18 +5,24 @@ import time
 import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from FrameArchive import FrameArchive
+
 # --- 환경 설정 ---
 CAMERA_INDEX = 0      # 보통 0번 카메라
-OUTPUT_DIR = "captured_frames"  # 프레임을 저장할 폴더 이름
+OUTPUT_DIR = "captured_frames"  # 세그먼트 파일을 저장할 폴더 이름
+JPEG_QUALITY = 90
+SEGMENT_SECONDS = 60  # 세그먼트 파일 하나에 담는 시간 (초)
+RETENTION_HOURS = 24  # 이보다 오래된 세그먼트는 자동 삭제
 # -----------------
 
 def capture_and_save_frames():
-    """웹캠에서 연속적인 프레임을 캡처하고 이미지 파일로 저장하는 함수"""
+    """웹캠에서 연속적인 프레임을 캡처하고 세그먼트 아카이브에 저장하는 함수"""
     
-    # 1. 저장 폴더 생성
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        print(f"저장 폴더 생성: {OUTPUT_DIR}")
+    # 1. 아카이브 생성 (프레임마다 파일을 만들지 않고, 기록 스레드가 세그먼트 파일에 모아서 기록)
+    archive = FrameArchive(OUTPUT_DIR, segment_seconds=SEGMENT_SECONDS, retention_hours=RETENTION_HOURS)
+    archive.start()
+    print(f"저장 폴더: {OUTPUT_DIR}")
 
     # 2. 웹캠 초기화 
     # cv2.CAP_V4L: Linux 환경에서 V4L2 백엔드를 사용하도록 명시 (test.py 참고)
@@ -25,6 +31,7 @@ def capture_and_save_frames():
     if not camera.isOpened():
         print(f"오류: {CAMERA_INDEX}번 웹캠을 열 수 없습니다.")
         # sys.exit(1)
+        archive.stop()
         return # 함수 종료
         
     start_time = time.time()
@@ -41,20 +48,13 @@ def capture_and_save_frames():
             
             current_time = time.time()
             
-            # 4. 파일 이름 설정 (시간 기반으로 고유한 이름 생성)
-            timestamp_str = time.strftime("%Y%m%d_%H%M%S", time.localtime(current_time))
-            # 밀리초 추가 (정확도 향상)
-            milliseconds = int((current_time - int(current_time)) * 1000)
-            filename = f"{OUTPUT_DIR}/{timestamp_str}_{milliseconds:03d}.jpg"
-            
-            # 5. 프레임을 JPEG 파일로 저장
-            cv2.imwrite(filename, image)
-            
+            # 4. JPEG 인코딩
+            ok, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
+            if not ok:
+                continue
             
-            # 초당 10프레임 전송을 모의하기 위해 sleep 시간을 조정합니다.
-            # 1초 / 10프레임 = 0.1초 (전송 시간 고려)
-            # 평균 17프레임으로 저장 시도
-            time.sleep(0.05) 
+            # 5. 아카이브 기록 대기열에 추가 (디스크 쓰기는 기록 스레드에서 수행)
+            archive.append(index, current_time, image.shape[1], image.shape[0], buffer.tobytes())
             
             index += 1
                 
@@ -68,6 +68,7 @@ def capture_and_save_frames():
         
         print("\n자원 해제 및 종료 처리 중...")
         camera.release()
+        archive.stop()  # 대기 중인 프레임을 모두 기록한 뒤 종료
         # cv2.destroyAllWindows()
         
         if duration > 0: